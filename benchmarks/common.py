@@ -0,0 +1,132 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, emperor development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.md, distributed with this software.
+# ----------------------------------------------------------------------------
+"""Synthetic datasets shared by the benchmarks"""
+
+import numpy as np
+import pandas as pd
+
+from skbio import OrdinationResults
+
+from emperor import Emperor
+
+N_AXES = 10
+
+
+def make_ordination(n_samples, n_features=0, seed=0, ids=None):
+    """Random ordination with exponentially decaying explained variance
+
+    Parameters
+    ----------
+    n_samples : int
+        Number of samples in the ordination.
+    n_features : int, optional
+        Number of features (biplot arrows), none by default.
+    seed : int, optional
+        Seed for the random number generator.
+    ids : pd.Index, optional
+        Sample identifiers, if not provided they are ``s0``, ``s1``, etc.
+
+    Returns
+    -------
+    OrdinationResults
+        The ordination.
+    """
+    state = np.random.RandomState(seed)
+
+    if ids is None:
+        ids = pd.Index(['s%d' % i for i in range(n_samples)])
+
+    explained = pd.Series(1 / np.exp(np.arange(N_AXES)))
+    explained = explained / explained.sum()
+
+    samples = pd.DataFrame(state.randn(n_samples, N_AXES), index=ids)
+
+    features = None
+    if n_features:
+        features = pd.DataFrame(state.randn(n_features, N_AXES),
+                                index=['f%d' % i for i in range(n_features)])
+
+    return OrdinationResults(short_method_name='PC',
+                             long_method_name='Principal Coordinates',
+                             eigvals=explained, samples=samples,
+                             features=features,
+                             proportion_explained=explained)
+
+
+def make_metadata(ids, seed=0):
+    """Random metadata with columns of different cardinality
+
+    Parameters
+    ----------
+    ids : pd.Index
+        Identifiers of the elements in the metadata.
+    seed : int, optional
+        Seed for the random number generator.
+
+    Returns
+    -------
+    pd.DataFrame
+        Metadata with a few categories (``treatment``), a category with one
+        value per ten samples (``subject``), a numeric column (``days``), a
+        continuous column (``ph``) and a column with unique values
+        (``barcode``).
+    """
+    state = np.random.RandomState(seed)
+    n = len(ids)
+
+    treatments = np.array(['control', 'fast', 'antibiotic', 'placebo'])
+    subjects = np.array(['subject-%d' % i for i in range(max(1, n // 10))])
+
+    return pd.DataFrame(index=pd.Index(ids, name='SampleID'), data={
+        'treatment': treatments[state.randint(0, len(treatments), n)],
+        'subject': subjects[state.randint(0, len(subjects), n)],
+        'days': state.randint(0, 365, n),
+        'ph': state.rand(n) * 14,
+        'barcode': ['BC%09d' % i for i in range(n)]})
+
+
+def make_emperor(n_samples, variant=None, seed=0, **kwargs):
+    """Build an Emperor object with synthetic data
+
+    Parameters
+    ----------
+    n_samples : int
+        Number of samples.
+    variant : {None, 'jackknifed', 'procrustes', 'biplot'}, optional
+        Type of plot, a regular scatter plot by default. Jackknifed plots have
+        10 replicates, procrustes plots have 3 ordinations and biplots have
+        100 features.
+    seed : int, optional
+        Seed for the random number generator.
+    kwargs : dict
+        Passed to the ``Emperor`` constructor.
+
+    Returns
+    -------
+    Emperor
+        The plot.
+    """
+    n_features = 100 if variant == 'biplot' else 0
+    ordination = make_ordination(n_samples, n_features, seed)
+
+    ids = ordination.samples.index
+    metadata = make_metadata(ids, seed)
+
+    if variant == 'jackknifed':
+        kwargs['jackknifed'] = [make_ordination(n_samples, seed=seed + i,
+                                                ids=ids)
+                                for i in range(1, 10)]
+    elif variant == 'procrustes':
+        kwargs['procrustes'] = [make_ordination(n_samples, seed=seed + i,
+                                                ids=ids)
+                                for i in range(1, 3)]
+    elif variant == 'biplot':
+        kwargs['feature_mapping_file'] = make_metadata(
+            ordination.features.index, seed)
+
+    return Emperor(ordination, metadata, remote=False, **kwargs)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, emperor development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.md, distributed with this software.
+# ----------------------------------------------------------------------------
+"""Compare the legacy and the vectorized custom axes implementations
+
+Usage: python benchmarks/custom_axes.py [n_samples ...]
+"""
+
+import sys
+from timeit import default_timer
+
+import numpy as np
+import pandas as pd
+
+from emperor.qiime_backports.make_3d_plots import (get_custom_coords,
+                                                   remove_nans,
+                                                   scale_custom_coords)
+from emperor.util import embed_custom_axes
+
+
+def _data(n_samples, n_axes=10, seed=0):
+    state = np.random.RandomState(seed)
+
+    ids = ['s%d' % i for i in range(n_samples)]
+    coords = state.randn(n_samples, n_axes)
+
+    days = state.randint(0, 365, n_samples).astype(object)
+    # a few non-numeric values, these samples are removed
+    days[state.choice(n_samples, max(1, n_samples // 100))] = 'unknown'
+
+    mapping = pd.DataFrame(index=ids[::-1],
+                           data={'days': days[::-1],
+                                 'ph': state.rand(n_samples) * 14})
+    return ids, coords, mapping
+
+
+def legacy(ids, coords, mapping, custom_axes):
+    # the legacy functions operate on the string representation
+    mapping_data = [['SampleID'] + mapping.columns.tolist()]
+    mapping_data += mapping.reset_index().astype(str).values.tolist()
+
+    coords_data = [list(ids), coords.copy()]
+    get_custom_coords(custom_axes, mapping_data, coords_data)
+    remove_nans(coords_data)
+    scale_custom_coords(custom_axes, coords_data)
+    return coords_data[0], coords_data[1]
+
+
+def vectorized(ids, coords, mapping, custom_axes):
+    return embed_custom_axes(ids, coords, mapping, custom_axes)
+
+
+def _time(function, *args):
+    start = default_timer()
+    result = function(*args)
+    return default_timer() - start, result
+
+
+def main(sizes):
+    custom_axes = ['days', 'ph']
+
+    print('%10s %12s %12s %10s' % ('samples', 'legacy (s)', 'vector (s)',
+                                   'speedup'))
+    for size in sizes:
+        ids, coords, mapping = _data(size)
+
+        legacy_time, (l_ids, l_coords) = _time(legacy, ids, coords, mapping,
+                                               custom_axes)
+        vector_time, (v_ids, v_coords) = _time(vectorized, ids, coords,
+                                               mapping, custom_axes)
+
+        if list(l_ids) != v_ids or not np.allclose(l_coords, v_coords):
+            raise ValueError('The outputs differ for %d samples' % size)
+
+        print('%10d %12.4f %12.4f %9.1fx' % (size, legacy_time, vector_time,
+                                             legacy_time / vector_time))
+
+
+if __name__ == '__main__':
+    main([int(s) for s in sys.argv[1:]] or [100, 1000, 5000, 10000])
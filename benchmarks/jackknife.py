@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, emperor development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.md, distributed with this software.
+# ----------------------------------------------------------------------------
+"""Compare the legacy and the vectorized jackknife summaries
+
+Usage: python benchmarks/jackknife.py [n_replicates n_samples ...]
+"""
+
+import sys
+from timeit import default_timer
+
+import numpy as np
+
+from emperor.qiime_backports.util import summarize_pcoas
+from emperor.util import summarize_jackknifed
+
+METHODS = ['IQR', 'ideal_fourths', 'sdev']
+
+
+def _data(n_replicates, n_samples, n_axes=10, seed=0):
+    state = np.random.RandomState(seed)
+
+    ids = ['s%d' % i for i in range(n_samples)]
+    master = state.randn(n_samples, n_axes)
+
+    # noisy copies of the master coordinates with random axes flipped
+    coords = [master]
+    for _ in range(n_replicates - 1):
+        signs = state.choice([-1, 1], n_axes)
+        coords.append((master + state.randn(n_samples, n_axes) * 0.1) * signs)
+    eigvals = [state.rand(n_axes) for _ in range(n_replicates)]
+
+    return ids, coords, eigvals
+
+
+def legacy(ids, coords, eigvals, method):
+    pcoas = [[ids, c, e, None] for c, e in zip(coords, eigvals)]
+    return summarize_pcoas(pcoas[0], pcoas, method=method,
+                           apply_procrustes=False)[:4]
+
+
+def vectorized(ids, coords, eigvals, method):
+    return summarize_jackknifed(coords, eigvals, method=method)
+
+
+def _time(function, *args):
+    start = default_timer()
+    result = function(*args)
+    return default_timer() - start, result
+
+
+def main(sizes):
+    print('%10s %10s %14s %12s %12s %10s' % ('replicates', 'samples',
+                                             'method', 'legacy (s)',
+                                             'vector (s)', 'speedup'))
+    for n_replicates, n_samples in sizes:
+        ids, coords, eigvals = _data(n_replicates, n_samples)
+
+        for method in METHODS:
+            legacy_time, exp = _time(legacy, ids, coords, eigvals, method)
+            vector_time, obs = _time(vectorized, ids, coords, eigvals, method)
+
+            if not all(np.allclose(o, e) for o, e in zip(obs, exp)):
+                raise ValueError('The outputs differ for %d replicates of %d '
+                                 'samples (%s)' % (n_replicates, n_samples,
+                                                   method))
+
+            print('%10d %10d %14s %12.4f %12.4f %9.1fx' %
+                  (n_replicates, n_samples, method, legacy_time, vector_time,
+                   legacy_time / vector_time))
+
+
+if __name__ == '__main__':
+    args = [int(s) for s in sys.argv[1:]]
+    if len(args) % 2:
+        raise ValueError('Expected pairs of replicates and samples')
+
+    main(list(zip(args[::2], args[1::2])) or [(10, 1000), (100, 1000),
+                                              (100, 10000)])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, emperor development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.md, distributed with this software.
+# ----------------------------------------------------------------------------
+"""Compare the memory used by the stacked and streamed jackknife summaries
+
+The replicates are generated on demand, so the reported peak only includes
+the memory used by the summary itself.
+
+Usage: python benchmarks/jackknife_stream.py [n_replicates n_samples ...]
+"""
+
+import sys
+import tracemalloc
+from timeit import default_timer
+
+import numpy as np
+
+from emperor.util import summarize_jackknifed, summarize_jackknifed_stream
+
+METHODS = ['IQR', 'sdev']
+
+
+def _replicates(n_replicates, n_samples, n_axes=10, seed=0):
+    state = np.random.RandomState(seed)
+    master = state.randn(n_samples, n_axes)
+
+    yield master
+    for _ in range(n_replicates - 1):
+        signs = state.choice([-1, 1], n_axes)
+        yield (master + state.randn(n_samples, n_axes) * 0.1) * signs
+
+
+def _eigvals(n_replicates, n_axes=10, seed=0):
+    state = np.random.RandomState(seed)
+    for _ in range(n_replicates):
+        yield state.rand(n_axes)
+
+
+def stacked(n_replicates, n_samples, method):
+    return summarize_jackknifed(list(_replicates(n_replicates, n_samples)),
+                                list(_eigvals(n_replicates)), method)
+
+
+def streamed(n_replicates, n_samples, method):
+    return summarize_jackknifed_stream(_replicates(n_replicates, n_samples),
+                                       _eigvals(n_replicates), method)
+
+
+def _measure(function, *args):
+    tracemalloc.start()
+    start = default_timer()
+    result = function(*args)
+    elapsed = default_timer() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return elapsed, peak / 2**20, result
+
+
+def main(sizes):
+    print('%10s %10s %6s %12s %12s %12s %12s' % (
+          'replicates', 'samples', 'method', 'stacked (s)', 'stacked (MiB)',
+          'stream (s)', 'stream (MiB)'))
+    for n_replicates, n_samples in sizes:
+        for method in METHODS:
+            s_time, s_peak, exp = _measure(stacked, n_replicates, n_samples,
+                                           method)
+            t_time, t_peak, obs = _measure(streamed, n_replicates, n_samples,
+                                           method)
+
+            if not all(np.allclose(o, e) for o, e in zip(obs, exp)):
+                raise ValueError('The outputs differ for %d replicates of %d '
+                                 'samples (%s)' % (n_replicates, n_samples,
+                                                   method))
+
+            print('%10d %10d %6s %12.4f %12.1f %12.4f %12.1f' % (
+                  n_replicates, n_samples, method, s_time, s_peak, t_time,
+                  t_peak))
+
+
+if __name__ == '__main__':
+    args = [int(s) for s in sys.argv[1:]]
+    if len(args) % 2:
+        raise ValueError('Expected pairs of replicates and samples')
+
+    main(list(zip(args[::2], args[1::2])) or [(100, 10000), (500, 10000)])
@@ -0,0 +1,241 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, emperor development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.md, distributed with this software.
+# ----------------------------------------------------------------------------
+"""Benchmarks for each stage of the Python render pipeline
+
+The classes in this module follow the conventions of airspeed velocity (asv),
+so they can be run with ``asv run`` from the root of the repository. Without
+asv, each benchmark can be run once with:
+
+    python -m benchmarks.pipeline [n_samples ...]
+
+In that case the ``peakmem_`` benchmarks report the peak memory allocated
+while the benchmark runs (as traced by ``tracemalloc``), instead of the peak
+resident memory of the process reported by asv.
+"""
+
+import os
+import sys
+import tracemalloc
+import warnings
+from timeit import default_timer
+
+from emperor import Emperor
+from emperor.util import EmperorWarning
+
+from .common import make_emperor, make_metadata, make_ordination
+
+SIZES = [1000, 10000, 100000, 1000000]
+VARIANT_SIZES = [1000, 10000, 100000]
+
+warnings.simplefilter('ignore', category=EmperorWarning)
+
+
+class Construction:
+    """Validation and alignment of the inputs in ``Emperor.__init__``"""
+    params = SIZES
+    param_names = ['samples']
+    timeout = 600
+
+    def setup(self, n_samples):
+        self.ordination = make_ordination(n_samples)
+        self.metadata = make_metadata(self.ordination.samples.index)
+
+    def time_init(self, n_samples):
+        Emperor(self.ordination, self.metadata, remote=False)
+
+    def peakmem_init(self, n_samples):
+        self.time_init(n_samples)
+
+
+class JackknifedConstruction:
+    """Spooling jackknifed replicates that are loaded from a generator"""
+    params = (VARIANT_SIZES, [10, 40, 80])
+    param_names = ['samples', 'replicates']
+    timeout = 600
+
+    def setup(self, n_samples, n_replicates):
+        self.ordination = make_ordination(n_samples)
+        self.metadata = make_metadata(self.ordination.samples.index)
+
+    def _replicates(self, n_samples, n_replicates):
+        ids = self.ordination.samples.index
+        for i in range(1, n_replicates):
+            yield make_ordination(n_samples, seed=i, ids=ids)
+
+    def time_init_generator(self, n_samples, n_replicates):
+        Emperor(self.ordination, self.metadata, remote=False,
+                jackknifed=self._replicates(n_samples, n_replicates))
+
+    def peakmem_init_generator(self, n_samples, n_replicates):
+        self.time_init_generator(n_samples, n_replicates)
+
+
+class Pipeline:
+    """Each stage of ``Emperor.make_emperor`` for a scatter plot"""
+    params = (SIZES, ['json', 'binary'])
+    param_names = ['samples', 'data_encoding']
+    timeout = 600
+
+    def setup(self, n_samples, data_encoding):
+        self.emperor = make_emperor(n_samples)
+        self.emperor.data_encoding = data_encoding
+
+        self.processed = self.emperor._process_data([], 'IQR')
+
+        # the processed data is cached, so rendering again only measures the
+        # time spent in the templates
+        self.emperor.make_emperor(standalone=True)
+
+    def time_process_data(self, n_samples, data_encoding):
+        self.emperor._process_data([], 'IQR')
+
+    def peakmem_process_data(self, n_samples, data_encoding):
+        self.emperor._process_data([], 'IQR')
+
+    def time_metadata_map(self, n_samples, data_encoding):
+        if data_encoding == 'binary':
+            self.emperor._to_categorical_map(self.emperor.mf)
+        else:
+            self.emperor._to_legacy_map(self.emperor.mf)
+
+    def time_to_dict(self, n_samples, data_encoding):
+        self.emperor._to_dict(self.processed)
+
+    def peakmem_to_dict(self, n_samples, data_encoding):
+        self.emperor._to_dict(self.processed)
+
+    def time_render_template(self, n_samples, data_encoding):
+        self.emperor.make_emperor(standalone=True)
+
+    def time_make_emperor(self, n_samples, data_encoding):
+        self.emperor.invalidate_cache()
+        self.emperor.make_emperor(standalone=True)
+
+    def peakmem_make_emperor(self, n_samples, data_encoding):
+        self.emperor.invalidate_cache()
+        self.emperor.make_emperor(standalone=True)
+
+    def time_write_html(self, n_samples, data_encoding):
+        with open(os.devnull, 'w') as f:
+            f.write(self.emperor.make_emperor(standalone=True))
+
+    def peakmem_write_html(self, n_samples, data_encoding):
+        self.time_write_html(n_samples, data_encoding)
+
+    def time_stream_emperor(self, n_samples, data_encoding):
+        self.emperor.stream_emperor(os.devnull, standalone=True)
+
+    def peakmem_stream_emperor(self, n_samples, data_encoding):
+        self.emperor.stream_emperor(os.devnull, standalone=True)
+
+    def time_stream_emperor_uncached(self, n_samples, data_encoding):
+        self.emperor.invalidate_cache()
+        self.emperor.stream_emperor(os.devnull, standalone=True)
+
+    def peakmem_stream_emperor_uncached(self, n_samples, data_encoding):
+        self.emperor.invalidate_cache()
+        self.emperor.stream_emperor(os.devnull, standalone=True)
+
+
+class Variants:
+    """Jackknifed, procrustes and biplot plots"""
+    params = (VARIANT_SIZES, ['jackknifed', 'procrustes', 'biplot'])
+    param_names = ['samples', 'variant']
+    timeout = 600
+
+    def setup(self, n_samples, variant):
+        self.emperor = make_emperor(n_samples, variant)
+        self.processed = self.emperor._process_data([], 'IQR')
+
+    def time_process_data(self, n_samples, variant):
+        self.emperor._process_data([], 'IQR')
+
+    def peakmem_process_data(self, n_samples, variant):
+        self.emperor._process_data([], 'IQR')
+
+    def time_to_dict(self, n_samples, variant):
+        self.emperor._to_dict(self.processed)
+
+    def peakmem_to_dict(self, n_samples, variant):
+        self.emperor._to_dict(self.processed)
+
+    def time_make_emperor(self, n_samples, variant):
+        self.emperor.invalidate_cache()
+        self.emperor.make_emperor(standalone=True)
+
+    def peakmem_make_emperor(self, n_samples, variant):
+        self.emperor.invalidate_cache()
+        self.emperor.make_emperor(standalone=True)
+
+
+class Overhead:
+    """Per-plot overhead of building many small plots"""
+    params = [10, 100]
+    param_names = ['samples']
+
+    def setup(self, n_samples):
+        self.ordination = make_ordination(n_samples)
+        self.metadata = make_metadata(self.ordination.samples.index)
+
+        # the templates are compiled by the first plot of the process
+        Emperor(self.ordination, self.metadata,
+                remote=False).make_emperor(standalone=True)
+
+    def time_make_emperor(self, n_samples):
+        Emperor(self.ordination, self.metadata,
+                remote=False).make_emperor(standalone=True)
+
+    def time_make_emperor_100(self, n_samples):
+        for i in range(100):
+            self.time_make_emperor(n_samples)
+
+
+def _run(benchmark, method, params):
+    if method.startswith('peakmem_'):
+        tracemalloc.start()
+        getattr(benchmark, method)(*params)
+        value = '%10.1f MiB' % (tracemalloc.get_traced_memory()[1] / 2**20)
+        tracemalloc.stop()
+    else:
+        start = default_timer()
+        getattr(benchmark, method)(*params)
+        value = '%12.4f s' % (default_timer() - start)
+
+    return value
+
+
+def main(sizes=None):
+    for cls in [Construction, JackknifedConstruction, Pipeline, Variants,
+                Overhead]:
+        params = cls.params if isinstance(cls.params, tuple) else (cls.params,)
+        if sizes:
+            params = (sizes, ) + params[1:]
+
+        combinations = [[]]
+        for values in params:
+            combinations = [c + [v] for c in combinations for v in values]
+
+        methods = sorted(m for m in dir(cls)
+                         if m.startswith(('time_', 'peakmem_')))
+
+        for combination in combinations:
+            benchmark = cls()
+            benchmark.setup(*combination)
+
+            label = ', '.join('%s=%s' % (n, v) for n, v in
+                              zip(cls.param_names, combination))
+            for method in methods:
+                print('%-40s %-50s %s' % ('%s.%s' % (cls.__name__, method),
+                                          label,
+                                          _run(benchmark, method,
+                                               combination)))
+                sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main([int(s) for s in sys.argv[1:]])
@@ -0,0 +1,188 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, emperor development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.md, distributed with this software.
+# ----------------------------------------------------------------------------
+"""Command line interface to generate plots in batches"""
+
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count, makedirs
+from os.path import basename, join, splitext
+from timeit import default_timer
+
+import click
+import pandas as pd
+
+from skbio import OrdinationResults
+
+from emperor.core import Emperor
+from emperor.util import deploy_support_files
+
+SUPPORT_FILES_DIRECTORY = 'emperor-support-files'
+
+# set in each process by _initialize_worker, so the metadata and the options
+# are only sent once per process and not once per plot
+_worker_state = {}
+
+
+def load_metadata(metadata_fp):
+    """Load a tab-separated sample metadata file
+
+    Parameters
+    ----------
+    metadata_fp : str
+        Path to the metadata file. The first column has the sample
+        identifiers, and lines starting with ``#`` after the header are
+        ignored (for example comments in QIIME mapping files or the column
+        types in QIIME 2 metadata files).
+
+    Returns
+    -------
+    pd.DataFrame
+        The metadata indexed by sample identifier, all the values are loaded
+        as strings.
+    """
+    mf = pd.read_csv(metadata_fp, sep='\t', dtype=str, na_filter=False)
+
+    index = mf.columns[0]
+    mf = mf[~mf[index].str.startswith('#')]
+
+    return mf.set_index(index).rename_axis(index.lstrip('#'))
+
+
+def _initialize_worker(mf, options):
+    _worker_state['mf'] = mf
+    _worker_state['options'] = options
+
+
+def _write_plot(ordination_fp, output_fp):
+    """Write the plot of one ordination using the worker's state
+
+    Parameters
+    ----------
+    ordination_fp : str
+        Path to the ordination file (in scikit-bio's format).
+    output_fp : str
+        Path to the HTML file where the plot is written.
+
+    Returns
+    -------
+    float
+        Time in seconds taken to load the ordination and write the plot.
+    str or None
+        The error message if the plot couldn't be written.
+    """
+    start = default_timer()
+    options = dict(_worker_state['options'])
+    data_encoding = options.pop('data_encoding')
+
+    try:
+        ordination = OrdinationResults.read(ordination_fp)
+
+        emp = Emperor(ordination, _worker_state['mf'], **options)
+        emp.data_encoding = data_encoding
+        emp.stream_emperor(output_fp, standalone=True)
+    except Exception as e:
+        return default_timer() - start, '%s: %s' % (type(e).__name__, e)
+
+    return default_timer() - start, None
+
+
+@click.command()
+@click.argument('ordinations', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+@click.option('-m', '--metadata', required=True,
+              type=click.Path(exists=True, dir_okay=False),
+              help='Tab-separated sample metadata shared by all the plots.')
+@click.option('-o', '--output-dir', required=True,
+              type=click.Path(file_okay=False),
+              help='Directory where the plots are written, one HTML file per '
+              'ordination named after the ordination file.')
+@click.option('-j', '--n-jobs', default=1, show_default=True,
+              help='Number of processes used to write the plots, -1 uses all '
+              'the available processors.')
+@click.option('--data-encoding', default='json', show_default=True,
+              type=click.Choice(['json', 'binary']),
+              help='How the data is embedded in the plots, see '
+              'Emperor.data_encoding.')
+@click.option('--dimensions', default=5, show_default=True,
+              help='Number of dimensions of each ordination to plot.')
+@click.option('--ignore-missing-samples', is_flag=True,
+              help='Plot the samples that are missing from the metadata.')
+@click.option('--remote', is_flag=True,
+              help='Load the support files from the CDN instead of copying '
+              'them to the output directory.')
+@click.option('--link', type=click.Choice(['symlink', 'hardlink']),
+              help='Link the support files instead of copying them.')
+@click.option('--shared-dir', type=click.Path(file_okay=False),
+              help='Directory with versioned copies of the support files '
+              'that --link points to.')
+@click.option('--template-cache', type=click.Path(file_okay=False),
+              help='Directory where the compiled templates are cached.')
+def emperor(ordinations, metadata, output_dir, n_jobs, data_encoding,
+            dimensions, ignore_missing_samples, remote, link, shared_dir,
+            template_cache):
+    """Write a standalone plot for each of the ORDINATIONS"""
+    outputs = [join(output_dir, splitext(basename(fp))[0] + '.html')
+               for fp in ordinations]
+    if len(set(outputs)) != len(outputs):
+        raise click.BadParameter('The ordination files should have different '
+                                 'names, as the plots are named after them.',
+                                 param_hint='ORDINATIONS')
+
+    if n_jobs == -1:
+        n_jobs = cpu_count()
+    if n_jobs < 1:
+        raise click.BadParameter('Should be a positive integer or -1.',
+                                 param_hint='--n-jobs')
+
+    # the metadata is loaded once and shared by all the plots
+    mf = load_metadata(metadata)
+
+    makedirs(output_dir, exist_ok=True)
+    if not remote:
+        deploy_support_files(join(output_dir, SUPPORT_FILES_DIRECTORY),
+                             link, shared_dir)
+
+    # the plots are written next to the support files, so the path is
+    # relative to the HTML files
+    options = {'dimensions': dimensions, 'remote': remote or
+               SUPPORT_FILES_DIRECTORY,
+               'ignore_missing_samples': ignore_missing_samples,
+               'template_cache': template_cache,
+               'data_encoding': data_encoding}
+
+    start, failures = default_timer(), 0
+
+    if n_jobs == 1:
+        _initialize_worker(mf, options)
+        results = map(_write_plot, ordinations, outputs)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(n_jobs, initializer=_initialize_worker,
+                                       initargs=(mf, options))
+        results = executor.map(_write_plot, ordinations, outputs)
+
+    try:
+        for output, (elapsed, error) in zip(outputs, results):
+            if error is None:
+                click.echo('%s\t%.3f s' % (output, elapsed))
+            else:
+                failures += 1
+                click.echo('%s\tfailed: %s' % (output, error), err=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    click.echo('Wrote %d of %d plots in %.3f s' %
+               (len(outputs) - failures, len(outputs),
+                default_timer() - start))
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    emperor()
@@ -6,21 +6,25 @@
 # The full license is in the file LICENSE.md, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from copy import deepcopy
+import json
+from functools import lru_cache
+from os import fspath, makedirs, PathLike
 from os.path import join
-from distutils.dir_util import copy_tree
+from tempfile import TemporaryFile
 import warnings
 import numpy as np
 import pandas as pd
 
-from jinja2 import FileSystemLoader
+from jinja2 import FileSystemBytecodeCache, FileSystemLoader
 from jinja2.environment import Environment
 from skbio import OrdinationResults
 
 from emperor import __version__ as emperor_version
-from emperor.util import (get_emperor_support_files_dir,
+from emperor.util import (deploy_support_files, get_emperor_support_files_dir,
                           preprocess_coords_file, resolve_stable_url,
-                          validate_and_process_custom_axes, EmperorWarning)
+                          validate_and_process_custom_axes, encode_array,
+                          encode_categories, iterencode_json, parallel_map,
+                          EmperorWarning)
 
 # we are going to use this remote location to load external resources
 REMOTE_URL = ('https://cdn.jsdelivr.net/gh/biocore/emperor@%s/emperor/'
@@ -33,8 +37,46 @@ LOGIC_PATH = 'logic-template.html'
 HTML_CONTAINER_PATH = 'html-container-template.html'
 
 STANDALONE_PATH = 'standalone-template.html'
+DATA_DIRECTORY = 'emperor-data'
 JUPYTER_PATH = 'jupyter-template.html'
 
+RENDER_MODES = ('auto', 'meshes', 'instanced', 'point-cloud')
+RENDER_THRESHOLDS = ('instancing', 'point_cloud', 'svg_warning')
+
+# placeholder that is replaced by the plot's data when streaming a plot, and
+# the approximate size of the chunks that are written to the output
+_DATA_PLACEHOLDER = '__emperor_data_placeholder__'
+_STREAM_CHUNK_SIZE = 2**16
+
+
+@lru_cache(maxsize=None)
+def _template_environment(bytecode_cache_dir=None):
+    """Jinja environment shared by every plot
+
+    Parameters
+    ----------
+    bytecode_cache_dir : str, optional
+        Directory where the compiled templates are stored, so they are reused
+        by other processes. If it doesn't exist it is created. By default the
+        templates are only cached in memory.
+
+    Returns
+    -------
+    jinja2.Environment
+        The environment that loads the templates in the support files. One
+        environment is created per ``bytecode_cache_dir``, so each template is
+        parsed and compiled once per process and not once per plot.
+    """
+    loader = FileSystemLoader(join(get_emperor_support_files_dir(),
+                                   'templates'))
+
+    bytecode_cache = None
+    if bytecode_cache_dir is not None:
+        makedirs(bytecode_cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+
+    return Environment(loader=loader, bytecode_cache=bytecode_cache)
+
 
 class Emperor(object):
     """Display principal coordinates analysis plots
@@ -71,7 +113,10 @@ class Emperor(object):
         ``True``. See the Notes section for more information.
     jackknifed: list of OrdinationResults, optional
         A list of the OrdinationResults objects with the same sample
-        identifiers as the identifiers in ``ordination``.
+        identifiers as the identifiers in ``ordination``. This can also be an
+        iterable (e.g. a generator) of OrdinationResults objects or a list of
+        paths to ordination files readable by scikit-bio, see the Notes
+        section for more information.
     procrustes: list of OrdinationResults, optional
         A list of the OrdinationResults objects with the same sample
         identifiers as the identifiers in ``ordination``.
@@ -81,6 +126,36 @@ class Emperor(object):
         default an exception will be raised if missing elements are
         encountered. Note, this flag only takes effect if there's at least one
         overlapping element.
+    n_jobs: int, optional
+        Number of threads used to load, align and scale the ``jackknifed`` or
+        ``procrustes`` ordinations. ``-1`` uses all the available processors.
+        The output is the same regardless of this value. Defaults to ``1``.
+    copy_metadata: bool, optional
+        Whether to copy ``mapping_file`` and ``feature_mapping_file``. By
+        default the metadata is only copied when it has to be reordered,
+        filtered or padded to match the ordination, otherwise the data is
+        shared with the input DataFrames to avoid duplicating large tables.
+        In that case, modifying the input DataFrames in place can affect the
+        plot. Defaults to ``False``.
+    render_mode: {'auto', 'meshes', 'instanced', 'point-cloud'}, optional
+        How the samples are drawn in the scatter plot. ``"meshes"`` draws one
+        mesh per sample, ``"instanced"`` draws one instanced mesh per shape
+        and ``"point-cloud"`` draws the samples as points, which is the
+        fastest option but doesn't support shapes or ellipsoids. By default
+        (``"auto"``) the mode is chosen based on the number of samples, see
+        the Notes section for more information.
+    render_thresholds: dict, optional
+        Number of samples above which ``render_mode="auto"`` uses instanced
+        meshes (``"instancing"``) or a point cloud (``"point_cloud"``), and
+        number of samples from which exporting an SVG file has to be
+        confirmed (``"svg_warning"``). Thresholds that are not included keep
+        their default values.
+    template_cache: str or os.PathLike, optional
+        Directory where the compiled templates are stored and reused by other
+        processes (for example when plots are generated by several workers or
+        by separate jobs). In any case, the templates are compiled once per
+        process and shared by every ``Emperor`` object. By default the
+        compiled templates are only kept in memory.
 
     Attributes
     ----------
@@ -106,12 +181,38 @@ class Emperor(object):
         identifiers in the ``ordination.features`` property.
     custom_axes : list of str, optional
         Custom axes to embed in the ordination.
-    jackknifing_method : {'IQR', 'sdev'}, optional
+    jackknifing_method : {'IQR', 'ideal_fourths', 'sdev'}, optional
         Used only when plotting ellipsoids for jackknifed beta diversity
         (i.e. using a directory of coord files instead of a single coord
-        file). Valid values are ``"IQR"`` (for inter-quartile ranges) and
-        ``"sdev"`` (for standard deviation). This argument is ignored if
+        file). Valid values are ``"IQR"`` (for inter-quartile ranges),
+        ``"ideal_fourths"`` (for quartiles estimated with the ideal fourths)
+        and ``"sdev"`` (for standard deviation). This argument is ignored if
         ``self.jackknifed`` is ``None`` or an empty list.
+    data_encoding : {'json', 'binary'}
+        How the numeric data is embedded in the plot. ``"json"`` (the default)
+        writes coordinates, confidence intervals and edges as nested lists of
+        numbers. ``"binary"`` writes them as base64-encoded little-endian
+        buffers (``Float32`` for coordinates and ``Int32`` for edges), which
+        produces much smaller files and loads faster for large datasets at the
+        cost of single precision coordinates. In ``"binary"`` mode the metadata
+        is dictionary-encoded as well, i.e. each column is represented by a
+        table of unique values and a buffer of integer codes into that table.
+        Only the ``"binary"`` buffers are decoded in a Web Worker when the
+        plot loads, so the page stays responsive. With ``"json"`` the data is
+        parsed and processed in the page itself, consider ``"binary"`` for
+        plots with many samples.
+    n_jobs : int
+        Number of threads used to process the ``jackknifed`` or ``procrustes``
+        ordinations.
+    render_mode : {'auto', 'meshes', 'instanced', 'point-cloud'}
+        How the samples are drawn in the scatter plot.
+    render_thresholds : dict
+        Number of samples used to choose the rendering mode and to warn
+        before exporting SVG files.
+    precompute_trajectories : bool
+        Whether the trajectories of the animation set with ``animations_by``
+        are computed when the plot is rendered instead of in the browser.
+        Defaults to ``False``.
 
     Examples
     --------
@@ -186,6 +287,31 @@ class Emperor(object):
     - ``True``" should be used if you intend to embed an Emperor plot in a
     notebook and then publish it using http://nbviewer.jupyter.org.
 
+    When ``jackknifed`` is a list of OrdinationResults objects, all the
+    replicates are kept in memory. For large numbers of replicates use a
+    generator or a list of file paths instead. Each replicate is loaded and
+    validated one at a time, and its coordinates are stored in a temporary
+    file. The replicates are then summarized in a single pass that only keeps
+    a few of them in memory, and the quartiles are computed from the same
+    file (see ``summarize_jackknifed_stream``).
+
+    With ``render_mode="auto"``, plots with up to 9,000 samples draw each
+    sample as a separate mesh, plots with up to 20,000 samples use one
+    instanced mesh per shape and larger plots use a point cloud. These limits
+    can be changed with ``render_thresholds``, for example
+    ``{"point_cloud": 0}`` always draws a point cloud. Instanced
+    meshes are drawn with a single call to the GPU per shape, and changes to
+    the color, visibility, opacity, scale or shape of a sample only update a
+    few values in a buffer. Plots drawn with instanced meshes or point clouds
+    can't be exported as SVG files.
+
+    When ``precompute_trajectories`` is ``True``, the samples in the animation
+    are grouped by the trajectory category and sorted by the gradient
+    category in Python, and the plot includes the position of each sample in
+    the animation, instead of grouping and sorting all the samples in the
+    browser every time an animation starts. The gradient category is
+    validated when the plot is rendered.
+
     Raises
     ------
     ValueError
@@ -204,7 +330,9 @@ class Emperor(object):
     """
     def __init__(self, ordination, mapping_file, feature_mapping_file=None,
                  dimensions=5, remote=True, jackknifed=None, procrustes=None,
-                 ignore_missing_samples=False):
+                 ignore_missing_samples=False, n_jobs=1,
+                 copy_metadata=False, render_mode='auto',
+                 render_thresholds=None, template_cache=None):
 
         if ordination.samples.shape[1] < 2:
             raise ValueError('Ordinations with less than two dimensions are'
@@ -213,22 +341,29 @@ class Emperor(object):
         self.ordination = ordination
         self.jackknifed = jackknifed if jackknifed is not None else []
         self.procrustes = procrustes if procrustes is not None else []
+        self._replicates_file = None
+        self.n_jobs = n_jobs
+        self.render_mode = render_mode
+        self.render_thresholds = (render_thresholds
+                                  if render_thresholds is not None else {})
 
-        self.mf = mapping_file.copy()
-
-        self.mf = self._validate_metadata(self.mf, self.ordination.samples,
-                                          ignore_missing_samples)
+        self.mf = self._validate_metadata(mapping_file,
+                                          self.ordination.samples,
+                                          ignore_missing_samples,
+                                          copy=copy_metadata)
 
         # if biplots are to be visualized
         if self.ordination.features is not None:
             self.feature_mf = \
                 self._validate_metadata(feature_mapping_file,
                                         self.ordination.features,
-                                        ignore_missing_samples, kind='feature')
+                                        ignore_missing_samples, kind='feature',
+                                        copy=copy_metadata)
 
         self._validate_ordinations()
 
         self._html = None
+        self._data_cache = None
 
         if self.ordination.proportion_explained.shape[0] < dimensions:
             self.dimensions = self.ordination.proportion_explained.shape[0]
@@ -257,16 +392,18 @@ class Emperor(object):
 
         self.custom_axes = []
 
-        # based on: http://stackoverflow.com/a/6196098
-        loader = FileSystemLoader(join(get_emperor_support_files_dir(),
-                                       'templates'))
-        self._environment = Environment(loader=loader)
+        # the environment (and its compiled templates) is shared by all plots
+        if template_cache is not None:
+            template_cache = fspath(template_cache)
+        self._environment = _template_environment(template_cache)
 
         self.js_on_ready = ''
 
         # label each ordination by index
         self.procrustes_names = []
         self.jackknifing_method = 'IQR'
+        self.data_encoding = 'json'
+        self.precompute_trajectories = False
         if self.procrustes:
             self.procrustes_names = ['Ordination %d' % i
                                      for i in range(len(self.procrustes) + 1)]
@@ -285,7 +422,41 @@ class Emperor(object):
         return display(HTML(str(self)))
 
     def _validate_metadata(self, metadata, matrix, ignore_missing_samples,
-                           kind='sample'):
+                           kind='sample', copy=False):
+        """Align the metadata with the elements in an ordination
+
+        Parameters
+        ----------
+        metadata : pd.DataFrame or None
+            The metadata to align.
+        matrix : pd.DataFrame
+            The ordination's samples or features.
+        ignore_missing_samples : bool
+            Whether to include elements without metadata with a placeholder
+            value instead of raising an error.
+        kind : {'sample', 'feature'}, optional
+            The type of elements, used in warnings and error messages.
+        copy : bool, optional
+            Whether to copy the metadata when it's already aligned with the
+            ordination. Otherwise the result shares its data with
+            ``metadata``. Defaults to ``False``.
+
+        Returns
+        -------
+        pd.DataFrame
+            The metadata in the same order as ``matrix``, excluding the
+            elements that are not in the ordination.
+
+        Raises
+        ------
+        ValueError
+            If ``kind`` is not valid.
+            If there are duplicated identifiers in ``metadata``.
+            If none of the elements in ``matrix`` are in ``metadata``.
+        KeyError
+            If some of the elements in ``matrix`` are not in ``metadata`` and
+            ``ignore_missing_samples`` is ``False``.
+        """
 
         if kind not in {'sample', 'feature'}:
             raise ValueError('Unsupported "kind" value %s' % kind)
@@ -296,17 +467,24 @@ class Emperor(object):
             metadata['all'] = 'All elements'
             return metadata
 
-        ordination_elements = set(matrix.index)
-        difference = ordination_elements - set(metadata.index)
+        if not metadata.index.is_unique:
+            duplicated = metadata.index[metadata.index.duplicated()].unique()
+            raise ValueError('The %s metadata has duplicated identifiers: %s'
+                             % (kind, ', '.join(map(str, duplicated[:5]))))
+
+        # position of each element of the ordination in the metadata, missing
+        # elements are represented with -1
+        indexer = metadata.index.get_indexer(matrix.index)
+        missing = indexer == -1
 
-        if difference == ordination_elements:
+        if missing.all():
             raise ValueError('None of the %s identifiers match between the'
                              ' metadata and the coordinates. Verify that you '
                              'are using metadata and coordinates corresponding'
                              ' to the same dataset.' % kind)
 
         # sort the elements so we have a deterministic output
-        difference = sorted([str(i) for i in difference])
+        difference = sorted([str(i) for i in matrix.index[missing]])
         if difference and not ignore_missing_samples:
 
             # if there's more than 5 missing elements, truncate the list
@@ -325,23 +503,35 @@ class Emperor(object):
         elif difference and ignore_missing_samples:
             warnings.warn("%d out of %d %ss have no metadata and are being"
                           " included with a placeholder value." %
-                          (len(difference), len(ordination_elements), kind),
+                          (len(difference), len(matrix.index), kind),
                           EmperorWarning)
 
+        if len(metadata) == len(indexer) and \
+           np.array_equal(indexer, np.arange(len(indexer))):
+            # the metadata is already aligned, so the data can be shared
+            metadata = metadata.copy(deep=copy)
+        else:
+            # filter all metadata that we may have for which we don't have any
+            # coordinates this also ensures that the coordinates are in the
+            # same order as the metadata
+            metadata = metadata.take(np.where(missing, 0, indexer))
+
             # pad the missing elements
-            pad = pd.DataFrame(index=difference, columns=metadata.columns,
-                               dtype=str)
-            pad.fillna('This element has no metadata', inplace=True)
-            metadata = pd.concat([metadata, pad])
+            if missing.any():
+                metadata = metadata.astype(object)
+                metadata.iloc[np.flatnonzero(missing)] = \
+                    'This element has no metadata'
 
-        # filter all metadata that we may have for which we don't have any
-        # coordinates this also ensures that the coordinates are in the
-        # same order as the metadata
-        metadata = metadata.loc[matrix.index]
+        metadata.index = matrix.index
 
         return metadata
 
     def _validate_ordinations(self):
+        # anything other than a list of ordinations is loaded one at a time
+        if not isinstance(self.jackknifed, list) or \
+           any(isinstance(j, (str, PathLike)) for j in self.jackknifed):
+            self.jackknifed = self._spool_replicates(self.jackknifed)
+
         # bail if the value is non or an empty list
         if self.jackknifed == [] and self.procrustes == []:
             return
@@ -356,24 +546,12 @@ class Emperor(object):
             raise TypeError('All elements in the jackknifed array should be '
                             'OrdinationResults instances.')
 
-        master_ids = self.ordination.samples.index
-        master = set(self.ordination.samples.index)
-
         aligned = []
 
-        for i, ord_res in enumerate(ordinations):
-            other = set(ord_res.samples.index)
-
-            # samples must be represented identically
-            if master != other:
-                raise ValueError('The ordination at index (%d) does not '
-                                 'represent the exact same samples. Mismatches'
-                                 ' are: %s.' % (i, ', '.join(master - other)))
-
-            # we need to ensure the copy we have is aligned one-to-one with the
-            # *master* ordination, making copies might be inefficient for large
-            # datasets
-            ord_res.samples = ord_res.samples.loc[master_ids].copy()
+        samples = parallel_map(lambda item: self._align_samples(*item),
+                               enumerate(ordinations), self.n_jobs)
+        for ord_res, ord_samples in zip(ordinations, samples):
+            ord_res.samples = ord_samples
             aligned.append(ord_res)
 
         # need to test this carefully i.e. that when one is set the other one
@@ -383,7 +561,117 @@ class Emperor(object):
         elif self.procrustes:
             self.procrustes = aligned
 
-    def copy_support_files(self, target=None):
+    def _align_samples(self, index, ord_res):
+        """Validate and align the samples of an ordination with the master
+
+        Parameters
+        ----------
+        index : int
+            Position of the ordination, used in the error message.
+        ord_res : OrdinationResults
+            The ordination to align.
+
+        Returns
+        -------
+        pd.DataFrame
+            The samples in the same order as in ``self.ordination``.
+
+        Raises
+        ------
+        ValueError
+            If the ordination doesn't have the same samples as
+            ``self.ordination``.
+        """
+        master_ids = self.ordination.samples.index
+        master = set(master_ids)
+        other = set(ord_res.samples.index)
+
+        # samples must be represented identically
+        if master != other:
+            raise ValueError('The ordination at index (%d) does not '
+                             'represent the exact same samples. Mismatches'
+                             ' are: %s.' % (index, ', '.join(master - other)))
+
+        # we need to ensure the copy we have is aligned one-to-one with the
+        # *master* ordination, making copies might be inefficient for large
+        # datasets so we only do it when the samples are out of order
+        if not ord_res.samples.index.equals(master_ids):
+            return ord_res.samples.loc[master_ids].copy()
+        return ord_res.samples
+
+    def _spool_replicates(self, replicates):
+        """Load replicate ordinations one at a time into a temporary file
+
+        Parameters
+        ----------
+        replicates : iterable of OrdinationResults or str
+            Ordinations, or paths to ordination files readable by scikit-bio.
+
+        Returns
+        -------
+        list of OrdinationResults
+            The replicates with the samples in the same order as in
+            ``self.ordination``. The coordinates are memory-mapped from a
+            temporary file, so they are only loaded when they are used.
+
+        Raises
+        ------
+        TypeError
+            If any of the replicates is not an OrdinationResults object or a
+            path.
+        ValueError
+            If any of the replicates doesn't have the same samples as
+            ``self.ordination``.
+        """
+        master_ids = self.ordination.samples.index
+
+        def load(item):
+            index, ord_res = item
+            if isinstance(ord_res, (str, PathLike)):
+                ord_res = OrdinationResults.read(ord_res)
+
+            if not isinstance(ord_res, OrdinationResults):
+                raise TypeError('All elements in the jackknifed array should '
+                                'be OrdinationResults instances.')
+
+            samples = self._align_samples(index, ord_res)
+            return ord_res, samples.columns, np.ascontiguousarray(
+                samples.values, dtype=float)
+
+        self._replicates_file = TemporaryFile()
+
+        # replicates are loaded in parallel but written in order, and only
+        # the attributes that are not written to the file are kept, so the
+        # samples of each replicate are released as soon as they are written
+        layout = []
+        for ord_res, columns, values in parallel_map(load,
+                                                     enumerate(replicates),
+                                                     self.n_jobs):
+            layout.append((self._replicates_file.tell(), columns,
+                           ord_res.short_method_name,
+                           ord_res.long_method_name, ord_res.eigvals,
+                           ord_res.proportion_explained))
+            values.tofile(self._replicates_file)
+            del ord_res, values
+
+        self._replicates_file.flush()
+
+        spooled = []
+        for offset, columns, short_name, long_name, eigvals, explained in \
+                layout:
+            values = np.memmap(self._replicates_file, dtype=float, mode='r',
+                               offset=offset,
+                               shape=(len(master_ids), len(columns)))
+            samples = pd.DataFrame(values, index=master_ids, columns=columns,
+                                   copy=False)
+
+            spooled.append(OrdinationResults(
+                short_name, long_name, eigvals, samples,
+                proportion_explained=explained))
+
+        return spooled
+
+    def copy_support_files(self, target=None, link=None, shared=None):
         """Copies the support files to a target directory
 
         Parameters
@@ -391,12 +679,32 @@ class Emperor(object):
         target : str
             The path where resources should be copied to. By default it copies
             the files to ``self.base_url``.
+        link : {None, 'symlink', 'hardlink'}, optional
+            Whether to link the files instead of copying them.
+        shared : str, optional
+            Directory with versioned copies of the support files that the
+            links point to, by default they point to the installed files.
+
+        Returns
+        -------
+        list of str
+            The files that were written, files that are up to date are not
+            copied again.
+
+        Raises
+        ------
+        ValueError
+            If ``link`` is not one of the supported values.
+
+        See Also
+        --------
+        emperor.util.deploy_support_files
         """
         if target is None:
             target = self.base_url
 
         # copy the required resources
-        copy_tree(get_emperor_support_files_dir(), target)
+        return deploy_support_files(target, link, shared)
 
     def make_emperor(self, standalone=False):
         """Build an emperor plot
@@ -433,10 +741,7 @@ class Emperor(object):
         """
         main_template = self._get_template(standalone)
 
-        # _process_data does a lot of munging to the coordinates data and
-        # _to_dict puts the data into a dictionary-like object for consumption
-        data = self._to_dict(self._process_data(self.custom_axes,
-                                                self.jackknifing_method))
+        data = self._get_data()
 
         # yes, we could have used UUID, but we couldn't find an easier way to
         # test that deterministically and with this approach we can seed the
@@ -444,17 +749,469 @@ class Emperor(object):
         plot_id = 'emperor-notebook-' + str(hex(np.random.randint(2**32)))
 
         # need to do something about low and high
-        plot = main_template.render(
-            data=data, plot_id=plot_id,
-            logic_template_path=LOGIC_PATH, style_template_path=STYLE_PATH,
-            base_dependencies_path=BASE_DEPENDENCIES_PATH,
-            html_container_path=HTML_CONTAINER_PATH,
-            base_url=self.base_url, js_on_ready=self.js_on_ready,
-            width=self.width, height=self.height)
+        plot = main_template.render(data=data,
+                                    **self._template_arguments(plot_id))
 
         return plot
 
-    def _to_dict(self, data):
+    def stream_emperor(self, path_or_fileobj, standalone=False):
+        """Write an emperor plot without building it in memory
+
+        Parameters
+        ----------
+        path_or_fileobj : str, os.PathLike or file-like object
+            Path to the HTML file where the plot is written, or an object
+            opened in text mode with a ``write`` method (for example an open
+            file or an HTTP response).
+        standalone : bool
+            Whether or not the produced plot should be a standalone HTML file.
+
+        Raises
+        ------
+        KeyError
+            If one or more of the ``custom_axes`` names are not present in the
+            sample information.
+        ValueError
+            If any of the ``custom_axes`` have non-numeric values.
+
+        Notes
+        -----
+        The output is the same as the string returned by ``make_emperor``,
+        but the template and the plot's data are serialized incrementally and
+        written in chunks of about 64 KiB, so the serialized plot is never
+        held in memory.
+
+        If the data was not cached by a previous call to ``make_emperor``,
+        ``write_emperor`` or ``render_js``, it is processed without being
+        cached, and the coordinates and metadata are kept as NumPy arrays
+        (the metadata as arrays of references to each column's unique values)
+        that are converted to JSON one batch of rows at a time. The processed
+        arrays, the sample identifiers and the unique metadata values are
+        still held in memory while the plot is written, so the memory used
+        grows with the size of the plot, but the lists, rows and base64
+        strings of the JSON payload are never created. If the data is
+        cached, the cached payload is written instead.
+
+        If ``path_or_fileobj`` is a file-like object, it is not closed.
+
+        See Also
+        --------
+        emperor.core.Emperor.make_emperor
+        emperor.core.Emperor.write_emperor
+        """
+        main_template = self._get_template(standalone)
+
+        data = self._get_data(lazy=True)
+
+        plot_id = 'emperor-notebook-' + str(hex(np.random.randint(2**32)))
+
+        # the template is rendered with a placeholder where the data goes, so
+        # the data can be serialized with an incremental encoder instead of
+        # the tojson filter, matching the filter's options and escaping
+        options = self._environment.policies['json.dumps_kwargs']
+        placeholder = json.dumps(_DATA_PLACEHOLDER)
+
+        def escape(chunk):
+            return (chunk.replace('<', '\\u003c').replace('>', '\\u003e')
+                    .replace('&', '\\u0026').replace("'", '\\u0027'))
+
+        def chunks():
+            for chunk in main_template.generate(
+                    data=_DATA_PLACEHOLDER,
+                    **self._template_arguments(plot_id)):
+                while placeholder in chunk:
+                    before, chunk = chunk.split(placeholder, 1)
+                    yield before
+                    for part in iterencode_json(data, **options):
+                        yield escape(part)
+                yield chunk
+
+        if isinstance(path_or_fileobj, (str, PathLike)):
+            with open(path_or_fileobj, 'w') as f:
+                self._write_chunks(f, chunks())
+        else:
+            self._write_chunks(path_or_fileobj, chunks())
+
+    @staticmethod
+    def _write_chunks(f, chunks):
+        """Write strings to a file, joining the small ones
+
+        Parameters
+        ----------
+        f : file-like object
+            Object with a ``write`` method.
+        chunks : iterable of str
+            The strings to write.
+        """
+        buffer, size = [], 0
+        for chunk in chunks:
+            buffer.append(chunk)
+            size += len(chunk)
+
+            if size >= _STREAM_CHUNK_SIZE:
+                f.write(''.join(buffer))
+                buffer, size = [], 0
+
+        if buffer:
+            f.write(''.join(buffer))
+
+    def _template_arguments(self, plot_id):
+        """Arguments shared by the templates of a plot
+
+        Parameters
+        ----------
+        plot_id : str
+            The name for Emperor's div.
+
+        Returns
+        -------
+        dict
+            The paths of the templates included by the main template and the
+            plot's rendering options.
+        """
+        return dict(plot_id=plot_id, logic_template_path=LOGIC_PATH,
+                    style_template_path=STYLE_PATH,
+                    base_dependencies_path=BASE_DEPENDENCIES_PATH,
+                    html_container_path=HTML_CONTAINER_PATH,
+                    base_url=self.base_url, js_on_ready=self.js_on_ready,
+                    width=self.width, height=self.height)
+
+    def invalidate_cache(self):
+        """Discard the processed data so that it is recomputed
+
+        Notes
+        -----
+        The processed and encoded data is reused across calls to
+        ``make_emperor``, ``write_emperor`` and ``render_js`` as long as the
+        attributes that affect it don't change (for example ``dimensions``,
+        ``custom_axes`` or ``data_encoding``) and the metadata and ordination
+        attributes refer to the same objects. If the metadata or the
+        ordinations are modified in place, this method has to be called so the
+        changes are reflected in the plot. Changes to ``settings``, ``info``,
+        ``render_mode`` and ``render_thresholds`` never require this method to
+        be called.
+        """
+        self._data_cache = None
+
+    def _data_key(self):
+        """Key identifying the inputs used to compute the plot's data
+
+        Returns
+        -------
+        tuple
+            The attributes that affect the output of ``_process_data`` and
+            ``_to_dict``. The metadata and ordinations are identified by the
+            ``id`` of each object.
+        """
+        ordinations = [self.ordination] + self.procrustes + self.jackknifed
+
+        return (self.dimensions, tuple(self.custom_axes),
+                self.jackknifing_method, self.data_encoding,
+                tuple(self.procrustes_names),
+                tuple(id(ordination) for ordination in ordinations),
+                id(self.mf), id(getattr(self, 'feature_mf', None)))
+
+    def _get_data(self, lazy=False):
+        """Process the data or reuse the result of a previous call
+
+        Parameters
+        ----------
+        lazy : bool, optional
+            If the cache is not up to date, process the data without storing
+            it in the cache and keep the coordinates and metadata as arrays
+            (see ``_to_dict``). The result can only be serialized with
+            ``emperor.util.iterencode_json``.
+
+        Returns
+        -------
+        dict
+            The output of ``_to_dict`` with the current ``settings``,
+            ``info``, ``render_mode`` and ``render_thresholds``.
+
+        Raises
+        ------
+        ValueError
+            If ``render_mode`` is not one of the supported modes.
+            If any of the ``render_thresholds`` is not a non-negative integer.
+            If ``precompute_trajectories`` is ``True`` and the animation's
+            trajectories can't be computed (see ``_precompute_trajectories``).
+        KeyError
+            If ``render_thresholds`` has an unrecognized key.
+
+        Notes
+        -----
+        The returned dictionary and the nested objects are shared with the
+        cache, and should not be modified.
+
+        See Also
+        --------
+        emperor.core.Emperor.invalidate_cache
+        """
+        key = self._data_key()
+
+        if self._data_cache is not None and self._data_cache[0] == key:
+            data = self._data_cache[2]
+        elif lazy:
+            data = self._to_dict(self._process_data(self.custom_axes,
+                                                    self.jackknifing_method,
+                                                    lazy=True), lazy=True)
+        else:
+            # _process_data does a lot of munging to the coordinates data and
+            # _to_dict puts the data into a dictionary-like object for
+            # consumption. The objects in the key are kept in the cache, so
+            # their ids are not reused while the cache is valid
+            data = self._to_dict(self._process_data(self.custom_axes,
+                                                    self.jackknifing_method))
+            self._data_cache = (key, (self.ordination, self.procrustes,
+                                      self.jackknifed, self.mf,
+                                      getattr(self, 'feature_mf', None)),
+                                data)
+
+        if self.render_mode not in RENDER_MODES:
+            raise ValueError('Unsupported rendering mode "%s", the valid '
+                             'options are: %s' % (self.render_mode,
+                                                  ', '.join(RENDER_MODES)))
+
+        for name, value in self.render_thresholds.items():
+            if name not in RENDER_THRESHOLDS:
+                raise KeyError('Unrecognized rendering threshold "%s", the '
+                               'valid options are: %s' %
+                               (name, ', '.join(RENDER_THRESHOLDS)))
+            if (isinstance(value, bool) or
+               not isinstance(value, (int, np.integer)) or value < 0):
+                raise ValueError('The "%s" threshold should be a non-negative'
+                                 ' integer, not %r' % (name, value))
+
+        # settings, info and the rendering options don't affect the processed
+        # data, so these are always up to date
+        data = dict(data, info=self.info,
+                    render_mode=self.render_mode,
+                    render_thresholds={k: int(v) for k, v in
+                                       self.render_thresholds.items()})
+        data['plot'] = dict(data['plot'], settings=self.settings)
+
+        if self.precompute_trajectories and 'animations' in self.settings:
+            decomposition = data['plot']['decomposition']
+            data['plot']['decomposition'] = dict(
+                decomposition, trajectories=self._precompute_trajectories(
+                    decomposition['sample_ids']))
+
+        return data
+
+    def _precompute_trajectories(self, sample_ids):
+        """Group and sort the samples in the animation's trajectories
+
+        Parameters
+        ----------
+        sample_ids : list of str
+            Identifiers of the samples in the plot, as returned by
+            ``_process_data``.
+
+        Returns
+        -------
+        dict
+            The ``gradient`` and ``trajectory`` categories, the ``names`` of
+            the trajectories, the ``indices`` of the samples in each
+            trajectory (positions in ``sample_ids`` sorted by trajectory and
+            then by gradient value), the ``offsets`` where each trajectory
+            starts and ends in ``indices``, the gradient ``values`` of the
+            sorted samples, the ``earliest`` value in the gradient and the
+            ``minimum_delta`` between two consecutive values in a trajectory.
+            If ``data_encoding`` is ``"binary"``, ``indices`` is encoded as
+            an ``Int32`` buffer.
+
+        Raises
+        ------
+        ValueError
+            If the gradient category has non-numeric values.
+            If none of the trajectories has more than one gradient value.
+
+        Notes
+        -----
+        This mirrors the way ``AnimationDirector`` computes the trajectories
+        in the browser. Trajectories with a single gradient value are not
+        animated, and the trajectories that start after the ``earliest``
+        value are left-padded in the browser, so the padding is accounted for
+        in the ``minimum_delta``.
+        """
+        animations = self.settings['animations']
+        gradient = animations['gradientCategory']
+        trajectory = animations['trajectoryCategory']
+
+        values = pd.to_numeric(self.mf[gradient], errors='coerce')
+        invalid = self.mf[gradient][values.isnull()]
+        if len(invalid):
+            raise ValueError('The gradient category "%s" should only have '
+                             'numeric values, found: %s' %
+                             (gradient, ', '.join(sorted(
+                                 set(invalid.astype(str))))))
+
+        columns = pd.DataFrame({'value': values.astype(float),
+                                'group': self.mf[trajectory].astype(str)})
+
+        # procrustes plots repeat the samples once per ordination
+        repeats = len(self.procrustes)
+        if repeats:
+            columns = pd.concat([
+                columns.set_index(columns.index.astype(str) + '_%d' % i)
+                for i in range(repeats + 1)])
+
+        columns = columns.reindex(sample_ids)
+        columns['index'] = np.arange(len(sample_ids))
+        columns = columns.dropna()
+
+        # only trajectories with more than one value in the gradient
+        unique = columns.groupby('group', sort=False)['value'].transform(
+            'nunique')
+        columns = columns[unique > 1]
+
+        if columns.empty:
+            raise ValueError('None of the trajectories in "%s" has more than '
+                             'one value in the gradient "%s"' %
+                             (trajectory, gradient))
+
+        # trajectories are kept in the order they first appear in
+        codes, names = pd.factorize(columns['group'])
+        order = np.lexsort((columns['value'].values, codes))
+        columns = columns.iloc[order]
+        codes = codes[order]
+
+        offsets = np.searchsorted(codes, np.arange(len(names) + 1))
+
+        # the first value of each trajectory is padded to the earliest value
+        sorted_values = columns['value'].values
+        earliest = sorted_values[offsets[:-1]].min()
+        padded = np.insert(sorted_values, offsets[:-1], earliest)
+        deltas = np.diff(padded)
+        deltas[offsets[1:-1] + np.arange(len(names) - 1)] = 0
+        deltas = deltas[deltas != 0]
+
+        indices = columns['index'].values
+        if self.data_encoding == 'binary':
+            indices = encode_array(indices, 'int32')
+        else:
+            indices = indices.tolist()
+
+        return {'gradient': gradient, 'trajectory': trajectory,
+                'names': names.tolist(), 'offsets': offsets.tolist(),
+                'indices': indices, 'values': sorted_values.tolist(),
+                'earliest': float(earliest),
+                'minimum_delta': float(deltas.min())}
+
+    def write_emperor(self, directory):
+        """Write a standalone plot with the data stored in separate files
+
+        Parameters
+        ----------
+        directory : str
+            Directory where the plot is written, an ``index.html`` file and an
+            ``emperor-data`` directory are created in this location. If the
+            directory doesn't exist it is created.
+
+        Returns
+        -------
+        str
+            Path to the HTML file.
+
+        Raises
+        ------
+        KeyError
+            If one or more of the ``custom_axes`` names are not present in the
+            sample information.
+        ValueError
+            If any of the ``custom_axes`` have non-numeric values.
+
+        Notes
+        -----
+        Unlike ``make_emperor``, the data is not embedded in the HTML file.
+        Instead, coordinates, metadata and biplot data are written as separate
+        files that the browser fetches in parallel. Each sample metadata
+        column is stored in its own file, and is only fetched when it is first
+        needed (for example when a category is selected in the user
+        interface), except for the categories used by ``settings``. The data
+        is always written using the ``"binary"`` encoding, regardless of the
+        value of ``data_encoding``.
+
+        As with standalone plots, you will need to copy the support files by
+        calling the ``copy_support_files`` method.
+
+        See Also
+        --------
+        emperor.core.Emperor.make_emperor
+        emperor.core.Emperor.copy_support_files
+        """
+        makedirs(join(directory, DATA_DIRECTORY), exist_ok=True)
+
+        # the metadata can only be split by columns if it's dictionary-encoded
+        encoding, self.data_encoding = self.data_encoding, 'binary'
+        try:
+            data = self._get_data()
+        finally:
+            self.data_encoding = encoding
+
+        # copy the parts of the data that are modified below, as these are
+        # shared with the cache (see _get_data)
+        plot = dict(data['plot'])
+        decomposition = plot['decomposition'] = dict(plot['decomposition'])
+        metadata = plot['metadata'] = {
+            'values': list(plot['metadata']['values']),
+            'codes': list(plot['metadata']['codes'])}
+
+        # paths are relative to the HTML file
+        def write(name, contents):
+            path = '%s/%s.js' % (DATA_DIRECTORY, name)
+            with open(join(directory, path), 'w') as f:
+                f.write('define(')
+                json.dump(contents, f)
+                f.write(');\n')
+            return path
+
+        # the settings are loaded as soon as the plot is ready, so the
+        # categories they refer to can't be fetched on demand
+        required = set()
+        for name, setting in plot['settings'].items():
+            if name == 'animations':
+                required.add(setting['gradientCategory'])
+                required.add(setting['trajectoryCategory'])
+            elif 'category' in setting:
+                required.add(setting['category'])
+
+        metadata_files = []
+        for i, header in enumerate(plot['metadata_headers']):
+            if header in required:
+                metadata_files.append(None)
+                continue
+
+            metadata_files.append(write('metadata-%d' % i, {
+                'values': metadata['values'][i],
+                'codes': metadata['codes'][i]}))
+            metadata['values'][i] = None
+            metadata['codes'][i] = None
+
+        coordinates = {key: decomposition.pop(key)
+                       for key in ['coordinates', 'ci', 'edges']}
+
+        data_files = [write('plot', {
+                          'plot': plot, 'info': data['info'],
+                          'render_mode': data['render_mode'],
+                          'render_thresholds': data['render_thresholds']}),
+                      write('coordinates', coordinates)]
+        if 'biplot' in data:
+            data_files.append(write('biplot', data['biplot']))
+
+        plot_id = 'emperor-notebook-' + str(hex(np.random.randint(2**32)))
+
+        html = self._get_template(standalone=True).render(
+            data_files=data_files, metadata_files=metadata_files,
+            **self._template_arguments(plot_id))
+
+        path = join(directory, 'index.html')
+        with open(path, 'w') as f:
+            f.write(html)
+
+        return path
+
+    def _to_dict(self, data, lazy=False):
         """Convert processed data into a dictionary of decompositions
 
         Parameters
@@ -462,12 +1219,21 @@ class Emperor(object):
         data : tuple
             The output of _process_data. Should contain information about the
             scatter plot and the biplot.
+        lazy : bool, optional
+            Whether to keep the coordinates as arrays and defer the base64
+            encoding, so the dictionary can be serialized incrementally with
+            ``emperor.util.iterencode_json`` (but not with ``json.dumps``).
 
         Returns
         -------
         dict
             A dictionary describing the plots contained in the ordination
             object and the sample + feature metadata.
+
+        Raises
+        ------
+        ValueError
+            If ``data_encoding`` is not one of ``"json"`` or ``"binary"``.
         """
         # data is a tuple as returned by _process_data
         (coord_ids, coords, pct_var, ci,
@@ -476,6 +1242,30 @@ class Emperor(object):
          bi_coords, bi_ids,
          bi_headers, bi_metadata) = data
 
+        if self.data_encoding == 'json':
+            if not lazy:
+                coords = coords.tolist()
+                if ci is not None:
+                    ci = ci.tolist()
+                if bi_coords is not None:
+                    bi_coords = bi_coords.tolist()
+        elif self.data_encoding == 'binary':
+            coords = encode_array(coords, lazy=lazy)
+            if ci is not None:
+                ci = encode_array(ci, lazy=lazy)
+            if bi_coords is not None:
+                bi_coords = encode_array(bi_coords, lazy=lazy)
+
+            # edges are represented as pairs of positions in the coordinates
+            if edges:
+                positions = pd.Index(coord_ids).get_indexer(
+                    np.asarray(edges, dtype=object).ravel())
+                edges = encode_array(positions.reshape(-1, 2), 'int32', lazy)
+        else:
+            raise ValueError('Unsupported data encoding "%s", the valid '
+                             'options are "json" and "binary"' %
+                             self.data_encoding)
+
         data = {
             'plot': {
                 'decomposition': {
@@ -491,21 +1281,28 @@ class Emperor(object):
                 'metadata': metadata,
                 'settings': self.settings,
             },
-            'info': self.info
+            'info': self.info,
+            'render_mode': self.render_mode,
+            'render_thresholds': self.render_thresholds
         }
 
-        # we can rely on the fact that the dictionary above will exist
+        # the biplot is built from its own data, only the axes are shared
+        # with the scatter plot
         if self.ordination.features is not None:
-            data['biplot'] = deepcopy(data['plot'])
-            data['biplot']['decomposition']['ci'] = []
-            data['biplot']['decomposition']['edges'] = []
-            data['biplot']['type'] = 'arrow'
-            data['biplot']['settings'] = None
-
-            data['biplot']['metadata'] = bi_metadata
-            data['biplot']['metadata_headers'] = bi_headers
-            data['biplot']['decomposition']['sample_ids'] = bi_ids
-            data['biplot']['decomposition']['coordinates'] = bi_coords
+            data['biplot'] = {
+                'decomposition': {
+                    'sample_ids': bi_ids,
+                    'coordinates': bi_coords,
+                    'axes_names': list(names),
+                    'percents_explained': list(pct_var),
+                    'ci': [],
+                    'edges': []
+                },
+                'type': 'arrow',
+                'metadata_headers': bi_headers,
+                'metadata': bi_metadata,
+                'settings': None,
+            }
 
         return data
 
@@ -561,8 +1358,7 @@ class Emperor(object):
         str
             A string with Emperor's main JavaScript code.
         """
-        data = self._to_dict(self._process_data(self.custom_axes,
-                                                self.jackknifing_method))
+        data = self._get_data()
 
         template = self._environment.get_template(LOGIC_PATH)
 
@@ -595,49 +1391,55 @@ class Emperor(object):
 
         return self._environment.get_template(main_path)
 
-    def _process_data(self, custom_axes, jackknifing_method):
+    def _process_data(self, custom_axes, jackknifing_method, lazy=False):
         """Handle the coordinates data
 
         Parameters
         ----------
         custom_axes : list of str, optional
             Custom axes to embed in the ordination.
-        jackknifing_method : {'IQR', 'sdef'}, optional
+        jackknifing_method : {'IQR', 'ideal_fourths', 'sdev'}, optional
             Used only when plotting ellipsoids for jackknifed beta diversity
             (i.e. using a directory of coord files instead of a single coord
-            file). Valid values are ``"IQR"`` (for inter-quartile ranges) and
-            ``"sdev"`` (for standard deviation). This argument is ignored if
-            ``self.jackknifed`` is ``None`` or an empty list.
+            file). See ``summarize_jackknifed`` for the valid values. This
+            argument is ignored if ``self.jackknifed`` is ``None`` or an empty
+            list.
+        lazy : bool, optional
+            Whether the metadata is returned as arrays that are serialized
+            incrementally (see ``_to_legacy_map`` and
+            ``_to_categorical_map``).
 
         Returns
         -------
         list of str
             Sample identifiers in the ordination.
-        list of lists of floats
+        np.ndarray
             Matrix of coordinates in the ordination data with custom_axes if
             provided.
         list of float
             either the eigenvalues of the input coordinates or the average
             eigenvalues of the multiple coords that were passed in
-        list of lists floats
+        np.ndarray
             coordinates representing the span of each ellipse on every axis;
             None if no jackknifing is applied
         list of str
             Name of the metadata columns and the index name.
-        list of lists of str
-            Data in ``mf``.
+        list of lists of str or dict
+            Data in ``mf``, dictionary-encoded if ``data_encoding`` is
+            ``"binary"`` (see ``_to_categorical_map``).
         list of str
             Names of the dimensions in the resulting ordination.
         list of list of str
             An edge list for procrustes plots
-        list of list of float
+        np.ndarray
             Arrow locations for the biplots.
         list of str
             Arrow identifiers for biplots.
         list of str
             Header names for biplot metadata.
-        list of list of str
-            Metadata for the biplots.
+        list of list of str or dict
+            Metadata for the biplots, dictionary-encoded if ``data_encoding``
+            is ``"binary"``.
 
         Notes
         -----
@@ -656,19 +1458,32 @@ class Emperor(object):
 
         c_headers, c_data, c_eigenvals, c_pct, edges = [], [], [], [], []
         ordinations = []
+        spooled = self._replicates_file is not None
 
         if self.jackknifed or self.procrustes:
             ordinations = [self.ordination] + self.procrustes + self.jackknifed
 
-            for data in ordinations:
-                c_headers.append(data.samples.index.tolist())
-
+            def scaled(data):
                 coords = data.samples.values[:, :dims]
-                c_data.append(coords / np.max(np.abs(coords)))
-
-                c_eigenvals.append(data.eigvals.values[:dims])
-
-                c_pct.append(data.proportion_explained[:dims] * 100)
+                return coords / np.max(np.abs(coords))
+
+            if spooled:
+                # the spooled replicates are memory-mapped, they are scaled
+                # and summarized one replicate at a time, and the quartiles
+                # are read from the same file
+                c_data = tuple(data.samples.values[:, :dims]
+                               for data in ordinations)
+                c_headers = [self.ordination.samples.index.tolist()]
+                c_eigenvals = (data.eigvals.values[:dims]
+                               for data in ordinations)
+                c_pct = [self.ordination.proportion_explained[:dims] * 100]
+            else:
+                # the results are in the same order as the ordinations
+                c_data = list(parallel_map(scaled, ordinations, self.n_jobs))
+                for data in ordinations:
+                    c_headers.append(data.samples.index.tolist())
+                    c_eigenvals.append(data.eigvals.values[:dims])
+                    c_pct.append(data.proportion_explained[:dims] * 100)
         else:
             data = self.ordination
             c_headers = data.samples.index.tolist()
@@ -680,9 +1495,26 @@ class Emperor(object):
 
             c_pct = data.proportion_explained[:dims] * 100
 
+        # the custom axes are validated once, and the converted columns are
+        # used by the metadata representation and the coordinates processing
+        mapping = None
+        if custom_axes:
+            mapping = self._validate_custom_axes(self.mf, custom_axes)
+
         # repeats is only dependant on procrustes
-        headers, metadata = self._to_legacy_map(self.mf, custom_axes,
-                                                len(self.procrustes))
+        repeats = len(self.procrustes)
+        if self.data_encoding == 'binary':
+            headers, metadata = self._to_categorical_map(self.mf, mapping,
+                                                         repeats, lazy)
+        else:
+            headers, metadata = self._to_legacy_map(self.mf, mapping,
+                                                    repeats, lazy)
+
+        if custom_axes:
+            if repeats:
+                mapping = pd.concat([
+                    mapping.set_index(mapping.index.astype(str) + '_%d' % i)
+                    for i in range(repeats + 1)])
 
         # make an edge list for the procrustes plot
         if self.procrustes:
@@ -692,9 +1524,10 @@ class Emperor(object):
 
         c_headers, c_data, _, c_pct, low, high, _ = \
             preprocess_coords_file(c_headers, c_data, c_eigenvals, c_pct,
-                                   headers, metadata, custom_axes,
+                                   None, mapping, custom_axes,
                                    jackknifing_method,
-                                   is_comparison=bool(self.procrustes))
+                                   is_comparison=bool(self.procrustes),
+                                   scale_jackknifed=spooled)
 
         names = self.ordination.samples.columns[:dims].values.tolist()
         c_pct = c_pct.tolist()
@@ -705,23 +1538,27 @@ class Emperor(object):
             c_pct = ([-1] * len(custom_axes)) + c_pct
 
         if low is not None or high is not None:
-            ci = np.abs(high - low).tolist()
+            ci = np.abs(high - low)
 
         if self.ordination.features is not None:
             bi_coords = self.ordination.features.values[:, :dims]
             bi_coords = bi_coords / np.max(np.abs(bi_coords))
-            bi_coords = bi_coords.tolist()
             bi_ids = self.ordination.features.index.values.tolist()
 
-            bi_headers, bi_metadata = self._to_legacy_map(self.feature_mf)
+            if self.data_encoding == 'binary':
+                bi_headers, bi_metadata = self._to_categorical_map(
+                    self.feature_mf, lazy=lazy)
+            else:
+                bi_headers, bi_metadata = self._to_legacy_map(
+                    self.feature_mf, lazy=lazy)
 
-        return (c_headers, c_data.tolist(),
+        return (c_headers, c_data,
                 c_pct, ci, headers, metadata, names,
                 edges,
                 bi_coords, bi_ids,
                 bi_headers, bi_metadata)
 
-    def _to_legacy_map(self, mf, custom_axes=None, repeats=0):
+    def _to_legacy_map(self, mf, custom_axes=None, repeats=0, lazy=False):
         """Helper method to convert Pandas dataframe to legacy QIIME structure
 
         Parameters
@@ -730,50 +1567,187 @@ class Emperor(object):
             DataFrame with the metadata, this can be feature or sample
             metadata. If the index name is ``None``, then it will be set as
             ``'SampleID'``, otherwise it will be left untouched.
-        custom_axes : list of str, optional
-            Custom axes to embed in the ordination.
+        custom_axes : list of str or pd.DataFrame, optional
+            Custom axes to embed in the ordination, or the custom axes columns
+            as returned by ``_validate_custom_axes``.
         repeats : int
             Number of times that the sample ids should be repeated. This is
             used exclusively for procrustes plots. If the procrustes_names
             property is available a column will be added with each procrustes
             name.
+        lazy : bool, optional
+            Whether to return the rows as a 2D object array of references to
+            the unique values, instead of a list of lists.
 
         Returns
         -------
         list of str
             Name of the metadata columns and the index name.
-        list of list of str
+        list of list of str or np.ndarray
             Data in ``mf``.
+
+        Notes
+        -----
+        The rows are assembled from the dictionary-encoded columns (see
+        ``_encode_metadata``), so every value is converted to a string once
+        and the rows share the string objects of each unique value.
+        """
+        headers, columns = self._encode_metadata(mf, custom_axes, repeats)
+
+        # object arrays of references to the unique values, no new strings
+        # are created when the rows are materialized
+        columns = [np.array(values, dtype=object)[codes]
+                   for values, codes in columns]
+        metadata = np.column_stack(columns)
+        if not lazy:
+            metadata = metadata.tolist()
+        return headers, metadata
+
+    def _to_categorical_map(self, mf, custom_axes=None, repeats=0,
+                            lazy=False):
+        """Helper method to dictionary-encode a Pandas DataFrame
+
+        Parameters
+        ----------
+        mf : pd.DataFrame
+            DataFrame with the metadata, this can be feature or sample
+            metadata. If the index name is ``None``, then it will be set as
+            ``'SampleID'``, otherwise it will be left untouched.
+        custom_axes : list of str or pd.DataFrame, optional
+            Custom axes to embed in the ordination, or the custom axes columns
+            as returned by ``_validate_custom_axes``.
+        repeats : int
+            Number of times that the sample ids should be repeated. This is
+            used exclusively for procrustes plots. If the procrustes_names
+            property is available a column will be added with each procrustes
+            name.
+        lazy : bool, optional
+            Whether to defer the base64 encoding of the codes (see
+            ``emperor.util.encode_array``).
+
+        Returns
+        -------
+        list of str
+            Name of the metadata columns and the index name.
+        dict
+            Data in ``mf`` with two keys, ``"values"`` a list with the unique
+            values (as strings) of each column and ``"codes"`` a list with the
+            encoded position of each row's value in the corresponding list of
+            unique values (see ``emperor.util.encode_categories``).
+
+        Notes
+        -----
+        The headers and the decoded values are identical to the output of
+        ``_to_legacy_map``, but the values are only converted to strings once
+        per unique value and the metadata is never materialized as a list of
+        lists.
+        """
+        headers, columns = self._encode_metadata(mf, custom_axes, repeats)
+
+        metadata = {'values': [values for values, _ in columns],
+                    'codes': [encode_array(codes, codes.dtype.name, lazy)
+                              for _, codes in columns]}
+        return headers, metadata
+
+    def _validate_custom_axes(self, mf, custom_axes):
+        """Validate the custom axes and convert them to numbers
+
+        Parameters
+        ----------
+        mf : pd.DataFrame
+            The sample metadata.
+        custom_axes : list of str
+            The custom axes to extract from the metadata.
+
+        Returns
+        -------
+        pd.DataFrame
+            The custom axes columns as numeric types.
+
+        Raises
+        ------
+        KeyError
+            If one or more of the ``custom_axes`` names are not present in the
+            sample information.
+        ValueError
+            If any of the ``custom_axes`` have non-numeric values.
+
+        Notes
+        -----
+        Only the custom axes columns are copied, instead of the whole metadata
+        (see ``emperor.util.validate_and_process_custom_axes``).
+        """
+        # missing columns are reported by validate_and_process_custom_axes
+        present = [axis for axis in dict.fromkeys(custom_axes)
+                   if axis in mf.columns]
+
+        return validate_and_process_custom_axes(mf[present], custom_axes)
+
+    def _encode_metadata(self, mf, custom_axes=None, repeats=0):
+        """Dictionary-encode the index and each column of a DataFrame
+
+        Parameters
+        ----------
+        mf : pd.DataFrame
+            DataFrame with the metadata, this can be feature or sample
+            metadata. If the index name is ``None``, then it will be set as
+            ``'SampleID'``, otherwise it will be left untouched.
+        custom_axes : list of str or pd.DataFrame, optional
+            Custom axes to embed in the ordination, or the custom axes columns
+            as returned by ``_validate_custom_axes``.
+        repeats : int
+            Number of times that the sample ids should be repeated. This is
+            used exclusively for procrustes plots. If the procrustes_names
+            property is available a column will be added with each procrustes
+            name.
+
+        Returns
+        -------
+        list of str
+            Name of the metadata columns and the index name.
+        list of tuple
+            The unique values (as strings) and the codes of the index and of
+            each column, as returned by ``emperor.util.encode_categories``.
         """
-        # there's a bug in old versions of Pandas that won't allow us to rename
-        # a DataFrame's index, newer versions i.e 0.18 work just fine but 0.14
-        # would overwrite the name and simply set it as None
         if mf.index.name is None:
             index_name = 'SampleID'
         else:
             index_name = mf.index.name
 
-        if custom_axes:
-            mf = validate_and_process_custom_axes(mf, custom_axes)
+        if isinstance(custom_axes, pd.DataFrame):
+            axes = custom_axes
+        elif custom_axes:
+            axes = self._validate_custom_axes(mf, custom_axes)
+        else:
+            axes = None
+
+        headers = [index_name] + mf.columns.astype(str).tolist()
 
         if repeats:
-            mfs = []
-            # repeats and the original
-            for i in range(repeats + 1):
-                mfs.append(mf.copy())
-                mfs[i].index = pd.Index(mfs[i].index + '_%d' % i,
-                                        name=mfs[i].index.name)
+            ids = pd.Index(np.concatenate([mf.index.astype(str) + '_%d' % i
+                                           for i in range(repeats + 1)]))
+        else:
+            ids = mf.index
 
-                # add to be able to differentiate between ordinations
-                if self.procrustes_names:
-                    mfs[i]['__Procrustes_Names__'] = self.procrustes_names[i]
+        columns = [encode_categories(ids)]
+        for column in mf.columns:
+            # the custom axes are represented by their numeric values
+            if axes is not None and column in axes.columns:
+                values, codes = encode_categories(axes[column])
+            else:
+                values, codes = encode_categories(mf[column])
 
-            mf = pd.concat(mfs)
+            # the unique values are the same for all the repeats, so only the
+            # codes need to be tiled (same as concatenating the copies)
+            columns.append((values, np.tile(codes, repeats + 1)))
 
-        # create a list of lists representation for the entire dataframe
-        headers = [index_name] + mf.columns.astype(str).tolist()
-        metadata = mf.reset_index().astype(str).values.tolist()
-        return headers, metadata
+        # add to be able to differentiate between ordinations
+        if repeats and self.procrustes_names:
+            headers.append('__Procrustes_Names__')
+            columns.append(encode_categories(
+                pd.Index(self.procrustes_names[:repeats + 1]).repeat(len(mf))))
+
+        return headers, columns
 
     def _base_data_checks(self, category, data, d_type):
         """Perform common checks in the methods that modify the plot
@@ -5,6 +5,8 @@ define([
 function(_, trajectory) {
   var getSampleNamesAndDataForSortedTrajectories =
     trajectory.getSampleNamesAndDataForSortedTrajectories;
+  var getSampleNamesAndDataForPrecomputedTrajectories =
+    trajectory.getSampleNamesAndDataForPrecomputedTrajectories;
   var getMinimumDelta = trajectory.getMinimumDelta;
   var TrajectoryOfSamples = trajectory.TrajectoryOfSamples;
 
@@ -38,6 +40,11 @@ function(_, trajectory) {
    * usually be BODY_SITE, HOST_SUBJECT_ID, etc..
    * @param {speed} Positive real number determining the speed of an animation,
    * this is reflected in the number of frames produced for each time interval.
+   * @param {Object} [precomputed = null] The trajectories precomputed by
+   * Emperor for the same gradient and trajectory categories (see
+   * `DecompositionModel.trajectories`). When provided, the samples are not
+   * grouped and sorted, and the minimum delta is not computed, instead only
+   * the coordinates of the samples are looked up in `coordinatesData`.
    *
    * @return {AnimationDirector} returns an animation director if the parameters
    * passed in were all valid.
@@ -47,11 +54,12 @@ function(_, trajectory) {
    * - One of the input arguments is undefined.
    * - If gradientCategory is not in the mappingFileHeaders.
    * - If trajectoryCategory is not in the mappingFileHeaders.
+   * - If the precomputed trajectories are for different categories.
    * @constructs AnimationDirector
    */
   function AnimationDirector(mappingFileHeaders, mappingFileData,
                              coordinatesData, gradientCategory,
-                             trajectoryCategory, speed) {
+                             trajectoryCategory, speed, precomputed) {
 
     // all arguments are required
     if (mappingFileHeaders === undefined || mappingFileData === undefined ||
@@ -79,6 +87,14 @@ function(_, trajectory) {
                       'zero');
     }
 
+    precomputed = precomputed === undefined ? null : precomputed;
+    if (precomputed !== null &&
+        (precomputed.gradient !== gradientCategory ||
+         precomputed.trajectory !== trajectoryCategory)) {
+      throw new Error('The precomputed trajectories are for a different ' +
+                      'gradient or trajectory category');
+    }
+
     /**
      * @type {String[]}
      mappingFileHeaders an Array of strings containing metadata mapping file
@@ -116,6 +132,13 @@ function(_, trajectory) {
      * usually be BODY_SITE, HOST_SUBJECT_ID, etc..
      */
     this.trajectoryCategory = trajectoryCategory;
+    /**
+     * @type {Object}
+     * The trajectories precomputed by Emperor, or null if the trajectories
+     * are computed from the mapping file data.
+     * @default null
+     */
+    this.precomputed = precomputed;
 
     /**
      * @type {Float}
@@ -186,18 +209,26 @@ function(_, trajectory) {
     var coordinatesBuffer = [];
     var chewedDataBuffer = null;
 
-    // compute a dictionary from where we will extract the germane data
-    chewedData = getSampleNamesAndDataForSortedTrajectories(
-        this.mappingFileHeaders, this.mappingFileData, this.coordinatesData,
-        this.trajectoryCategory, this.gradientCategory);
-
-    if (chewedData === null) {
-      throw new Error('Error initializing the trajectories, could not ' +
-                      'compute the data');
+    if (this.precomputed !== null) {
+      // the samples are already grouped and sorted
+      chewedData = getSampleNamesAndDataForPrecomputedTrajectories(
+          this.precomputed, this.coordinatesData);
+      this.minimumDelta = this.precomputed.minimumDelta;
     }
+    else {
+      // compute a dictionary from where we will extract the germane data
+      chewedData = getSampleNamesAndDataForSortedTrajectories(
+          this.mappingFileHeaders, this.mappingFileData, this.coordinatesData,
+          this.trajectoryCategory, this.gradientCategory);
+
+      if (chewedData === null) {
+        throw new Error('Error initializing the trajectories, could not ' +
+                        'compute the data');
+      }
 
-    // calculate the minimum delta per step
-    this.minimumDelta = getMinimumDelta(chewedData);
+      // calculate the minimum delta per step
+      this.minimumDelta = getMinimumDelta(chewedData);
+    }
 
     // we have to iterate over the keys because chewedData is a dictionary-like
     // object, if possible this should be changed in the future to be an Array
@@ -324,8 +355,7 @@ function(_, trajectory) {
 
     // retrieve the length of all the trajectories
     for (var index = 0; index < this.trajectories.length; index++) {
-      arrayOfLengths.push(
-          this.trajectories[index].interpolatedCoordinates.length);
+      arrayOfLengths.push(this.trajectories[index].interpolatedLength);
     }
 
     // assign the value of the maximum value for these lengths
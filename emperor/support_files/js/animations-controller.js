@@ -6,12 +6,13 @@ define([
     'animationdirector',
     'draw',
     'color-editor',
-    'colorviewcontroller'
+    'colorviewcontroller',
+    'util'
 ], function($, _, DecompositionView, ViewControllers, AnimationDirector,
-            draw, Color, ColorViewController) {
+            draw, Color, ColorViewController, util) {
   var EmperorViewController = ViewControllers.EmperorViewController;
   var drawTrajectoryLineStatic = draw.drawTrajectoryLineStatic;
-  var drawTrajectoryLineDynamic = draw.drawTrajectoryLineDynamic;
+  var makeTubeSegments = draw.makeTubeSegments;
   var disposeTrajectoryLineStatic = draw.disposeTrajectoryLineStatic;
   var disposeTrajectoryLineDynamic = draw.disposeTrajectoryLineDynamic;
   var updateStaticTrajectoryDrawRange = draw.updateStaticTrajectoryDrawRange;
@@ -121,6 +122,13 @@ define([
     this.director = null;
     this.playing = false;
 
+    /**
+     * @type {FrameTimer}
+     * Time spent updating the trajectories in each frame of the animation
+     * (see `drawFrame`), reset when an animation starts.
+     */
+    this.frameTimer = new util.FrameTimer();
+
     /**
      * @type {Slick.Grid}
      * Container that lists the trajectories and their colors
@@ -393,15 +401,21 @@ define([
    * @private
    */
   AnimationsController.prototype._updateGrid = function() {
-    var category = this.getTrajectoryCategory(), colors, values;
+    var category = this.getTrajectoryCategory(), scope = this;
+    var decomp = this.getView().decomp;
+
+    // both categories are needed to animate, so load them at the same time
+    decomp.loadMetadata([this.getGradientCategory(), category], function() {
+      var values, colors;
 
-    values = this.getView().decomp.getUniqueValuesByCategory(category);
-    colors = ColorViewController.getColorList(values,
-                                              'discrete-coloring-qiime',
-                                              true, false)[0];
+      values = decomp.getUniqueValuesByCategory(category);
+      colors = ColorViewController.getColorList(values,
+                                                'discrete-coloring-qiime',
+                                                true, false)[0];
 
-    this.setColors(colors);
-    this.resize();
+      scope.setColors(colors);
+      scope.resize();
+    });
   };
 
   /**
@@ -465,6 +479,28 @@ define([
     }
   };
 
+  /**
+   *
+   * Remove the dynamic tubes from the scene and release their resources.
+   *
+   * @private
+   */
+  AnimationsController.prototype._disposeDynamicTubes = function() {
+    var view = this.getView();
+
+    view.dynamicTubes.forEach(function(tube) {
+      if (tube === undefined || tube === null) {
+        return;
+      }
+      if (tube.parent !== null) {
+        tube.parent.remove(tube);
+      }
+      disposeTrajectoryLineDynamic(tube);
+    });
+
+    view.dynamicTubes = [];
+  };
+
   /**
    *
    * Callback method executed when the Rewind button is clicked.
@@ -483,15 +519,9 @@ define([
         disposeTrajectoryLineStatic(tube);
       }
     });
-    view.dynamicTubes.forEach(function(tube) {
-      if (tube !== null && tube.parent !== null) {
-        tube.parent.remove(tube);
-        disposeTrajectoryLineDynamic(tube);
-      }
-    });
+    this._disposeDynamicTubes();
 
     view.staticTubes = [];
-    view.dynamicTubes = [];
 
     view.needsUpdate = true;
 
@@ -539,7 +569,7 @@ define([
     }
 
     var headers, data = {}, positions = {}, gradient, trajectory, decomp, p;
-    var view, marker, pos, speed;
+    var view, marker, pos, speed, precomputed = null;
 
     view = this.getView();
     decomp = this.getView().decomp;
@@ -555,25 +585,47 @@ define([
 
     speed = this.getSpeed();
 
-    for (var i = 0; i < decomp.plottable.length; i++) {
-      p = decomp.plottable[i];
+    // use the trajectories computed by Emperor if they match the selection
+    if (decomp.trajectories !== null &&
+        decomp.trajectories.gradient === gradient &&
+        decomp.trajectories.trajectory === trajectory) {
+      precomputed = decomp.trajectories;
+    }
 
-      data[p.name] = p.metadata;
+    // get the view's position, not the metadata's position
+    function addPosition(i) {
+      var name = decomp.ids[i];
 
-      // get the view's position, not the metadata's position
-      positions[p.name] = {
-        'name': p.name, 'color': 0,
-        'x': p.coordinates[x] * view.axesOrientation[0],
-        'y': p.coordinates[y] * view.axesOrientation[1],
-        'z': is2D ? 0 : (p.coordinates[z] * view.axesOrientation[2])
+      positions[name] = {
+        'name': name, 'color': 0,
+        'x': decomp.getCoordinate(i, x) * view.axesOrientation[0],
+        'y': decomp.getCoordinate(i, y) * view.axesOrientation[1],
+        'z': is2D ? 0 : (decomp.getCoordinate(i, z) * view.axesOrientation[2])
       };
     }
 
+    if (precomputed !== null) {
+      // the director only needs the positions of the samples in the
+      // trajectories, and doesn't read the metadata
+      for (var j = 0; j < precomputed.indices.length; j++) {
+        addPosition(precomputed.indices[j]);
+      }
+    }
+    else {
+      for (var i = 0; i < decomp.length; i++) {
+        p = decomp.getPlottable(i);
+
+        data[p.name] = p.metadata;
+        addPosition(i);
+      }
+    }
+
     this.director = new AnimationDirector(headers, data, positions, gradient,
-                                          trajectory, speed);
+                                          trajectory, speed, precomputed);
 
     this.director.updateFrame();
     this._currentFrame = 0;
+    this.frameTimer.reset();
 
     this.playing = true;
     this._updateButtons();
@@ -600,18 +652,21 @@ define([
       return;
     }
 
-    var view = this.getView(), tube, scope = this, color;
+    var view = this.getView(), color, segments, segment, trajectory;
+    var count = 0;
+
+    this.frameTimer.start();
 
     var radius = view.getGeometryFactor();
     radius *= 0.45 * this.getRadius();
 
     for (var i = 0; i < this.director.trajectories.length; i++) {
-      var trajectory = this.director.trajectories[i];
+      trajectory = this.director.trajectories[i];
 
       //Ensure static tubes are constructed
       if (view.staticTubes[i] === null || view.staticTubes[i] === undefined)
       {
-        var color = this._colors[trajectory.metadataCategoryName] || 'red';
+        color = this._colors[trajectory.metadataCategoryName] || 'red';
         view.staticTubes[i] = drawTrajectoryLineStatic(trajectory,
                                                        color,
                                                        radius);
@@ -622,31 +677,34 @@ define([
                                       view.staticTubes[i]);
     }
 
-    //Remove any old dynamic tubes from the scene
-    view.dynamicTubes.forEach(function(tube) {
-      if (tube === undefined || tube === null) {
-        return;
-      }
-      if (tube.parent !== null) {
-        tube.parent.remove(tube);
-        disposeTrajectoryLineDynamic(tube);
-      }
-    });
+    //The interpolated segment of each trajectory for the current frame is
+    //written in place into a single pool of tubes, the pool is only replaced
+    //if it can't fit all the trajectories
+    segments = view.dynamicTubes[0];
+    if (segments === undefined || segments === null ||
+        segments.capacity < this.director.trajectories.length) {
+      this._disposeDynamicTubes();
+      segments = makeTubeSegments(this.director.trajectories.length);
+      view.dynamicTubes = [segments];
+    }
 
     if (this.UIState['view.viewType'] !== 'parallel-plot') {
-      //Construct new dynamic tubes containing necessary
-      //interpolated segment for the current frame
-      view.dynamicTubes = this.director.trajectories.map(function(trajectory) {
-        var color = scope._colors[trajectory.metadataCategoryName] || 'red';
-        var tube = drawTrajectoryLineDynamic(trajectory,
-                                    scope.director.currentFrame,
-                                    color,
-                                    radius);
-        return tube;
-      });
+      for (i = 0; i < this.director.trajectories.length; i++) {
+        trajectory = this.director.trajectories[i];
+        segment = trajectory.interpolatedSegmentAtIndex(
+          this.director.currentFrame);
+
+        if (segment !== null) {
+          color = this._colors[trajectory.metadataCategoryName] || 'red';
+          segments.setSegmentAtIndex(count, segment, radius, color);
+          count += 1;
+        }
+      }
     }
+    segments.segmentsNeedUpdate(count);
 
     view.needsUpdate = true;
+    this.frameTimer.stop();
 
     if (this.director.currentFrameIsGradientPoint()) {
       this.dispatchEvent({type: 'animation-new-frame-started', message: {
@@ -31,6 +31,27 @@ define([
   var TAB_ORDER = ['color', 'visibility', 'opacity', 'scale',
                    'shape', 'axes', 'animations'];
 
+  var RENDER_MODES = ['meshes', 'instanced', 'point-cloud'];
+
+  var RENDER_THRESHOLDS = {
+    'instancing': 'view.instancingThreshold',
+    'point_cloud': 'view.pointCloudThreshold',
+    'svg_warning': 'view.svgWarningThreshold'
+  };
+
+  var BANNER_CSS = {
+    'padding': '2px',
+    'font-style': '9pt helvetica',
+    'color': 'white',
+    'border': '1px solid',
+    'border-color': 'white',
+    'position': 'absolute',
+    '-webkit-user-select': 'none',
+    '-moz-user-select': 'none',
+    '-ms-user-select': 'none',
+    'user-select': 'none'
+  };
+
   var controllerConstructors = {
       'color': ColorViewController,
       'visibility': VisibilityController,
@@ -58,19 +79,58 @@ define([
    * @param {node} [webglcanvas = undefined] the canvas to use to render the
    * information. This parameter is optional, and should rarely be set. But is
    * useful for external applications like SAGE2.
+   * @param {string} [info] Information to be displayed in the plot banner.
+   * @param {string} [renderMode = 'auto'] How the samples are drawn, one of
+   * `'meshes'` (one mesh per sample), `'instanced'` (one instanced mesh per
+   * shape), `'point-cloud'` (a single cloud of points) or `'auto'` (the
+   * mode is chosen based on the number of samples and `renderThresholds`).
+   * @param {Object} [renderThresholds] Number of samples above which the
+   * `'auto'` mode uses instanced meshes (`instancing`) or a point cloud
+   * (`point_cloud`), and from which exporting an SVG file has to be
+   * confirmed (`svg_warning`). Missing values default to the values in
+   * UIState.
    *
    * @return {EmperorController}
    * @constructs EmperorController
    *
    */
-  function EmperorController(scatter, biplot, divId, webglcanvas, info) {
+  function EmperorController(scatter, biplot, divId, webglcanvas, info,
+                             renderMode, renderThresholds) {
 
     /**
      * The state shared across one instance of the UI
      * @type {UIState}
      */
     this.UIState = new UIStateInit();
-    this.UIState.setProperty('view.usesPointCloud', scatter.length > 20000);
+
+    // the thresholds have to be set before the views and the UI are built
+    _.each(renderThresholds, function(value, key) {
+      if (RENDER_THRESHOLDS[key] === undefined) {
+        throw new Error('Unknown rendering threshold: ' + key);
+      }
+      this.UIState.setProperty(RENDER_THRESHOLDS[key], value);
+    }, this);
+
+    renderMode = renderMode || 'auto';
+    if (renderMode === 'auto') {
+      if (scatter.length > this.UIState['view.pointCloudThreshold']) {
+        renderMode = 'point-cloud';
+      }
+      else if (scatter.length > this.UIState['view.instancingThreshold']) {
+        renderMode = 'instanced';
+      }
+      else {
+        renderMode = 'meshes';
+      }
+    }
+    if (RENDER_MODES.indexOf(renderMode) === -1) {
+      throw new Error('Unknown rendering mode: ' + renderMode);
+    }
+
+    this.UIState.setProperty('view.usesPointCloud',
+                             renderMode === 'point-cloud');
+    this.UIState.setProperty('view.usesInstancing',
+                             renderMode === 'instanced');
 
     var scope = this;
     /**
@@ -158,16 +218,7 @@ define([
      * @type {node}
      */
     this.$plotBanner = $('<label>Loading ...</label>');
-    this.$plotBanner.css({'padding': '2px',
-                          'font-style': '9pt helvetica',
-                          'color': 'white',
-                          'border': '1px solid',
-                          'border-color': 'white',
-                          'position': 'absolute',
-                          '-webkit-user-select': 'none',
-                          '-moz-user-select': 'none',
-                          '-ms-user-select': 'none',
-                          'user-select': 'none'});
+    this.$plotBanner.css(BANNER_CSS);
 
     // add the sample count to the plot space
     this.$plotSpace.append(this.$plotBanner);
@@ -582,6 +633,38 @@ define([
     return this.$plotBanner.text();
   };
 
+  /**
+   *
+   * Show the progress of the data loading in a banner.
+   *
+   * The data is loaded before the controller is created (see the `loader`
+   * module), so the banner is added to the loading screen of the plot's div,
+   * and it is hidden together with the loading screen when the plot is ready.
+   *
+   * @param {string} divId The id of the div where the plot will be shown.
+   * @param {float} fraction The fraction of the data that has been loaded, a
+   * number between 0 and 1.
+   *
+   * @return {node} The banner (jQuery object).
+   *
+   */
+  EmperorController.updateLoadingBanner = function(divId, fraction) {
+    var $loading = $('#' + divId).find('.loading'),
+        $banner = $loading.find('.emperor-loading-banner');
+
+    if ($banner.length === 0) {
+      $banner = $("<label class='emperor-loading-banner'></label>");
+      $banner.css(BANNER_CSS);
+      // below the logo instead of on top of it
+      $banner.css({'color': 'gray', 'border-color': 'gray',
+                   'position': 'relative'});
+      $loading.append($banner);
+    }
+
+    $banner.text('Loading ... ' + Math.round(fraction * 100) + '%');
+    return $banner;
+  };
+
   /**
    *
    * Helper method to check if all the view controllers have finished loading.
@@ -609,11 +692,16 @@ define([
    *
    */
   EmperorController.prototype._buildUI = function() {
-    var scope = this, isLargeDataset = this.UIState['view.usesPointCloud'];
+    var scope = this, usesPointCloud = this.UIState['view.usesPointCloud'];
+
+    // point clouds and instanced meshes can't be drawn by the canvas and SVG
+    // renderers
+    var isLargeDataset = usesPointCloud ||
+                         this.UIState['view.usesInstancing'];
 
     for (var index in TAB_ORDER) {
       var item = TAB_ORDER[index];
-      if (item === 'shape' && isLargeDataset)
+      if (item === 'shape' && usesPointCloud)
         continue;
       scope.controllers[item] = scope.addTab(scope.sceneViews[0].decViews,
                                              controllerConstructors[item]);
@@ -702,12 +790,14 @@ define([
                   alert('File given is not a JSON parsable file.');
                   return;
                 }
-                try {
-                  scope.loadConfig(json);
-                } catch (err) {
-                  alert('Error loading settings from file: ' + err.message);
-                  return;
-                }
+                scope.loadMetadata(function() {
+                  try {
+                    scope.loadConfig(json);
+                  } catch (err) {
+                    alert('Error loading settings from file: ' +
+                          err.message);
+                  }
+                });
               };
               r.readAsText(f);
             });
@@ -798,9 +888,11 @@ define([
     if (type === 'png') {
       var pngRenderer;
 
-      // Point clouds can't be rendered by the CanvasRenderer, therefore we
-      // have to use the WebGLRenderer and can't increase the image size.
+      // Point clouds and instanced meshes can't be rendered by the
+      // CanvasRenderer, therefore we have to use the WebGLRenderer and can't
+      // increase the image size.
       if (this.UIState['view.usesPointCloud'] ||
+          this.UIState['view.usesInstancing'] ||
           this.UIState['view.viewType'] === 'parallel-plot') {
         pngRenderer = this.sceneViews[0].renderer;
       }
@@ -826,7 +918,8 @@ define([
     }
     else if (type === 'svg') {
       // confirm box based on number of samples: better safe than sorry
-      if (this.decViews.scatter.decomp.length >= 9000) {
+      if (this.decViews.scatter.decomp.length >=
+          this.UIState['view.svgWarningThreshold']) {
         if (confirm('This number of samples could take a long time and in ' +
            'some computers the browser will crash. If this happens we ' +
            'suggest to use the png implementation. Do you want to ' +
@@ -929,6 +1022,32 @@ define([
     saveAs(blob, 'emperor-settings.json');
    };
 
+  /**
+   *
+   * Make sure all the metadata in the decomposition views is available.
+   *
+   * Metadata can be loaded on demand (see `DecompositionModel.loadMetadata`),
+   * however some features like loading a settings file or exporting the plot
+   * need all the metadata categories.
+   *
+   * @param {Function} callback Function executed once all the metadata is
+   * loaded, this is executed synchronously if the metadata is available.
+   *
+   */
+  EmperorController.prototype.loadMetadata = function(callback) {
+    var decomps = _.pluck(_.values(this.decViews), 'decomp'), pending;
+
+    pending = decomps.length;
+    _.each(decomps, function(decomp) {
+      decomp.loadMetadata(decomp.md_headers, function() {
+        pending -= 1;
+        if (pending === 0) {
+          callback();
+        }
+      });
+    });
+  };
+
   /**
    *
    * Load a settings file and set all controller variables.
@@ -1072,14 +1191,18 @@ define([
    *
    */
   EmperorController.prototype.exportToVega = function() {
-    var url = 'https://vega.github.io/editor/';
-    var spec = this.decViews.scatter._buildVegaSpec();
-    var payload = {
-      mode: 'vega',
-      renderer: 'canvas',
-      spec: JSON.stringify(spec)
-    };
-    _postMessage(url, payload);
+    var url = 'https://vega.github.io/editor/', scope = this;
+
+    // the specification includes all the metadata
+    this.loadMetadata(function() {
+      var spec = scope.decViews.scatter._buildVegaSpec();
+      var payload = {
+        mode: 'vega',
+        renderer: 'canvas',
+        spec: JSON.stringify(spec)
+      };
+      _postMessage(url, payload);
+    });
   };
 
   return EmperorController;
@@ -16,27 +16,42 @@ define(['underscore', 'three', 'jquery'], function(_, THREE, $) {
    *
    * [This answer]{@link http://stackoverflow.com/a/18580832/379593} on
    * StackOverflow helped a lot.
+   *
+   * @param {Float32Array|THREE.Vector3[]} points The x, y and z values of
+   * each point in the trajectory one after the other (as in
+   * `TrajectoryOfSamples.positions`), or an Array of vectors.
+   *
    * @return {EmperorTrajectory}
    * @extends THREE.Curve
    */
   THREE.EmperorTrajectory = THREE.Curve.create(
       function(points) {
-        this.points = (points === undefined) ? [] : points;
+        var positions = points === undefined ? [] : points;
+
+        if (!ArrayBuffer.isView(positions)) {
+          positions = new Float32Array(positions.length * 3);
+          for (var i = 0; i < points.length; i++) {
+            points[i].toArray(positions, i * 3);
+          }
+        }
+
+        this.positions = positions;
       },
 
-      function(t) {
-        var points = this.points;
-        var index = (points.length - 1) * t;
-        var floorIndex = Math.floor(index);
+      function(t, optionalTarget) {
+        var positions = this.positions, count = positions.length / 3;
+        var index = (count - 1) * t;
+        var floorIndex = Math.floor(index), alpha = index - floorIndex;
+        var point = optionalTarget || new THREE.Vector3(), i = floorIndex * 3;
 
-        if (floorIndex == points.length - 1) {
-          return points[floorIndex];
+        if (floorIndex >= count - 1) {
+          return point.fromArray(positions, (count - 1) * 3);
         }
 
-        var floorPoint = points[floorIndex];
-        var ceilPoint = points[floorIndex + 1];
-
-        return floorPoint.clone().lerp(ceilPoint, index - floorIndex);
+        return point.set(
+          positions[i] + (positions[i + 3] - positions[i]) * alpha,
+          positions[i + 1] + (positions[i + 4] - positions[i + 1]) * alpha,
+          positions[i + 2] + (positions[i + 5] - positions[i + 2]) * alpha);
       }
       );
 
@@ -227,6 +242,38 @@ define(['underscore', 'three', 'jquery'], function(_, THREE, $) {
     vertices[(i * 6) + 5] = end[2];
   };
 
+  /**
+   *
+   * Flag a range of lines so their vertices are sent to the GPU.
+   *
+   * Only the vertices in the range are uploaded. If a range was flagged but
+   * the lines have not been rendered yet, both ranges are merged.
+   *
+   * @param {Integer} [first = 0] The index of the first line that changed.
+   * @param {Integer} [last] The index of the last line that changed, defaults
+   * to the last line in the collection.
+   */
+  EmperorLineSegments.prototype.linesNeedUpdate = function(first, last) {
+    var attribute = this.geometry.attributes.position,
+        range = attribute.updateRange, start, end;
+
+    first = first === undefined ? 0 : first;
+    last = last === undefined ? (attribute.count / 2) - 1 : last;
+
+    start = first * 6;
+    end = (last + 1) * 6;
+
+    // the renderer resets the count once a range is uploaded
+    if (range.count !== -1) {
+      start = Math.min(start, range.offset);
+      end = Math.max(end, range.offset + range.count);
+    }
+
+    range.offset = start;
+    range.count = end - start;
+    attribute.needsUpdate = true;
+  };
+
   /**
    *
    * Create a collection of disconnected lines.
@@ -260,10 +307,12 @@ define(['underscore', 'three', 'jquery'], function(_, THREE, $) {
 
     }
 
+    // 16 bit indices can only address 65536 vertices
     var indices = _.range(vertices.length);
+    var IndexArray = vertices.length > 65536 ? Uint32Array : Uint16Array;
     var geometry = new THREE.BufferGeometry();
     geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3));
-    geometry.setIndex(new THREE.BufferAttribute(new Uint16Array(indices), 1));
+    geometry.setIndex(new THREE.BufferAttribute(new IndexArray(indices), 1));
 
     return new EmperorLineSegments(geometry, material);
   }
@@ -303,36 +352,238 @@ define(['underscore', 'three', 'jquery'], function(_, THREE, $) {
     return arrow;
   }
 
+  // vertices and indices of the tube drawn for each segment by
+  // EmperorTubeSegments, one ring of vertices per tube segment boundary
+  var TUBE_RING_VERTICES = NUM_TUBE_CROSS_SECTION_POINTS;
+  var TUBE_VERTICES = (NUM_TUBE_SEGMENTS + 1) * TUBE_RING_VERTICES;
+  var TUBE_INDICES = NUM_TUBE_SEGMENTS * TUBE_RING_VERTICES * 6;
+
+  // the cross section is the same for every tube
+  var TUBE_COS = new Float32Array(TUBE_RING_VERTICES);
+  var TUBE_SIN = new Float32Array(TUBE_RING_VERTICES);
+  for (var k = 0; k < TUBE_RING_VERTICES; k++) {
+    TUBE_COS[k] = Math.cos((k / TUBE_RING_VERTICES) * Math.PI * 2);
+    TUBE_SIN[k] = Math.sin((k / TUBE_RING_VERTICES) * Math.PI * 2);
+  }
+
+  /**
+   *
+   * @class EmperorTubeSegments
+   *
+   * A pool of straight tubes stored in a single buffer geometry. The tubes
+   * are rewritten in place, and only the tubes in use are drawn (see
+   * `segmentsNeedUpdate`), so animating the last segment of many trajectories
+   * doesn't allocate new geometries, materials or GPU buffers every frame.
+   *
+   * Each tube has the same number of segments and cross section points as
+   * the tubes made by `drawTrajectoryLineDynamic`.
+   *
+   * @param {Integer} capacity The maximum number of tubes in the pool.
+   *
+   * @return {EmperorTubeSegments}
+   * @extends THREE.Mesh
+   */
+  function EmperorTubeSegments(capacity) {
+    var geometry = new THREE.BufferGeometry(), indices, IndexArray, a, b, i;
+    var r, k, next, offset = 0;
+
+    /**
+     * The maximum number of tubes in the pool.
+     * @type {Integer}
+     */
+    this.capacity = capacity;
+    /**
+     * The number of tubes that are drawn.
+     * @type {Integer}
+     */
+    this.count = 0;
+
+    // the triangles are the same for every tube, only shifted
+    IndexArray = capacity * TUBE_VERTICES > 65536 ? Uint32Array : Uint16Array;
+    indices = new IndexArray(capacity * TUBE_INDICES);
+    for (i = 0; i < capacity; i++) {
+      for (r = 0; r < NUM_TUBE_SEGMENTS; r++) {
+        for (k = 0; k < TUBE_RING_VERTICES; k++) {
+          next = (k + 1) % TUBE_RING_VERTICES;
+          a = i * TUBE_VERTICES + r * TUBE_RING_VERTICES;
+          b = a + TUBE_RING_VERTICES;
+
+          indices[offset++] = a + k;
+          indices[offset++] = b + k;
+          indices[offset++] = a + next;
+          indices[offset++] = b + k;
+          indices[offset++] = b + next;
+          indices[offset++] = a + next;
+        }
+      }
+    }
+
+    _.each(['position', 'normal', 'color'], function(name) {
+      var attribute = new THREE.BufferAttribute(
+        new Float32Array(capacity * TUBE_VERTICES * 3), 3);
+      attribute.setUsage(THREE.DynamicDrawUsage);
+      geometry.setAttribute(name, attribute);
+    });
+    geometry.setIndex(new THREE.BufferAttribute(indices, 1));
+    geometry.setDrawRange(0, 0);
+
+    THREE.Mesh.call(this, geometry, new THREE.MeshPhongMaterial({
+      vertexColors: true, transparent: false}));
+
+    // the bounding sphere changes every frame
+    this.frustumCulled = false;
+
+    /**
+     * Color of the tube being written.
+     * @type {THREE.Color}
+     * @private
+     */
+    this._color = new THREE.Color();
+
+    return this;
+  }
+  EmperorTubeSegments.prototype = Object.create(THREE.Mesh.prototype);
+  EmperorTubeSegments.prototype.constructor = THREE.Mesh;
+
+  /**
+   *
+   * Write a tube in the pool.
+   *
+   * @param {Integer} i The index of the tube.
+   * @param {Float32Array} segment The x, y and z values of the start and end
+   * of the tube, as returned by
+   * `TrajectoryOfSamples.interpolatedSegmentAtIndex`.
+   * @param {Float} radius The radius of the tube.
+   * @param {THREE.Color|String|Integer} color The color of the tube.
+   */
+  EmperorTubeSegments.prototype.setSegmentAtIndex = function(i, segment,
+                                                             radius, color) {
+    var attributes = this.geometry.attributes,
+        positions = attributes.position.array,
+        normals = attributes.normal.array, colors = attributes.color.array;
+    var dx = segment[3] - segment[0], dy = segment[4] - segment[1],
+        dz = segment[5] - segment[2];
+    var length = Math.sqrt(dx * dx + dy * dy + dz * dz);
+    var tx = 0, ty = 0, tz = 1, nx, ny, nz, bx, by, bz, norm, t, cx, cy, cz;
+    var offset = i * TUBE_VERTICES * 3, r, k, x, y, z;
+
+    this._color.set(color);
+
+    if (length > 0) {
+      tx = dx / length;
+      ty = dy / length;
+      tz = dz / length;
+    }
+
+    // the normal is perpendicular to the tangent and to the axis where the
+    // tangent is the smallest, as in THREE.Curve.computeFrenetFrames
+    if (Math.abs(tx) <= Math.abs(ty) && Math.abs(tx) <= Math.abs(tz)) {
+      nx = 0; ny = -tz; nz = ty;
+    }
+    else if (Math.abs(ty) <= Math.abs(tz)) {
+      nx = tz; ny = 0; nz = -tx;
+    }
+    else {
+      nx = -ty; ny = tx; nz = 0;
+    }
+    norm = Math.sqrt(nx * nx + ny * ny + nz * nz);
+    nx /= norm;
+    ny /= norm;
+    nz /= norm;
+
+    bx = ty * nz - tz * ny;
+    by = tz * nx - tx * nz;
+    bz = tx * ny - ty * nx;
+
+    for (r = 0; r <= NUM_TUBE_SEGMENTS; r++) {
+      t = r / NUM_TUBE_SEGMENTS;
+      cx = segment[0] + dx * t;
+      cy = segment[1] + dy * t;
+      cz = segment[2] + dz * t;
+
+      for (k = 0; k < TUBE_RING_VERTICES; k++) {
+        x = TUBE_COS[k] * nx + TUBE_SIN[k] * bx;
+        y = TUBE_COS[k] * ny + TUBE_SIN[k] * by;
+        z = TUBE_COS[k] * nz + TUBE_SIN[k] * bz;
+
+        normals[offset] = x;
+        normals[offset + 1] = y;
+        normals[offset + 2] = z;
+
+        positions[offset] = cx + radius * x;
+        positions[offset + 1] = cy + radius * y;
+        positions[offset + 2] = cz + radius * z;
+
+        colors[offset] = this._color.r;
+        colors[offset + 1] = this._color.g;
+        colors[offset + 2] = this._color.b;
+
+        offset += 3;
+      }
+    }
+  };
+
+  /**
+   *
+   * Draw the first tubes in the pool and flag them to be sent to the GPU.
+   *
+   * Only the vertices of the tubes that are drawn are uploaded.
+   *
+   * @param {Integer} count The number of tubes to draw, these should have
+   * been written with `setSegmentAtIndex`.
+   */
+  EmperorTubeSegments.prototype.segmentsNeedUpdate = function(count) {
+    var attributes = this.geometry.attributes;
+
+    this.count = Math.min(count, this.capacity);
+    this.geometry.setDrawRange(0, this.count * TUBE_INDICES);
+
+    _.each([attributes.position, attributes.normal, attributes.color],
+           function(attribute) {
+      attribute.updateRange.offset = 0;
+      attribute.updateRange.count = this.count * TUBE_VERTICES * 3;
+      attribute.needsUpdate = this.count > 0;
+    }, this);
+  };
+
+  /**
+   *
+   * Create a pool of tubes used to draw the last segment of the animated
+   * trajectories.
+   *
+   * @param {Integer} capacity The maximum number of tubes in the pool,
+   * usually the number of trajectories.
+   *
+   * @return {EmperorTubeSegments}
+   * @function makeTubeSegments
+   */
+  function makeTubeSegments(capacity) {
+    return new EmperorTubeSegments(capacity);
+  }
+
   /**
    * Returns a new trajectory line dynamic mesh
    */
   function drawTrajectoryLineDynamic(trajectory, currentFrame, color, radius) {
     // based on the example described in:
     // https://github.com/mrdoob/three.js/wiki/Drawing-lines
-    var material, points = [], lineGeometry, limit = 0, path;
+    var material, lineGeometry, path;
 
-    var _trajectory = trajectory.representativeInterpolatedCoordinatesAtIndex(
-        currentFrame
-    );
-    if (_trajectory === null || _trajectory.length == 0)
+    // the segment is reused by the trajectory, so it's copied
+    var segment = trajectory.interpolatedSegmentAtIndex(currentFrame);
+    if (segment === null)
       return null;
 
     material = new THREE.MeshPhongMaterial({
         color: color,
         transparent: false});
 
-    for (var index = 0; index < _trajectory.length; index++) {
-      points.push(new THREE.Vector3(_trajectory[index].x,
-                  _trajectory[index].y, _trajectory[index].z));
-    }
-
-    path = new THREE.EmperorTrajectory(points);
+    path = new THREE.EmperorTrajectory(segment.slice());
 
     // the line will contain the two vertices and the described material
     // we increase the number of points to have a smoother transition on
     // edges i. e. where the trajectory changes the direction it is going
-    lineGeometry = new THREE.TubeGeometry(path,
-                                    (points.length - 1) * NUM_TUBE_SEGMENTS,
+    lineGeometry = new THREE.TubeGeometry(path, NUM_TUBE_SEGMENTS,
                                     radius,
                                     NUM_TUBE_CROSS_SECTION_POINTS,
                                     false);
@@ -352,26 +603,19 @@ define(['underscore', 'three', 'jquery'], function(_, THREE, $) {
    * Returns a new trajectory line static mesh
    */
   function drawTrajectoryLineStatic(trajectory, color, radius) {
-    var _trajectory = trajectory.coordinates;
-
     var material = new THREE.MeshPhongMaterial({
       color: color,
       transparent: false}
     );
 
-    var allPoints = [];
-    for (var index = 0; index < _trajectory.length; index++) {
-      allPoints.push(new THREE.Vector3(_trajectory[index].x,
-                  _trajectory[index].y, _trajectory[index].z));
-    }
-
-    var path = new THREE.EmperorTrajectory(allPoints);
+    var path = new THREE.EmperorTrajectory(trajectory.positions);
 
     //Tubes are straight segments, but adding vertices along them might change
     //lighting effects under certain models and lighting conditions.
     var tubeBufferGeom = new THREE.TubeBufferGeometry(
                                 path,
-                                (allPoints.length - 1) * NUM_TUBE_SEGMENTS,
+                                (trajectory.coordinates.length - 1) *
+                                NUM_TUBE_SEGMENTS,
                                 radius,
                                 NUM_TUBE_CROSS_SECTION_POINTS,
                                 false);
@@ -525,6 +769,7 @@ define(['underscore', 'three', 'jquery'], function(_, THREE, $) {
           'drawTrajectoryLineStatic': drawTrajectoryLineStatic,
           'disposeTrajectoryLineStatic': disposeTrajectoryLineStatic,
           'drawTrajectoryLineDynamic': drawTrajectoryLineDynamic,
+          'makeTubeSegments': makeTubeSegments,
           'disposeTrajectoryLineDynamic': disposeTrajectoryLineDynamic,
           'updateStaticTrajectoryDrawRange': updateStaticTrajectoryDrawRange,
           'makeLineCollection': makeLineCollection};
@@ -0,0 +1,230 @@
+/** @module loader */
+define(['underscore', 'util'], function(_, util) {
+
+  /**
+   *
+   * Entry point of the Web Worker that decodes the plot data.
+   *
+   * The worker receives an Array of encoded buffers and answers with one
+   * message per decoded buffer (with the `progress` as a fraction), and a
+   * final message with the decoded `arrays` and the `ranges` of the buffers
+   * that requested them (`null` for the rest). The decoded arrays are
+   * transferred instead of copied. If a buffer can't be decoded, the last
+   * message has an `error` attribute instead.
+   *
+   * This function is serialized into the worker's source (see `workerSource`),
+   * so it can't use any other function or library than its arguments.
+   *
+   * @param {DedicatedWorkerGlobalScope} scope The worker's global scope.
+   * @param {Function} decodeArray See `util.decodeArray`.
+   * @param {Function} computeRanges See `util.computeRanges`.
+   * @private
+   *
+   */
+  function workerMain(scope, decodeArray, computeRanges) {
+    scope.onmessage = function(event) {
+      var buffers = event.data.buffers, arrays = [], ranges = [],
+          transfer = [], buffer, i;
+
+      try {
+        for (i = 0; i < buffers.length; i++) {
+          buffer = buffers[i];
+
+          arrays.push(decodeArray(buffer));
+          transfer.push(arrays[i].buffer);
+
+          if (buffer.ranges) {
+            ranges.push(computeRanges(arrays[i], buffer.shape[0],
+                                      buffer.shape[1]));
+          }
+          else {
+            ranges.push(null);
+          }
+
+          scope.postMessage({'progress': (i + 1) / buffers.length});
+        }
+      }
+      catch (error) {
+        scope.postMessage({'error': error.message});
+        return;
+      }
+
+      scope.postMessage({'arrays': arrays, 'ranges': ranges}, transfer);
+    };
+  }
+
+  /**
+   *
+   * Source code of the Web Worker that decodes the plot data.
+   *
+   * The worker is created from a Blob, so it also works in standalone plots
+   * where the support files are not served over HTTP.
+   *
+   * @return {String} The worker's code.
+   * @private
+   *
+   */
+  function workerSource() {
+    return '(' + workerMain.toString() + ')(self, ' +
+           util.decodeArray.toString() + ', ' +
+           util.computeRanges.toString() + ');\n';
+  }
+
+  /**
+   *
+   * Find the encoded buffers in the plot data.
+   *
+   * @param {Object} data The plot data, as embedded by `Emperor`, with a
+   * `plot` and optionally a `biplot` attribute.
+   *
+   * @return {Object[]} An Array of objects with the `target` object and `key`
+   * where each encoded buffer is stored, and whether the `ranges` of the
+   * buffer's columns should be computed (only for the coordinates).
+   * Metadata columns that are not loaded and buffers that are already decoded
+   * are ignored.
+   * @private
+   *
+   */
+  function findEncodedBuffers(data) {
+    var jobs = [];
+
+    function add(target, key, ranges) {
+      var value = target[key];
+      if (util.isEncodedArray(value) && typeof value.data === 'string') {
+        jobs.push({'target': target, 'key': key, 'ranges': ranges});
+      }
+    }
+
+    _.each([data.plot, data.biplot], function(part) {
+      if (part === undefined || part === null) {
+        return;
+      }
+
+      add(part.decomposition, 'coordinates', true);
+      add(part.decomposition, 'ci', false);
+      add(part.decomposition, 'edges', false);
+
+      // dictionary-encoded metadata has one buffer of codes per column
+      if (part.metadata && part.metadata.codes !== undefined) {
+        for (var i = 0; i < part.metadata.codes.length; i++) {
+          add(part.metadata.codes, i, false);
+        }
+      }
+    });
+
+    return jobs;
+  }
+
+  /**
+   *
+   * Check if the browser can decode the plot data in a Web Worker.
+   *
+   * @return {Boolean} `true` if Web Workers can be created from a Blob.
+   * @function supportsWorkers
+   *
+   */
+  function supportsWorkers() {
+    return typeof Worker !== 'undefined' && typeof Blob !== 'undefined' &&
+           typeof URL !== 'undefined' && URL.createObjectURL !== undefined;
+  }
+
+  /**
+   *
+   * Decode the plot data in a Web Worker.
+   *
+   * The base64-encoded buffers (coordinates, confidence intervals, edges and
+   * metadata codes) are decoded off the main thread, and the ranges of the
+   * coordinates are computed alongside, so the page stays responsive while
+   * large plots load. The decoded typed arrays are transferred back to the
+   * main thread without copying them, and replace the `data` of each buffer
+   * (see `util.decodeArray` and `DecompositionModel`).
+   *
+   * If the data has no encoded buffers, or the browser can't run the worker
+   * (for example because a content security policy forbids it), the data is
+   * left untouched and is decoded by `DecompositionModel` instead.
+   *
+   * @param {Object} data The plot data, as embedded by `Emperor`. This
+   * object is modified in place.
+   * @param {Function} callback Function called with the data once it is
+   * ready to be used.
+   * @param {Function} [progress] Function called with the fraction of the
+   * buffers that have been decoded (a number between 0 and 1).
+   * @function loadData
+   *
+   */
+  function loadData(data, callback, progress) {
+    var jobs = findEncodedBuffers(data), finished = false, worker, url;
+
+    if (jobs.length === 0 || !supportsWorkers()) {
+      callback(data);
+      return;
+    }
+
+    function finish(result) {
+      if (finished) {
+        return;
+      }
+      finished = true;
+
+      worker.terminate();
+      URL.revokeObjectURL(url);
+
+      if (result !== null) {
+        _.each(jobs, function(job, i) {
+          var encoded = job.target[job.key];
+
+          job.target[job.key] = {'dtype': encoded.dtype,
+                                 'shape': encoded.shape,
+                                 'data': result.arrays[i]};
+          if (job.ranges) {
+            job.target.dimension_ranges = result.ranges[i];
+          }
+        });
+      }
+
+      callback(data);
+    }
+
+    try {
+      url = URL.createObjectURL(new Blob([workerSource()],
+                                         {'type': 'text/javascript'}));
+      worker = new Worker(url);
+    }
+    catch (error) {
+      if (url !== undefined) {
+        URL.revokeObjectURL(url);
+      }
+      callback(data);
+      return;
+    }
+
+    worker.onmessage = function(event) {
+      if (event.data.progress !== undefined) {
+        if (progress !== undefined) {
+          progress(event.data.progress);
+        }
+      }
+      else if (event.data.error !== undefined) {
+        // the model raises a more informative error for invalid data
+        finish(null);
+      }
+      else {
+        finish(event.data);
+      }
+    };
+    worker.onerror = function(event) {
+      event.preventDefault();
+      finish(null);
+    };
+
+    worker.postMessage({'buffers': _.map(jobs, function(job) {
+      var encoded = job.target[job.key];
+      return {'dtype': encoded.dtype, 'shape': encoded.shape,
+              'data': encoded.data, 'ranges': job.ranges};
+    })});
+  }
+
+  return {'loadData': loadData, 'supportsWorkers': supportsWorkers,
+          '_findEncodedBuffers': findEncodedBuffers,
+          '_workerMain': workerMain, '_workerSource': workerSource};
+});
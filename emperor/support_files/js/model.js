@@ -12,9 +12,14 @@ function($, _, util) {
    * Represents a sample and the associated metadata in the ordination space.
    *
    * @param {string} name A string indicating the name of the sample.
-   * @param {string[]} metadata An Array of strings with the metadata values.
-   * @param {float[]} coordinates An Array of floats indicating the position in
-   * space where this sample is located.
+   * @param {string[]|CategoricalMetadata} metadata An Array of strings with
+   * the metadata values, or the dictionary-encoded metadata of all the samples
+   * in the DecompositionModel, in which case `idx` is the row of the sample.
+   * @param {float[]|DecompositionModel} coordinates An Array of floats
+   * indicating the position in space where this sample is located, or the
+   * DecompositionModel that stores the coordinates and confidence intervals
+   * of all the samples, in which case `idx` is the row of the sample and `ci`
+   * is ignored.
    * @param {integer} [idx = -1] An integer representing the index where the
    * object is located in a DecompositionModel.
    * @param {float[]} [ci = []] An array of floats indicating the confidence
@@ -31,15 +36,19 @@ function($, _, util) {
      */
     this.name = name;
     /**
-     * Metadata values for the sample.
-     * @type {string[]}
+     * Metadata values for the sample, or the dictionary-encoded metadata
+     * shared by all the samples, see the `metadata` property.
+     * @type {string[]|CategoricalMetadata}
+     * @private
      */
-    this.metadata = metadata;
+    this._metadata = metadata;
     /**
-     * Position of the sample in the N-dimensional space.
-     * @type {float[]}
+     * Position of the sample in the N-dimensional space, or the
+     * DecompositionModel that stores it, see the `coordinates` property.
+     * @type {float[]|DecompositionModel}
+     * @private
      */
-    this.coordinates = coordinates;
+    this._coordinates = coordinates;
 
     /**
      * The index of the sample in the array of meshes.
@@ -47,10 +56,19 @@ function($, _, util) {
      */
     this.idx = idx === undefined ? -1 : idx;
     /**
-     * Confidence intervals.
+     * Confidence intervals, `null` if they are stored in a
+     * DecompositionModel, see the `ci` property.
      * @type {float[]}
+     * @private
      */
-    this.ci = ci === undefined ? [] : ci;
+    this._ci = null;
+
+    // the model validates the coordinates and confidence intervals
+    if (coordinates instanceof DecompositionModel) {
+      return;
+    }
+
+    this._ci = ci === undefined ? [] : ci;
 
     if (this.ci.length !== 0) {
       if (this.ci.length !== this.coordinates.length) {
@@ -62,6 +80,63 @@ function($, _, util) {
     }
   };
 
+  /**
+   * Metadata values for the sample.
+   *
+   * If the metadata is dictionary-encoded, the values are decoded every time
+   * this property is read.
+   * @type {string[]}
+   */
+  Object.defineProperty(Plottable.prototype, 'metadata', {
+    get: function() {
+      if (this._metadata instanceof CategoricalMetadata) {
+        return this._metadata.row(this.idx);
+      }
+      return this._metadata;
+    },
+    set: function(metadata) {
+      this._metadata = metadata;
+    }
+  });
+
+  /**
+   * Position of the sample in the N-dimensional space.
+   *
+   * If the plottable belongs to a DecompositionModel, this is a view of the
+   * model's coordinates, no data is copied.
+   * @type {float[]}
+   */
+  Object.defineProperty(Plottable.prototype, 'coordinates', {
+    get: function() {
+      if (this._coordinates instanceof DecompositionModel) {
+        return this._coordinates.getCoordinates(this.idx);
+      }
+      return this._coordinates;
+    },
+    set: function(coordinates) {
+      this._coordinates = coordinates;
+    }
+  });
+
+  /**
+   * Confidence intervals.
+   *
+   * If the plottable belongs to a DecompositionModel, this is a view of the
+   * model's confidence intervals, no data is copied.
+   * @type {float[]}
+   */
+  Object.defineProperty(Plottable.prototype, 'ci', {
+    get: function() {
+      if (this._coordinates instanceof DecompositionModel) {
+        return this._coordinates.getConfidenceIntervals(this.idx);
+      }
+      return this._ci;
+    },
+    set: function(ci) {
+      this._ci = ci;
+    }
+  });
+
   /**
    *
    * Helper method to convert a Plottable into a string.
@@ -92,6 +167,207 @@ function($, _, util) {
     return ret;
   };
 
+  /**
+   * @class CategoricalMetadata
+   *
+   * Dictionary-encoded metadata, where each column is represented by a table
+   * of unique values and an array of codes (one per sample) with the position
+   * of each sample's value in that table.
+   *
+   * @param {Object} metadata An object with a `values` attribute (an Array
+   * with the unique values of each column) and a `codes` attribute (an Array
+   * with an encoded buffer of codes per column), as created by
+   * `emperor.core.Emperor._to_categorical_map`. Columns that are not loaded
+   * yet are represented with `null` in both arrays (see `setColumn`).
+   *
+   * @throws {Error} If the number of value tables and code buffers differ, or
+   * if not all the columns have the same number of codes.
+   *
+   * @return {CategoricalMetadata}
+   * @constructs CategoricalMetadata
+   *
+   */
+  function CategoricalMetadata(metadata) {
+    /**
+     * Unique values for each column.
+     * @type {Array[]}
+     */
+    this.values = metadata.values;
+    /**
+     * Codes for each column, the positions of each sample's value in the
+     * column's unique values.
+     * @type {TypedArray[]}
+     */
+    this.codes = _.map(metadata.codes, function(codes) {
+      return codes === null ? null : util.decodeArray(codes);
+    });
+
+    if (this.values.length !== this.codes.length) {
+      throw new Error('The number of value tables and code arrays do not ' +
+                      'match. Values: ' + this.values.length + ' codes: ' +
+                      this.codes.length);
+    }
+
+    /**
+     * Number of samples (rows) in the metadata, `null` if none of the columns
+     * are loaded.
+     * @type {integer}
+     */
+    this.length = null;
+
+    for (var j = 0; j < this.codes.length; j++) {
+      if (this.codes[j] !== null) {
+        this._checkLength(this.codes[j]);
+      }
+    }
+  }
+
+  /**
+   *
+   * Check that a column of codes has as many values as the rest.
+   *
+   * @param {TypedArray} codes The codes of a column.
+   *
+   * @throws {Error} If the number of codes doesn't match the loaded columns.
+   * @private
+   *
+   */
+  CategoricalMetadata.prototype._checkLength = function(codes) {
+    if (this.length === null) {
+      this.length = codes.length;
+    }
+    else if (this.length !== codes.length) {
+      throw new Error('Not all metadata columns have the same number of ' +
+                      'values');
+    }
+  };
+
+  /**
+   *
+   * Whether or not the values of a column are loaded.
+   *
+   * @param {integer} column The position of the column.
+   *
+   * @return {Boolean} `true` if the column is loaded, `false` otherwise.
+   *
+   */
+  CategoricalMetadata.prototype.isLoaded = function(column) {
+    return this.codes[column] !== null;
+  };
+
+  /**
+   *
+   * Set the values of a column that was not loaded.
+   *
+   * @param {integer} column The position of the column.
+   * @param {string[]} values The unique values in the column.
+   * @param {Object} codes Encoded buffer with the codes of the column.
+   *
+   * @throws {Error} If the number of codes doesn't match the loaded columns.
+   *
+   */
+  CategoricalMetadata.prototype.setColumn = function(column, values, codes) {
+    codes = util.decodeArray(codes);
+    this._checkLength(codes);
+
+    this.values[column] = values;
+    this.codes[column] = codes;
+  };
+
+  /**
+   *
+   * Check whether an object is dictionary-encoded metadata.
+   *
+   * @param {Object} obj The object to check.
+   *
+   * @return {Boolean} `true` if the object has a `values` and a `codes`
+   * attribute, `false` otherwise.
+   *
+   */
+  CategoricalMetadata.isCategoricalMetadata = function(obj) {
+    return _.isObject(obj) && !_.isArray(obj) && _.has(obj, 'values') &&
+           _.has(obj, 'codes');
+  };
+
+  /**
+   *
+   * Decode the metadata values of a sample.
+   *
+   * @param {integer} idx The position of the sample.
+   *
+   * @return {string[]} The metadata values of the sample, in column order.
+   * The values of columns that are not loaded are `undefined`.
+   *
+   */
+  CategoricalMetadata.prototype.row = function(idx) {
+    var row = new Array(this.codes.length);
+    for (var j = 0; j < this.codes.length; j++) {
+      if (this.codes[j] !== null) {
+        row[j] = this.values[j][this.codes[j][idx]];
+      }
+    }
+    return row;
+  };
+
+  /**
+   *
+   * Retrieve the values in a column that are used by at least one sample.
+   *
+   * @param {integer} column The position of the column.
+   *
+   * @return {string[]} The used values, in the order of the value table.
+   *
+   */
+  CategoricalMetadata.prototype.usedValues = function(column) {
+    var codes = this.codes[column], values = this.values[column];
+    var used = new Uint8Array(values.length);
+
+    for (var i = 0; i < codes.length; i++) {
+      used[codes[i]] = 1;
+    }
+
+    return _.filter(values, function(value, code) {
+      return used[code] === 1;
+    });
+  };
+
+  /**
+   *
+   * Store a matrix as a single flat typed array.
+   *
+   * @param {Array[]|Object} matrix An Array of rows, or an encoded
+   * two-dimensional buffer (see `util.decodeArray`).
+   *
+   * @return {Object} An object with the `values` of the matrix in row-major
+   * order, and the number of `rows` and `columns`, or `null` if not all the
+   * rows have the same length. Encoded buffers are decoded without copying
+   * (keeping their data type), and Arrays are copied into a Float64Array so
+   * no precision is lost.
+   * @private
+   *
+   */
+  function flattenMatrix(matrix) {
+    var values, rows, columns;
+
+    if (util.isEncodedArray(matrix)) {
+      return {'values': util.decodeArray(matrix), 'rows': matrix.shape[0],
+              'columns': matrix.shape[1] || 0};
+    }
+
+    rows = matrix.length;
+    columns = rows > 0 ? matrix[0].length : 0;
+    values = new Float64Array(rows * columns);
+
+    for (var i = 0; i < rows; i++) {
+      if (matrix[i].length !== columns) {
+        return null;
+      }
+      values.set(matrix[i], i * columns);
+    }
+
+    return {'values': values, 'rows': rows, 'columns': columns};
+  }
+
   /**
    * @class DecompositionModel
    *
@@ -112,11 +388,29 @@ function($, _, util) {
    *   coordinates of a sample. The rows are in ids order.
    * - `high` A 1D Array of floats where each row contains the
    *   coordinates of a sample. The rows are in ids order.
+   *
+   * The `coordinates`, `ci` and `edges` attributes can alternatively be
+   * encoded buffers (as produced by `emperor.util.encode_array`), in which case
+   * they are decoded into typed arrays, and the edges are represented as pairs
+   * of sample indices instead of pairs of sample identifiers. The buffers can
+   * also be decoded ahead of time by the `loader` module, which additionally
+   * sets a `dimension_ranges` attribute with the `min` and `max` of each
+   * dimension. Optionally, a `trajectories` attribute has the trajectories of
+   * the animation precomputed by Emperor (see `_processTrajectories`).
+   *
+   * The coordinates and confidence intervals of all the samples are stored in
+   * two flat typed arrays (see `coordinates` and `ci`), and the plottables
+   * read their values from these arrays instead of storing their own copies.
+   * The plottables are created the first time they are requested (see
+   * `getPlottable`).
    * @param {float[]} md_headers An Array of string where each string is a
    * metadata column header
-   * @param {string[]} metadata A 2D Array of strings where each row contains
-   * the metadata values for a given sample. The rows are in ids order. The
-   * columns are in `md_headers` order.
+   * @param {string[]|Object} metadata A 2D Array of strings where each row
+   * contains the metadata values for a given sample. The rows are in ids
+   * order. The columns are in `md_headers` order. Alternatively the metadata
+   * can be dictionary-encoded (see `CategoricalMetadata`), in which case the
+   * plottables share the decoded columns instead of storing their own row,
+   * and the columns can be loaded on demand (see `loadMetadata`).
    *
    * @throws {Error} In any of the following cases:
    * - The number of coordinates does not match the number of samples.
@@ -130,7 +424,11 @@ function($, _, util) {
    *
    */
   function DecompositionModel(data, md_headers, metadata, type) {
-    var coords = data.coordinates, ci = data.ci || [];
+    var coords, ci, res;
+
+    if (CategoricalMetadata.isCategoricalMetadata(metadata)) {
+      metadata = new CategoricalMetadata(metadata);
+    }
 
     /**
      *
@@ -151,6 +449,18 @@ function($, _, util) {
      * @type {string[]}
      */
     this.ids = data.sample_ids;
+    /**
+     * Index of each sample identifier (the first one if an identifier is
+     * repeated), see `getIndexByID`.
+     * @type {Map}
+     * @private
+     */
+    this._idIndex = new Map();
+    for (let i = 0; i < this.ids.length; i++) {
+      if (!this._idIndex.has(this.ids[i])) {
+        this._idIndex.set(this.ids[i], i);
+      }
+    }
     /**
      * Percentage explained by each of the axes in the ordination.
      * @type {float[]}
@@ -161,29 +471,52 @@ function($, _, util) {
      * @type {string[]}
      */
     this.md_headers = md_headers;
+    /**
+     * Dictionary-encoded metadata, `null` if the metadata was provided as an
+     * Array of rows.
+     * @type {CategoricalMetadata}
+     * @private
+     */
+    this._categoricalMetadata = null;
+    /**
+     * Function used to fetch dictionary-encoded metadata columns that are not
+     * loaded. It is called with an array of column positions and a callback
+     * that should be executed with an array of objects (one per column) with
+     * the `values` and `codes` of each column.
+     * @type {Function}
+     */
+    this.metadataLoader = null;
+    /**
+     * Inverted index of each metadata column (see `_getCategoryIndex`),
+     * built the first time a column is queried.
+     * @type {Object[]}
+     * @private
+     */
+    this._categoryIndex = new Array(md_headers.length);
 
-    if (coords === undefined) {
+    if (data.coordinates === undefined) {
       throw new Error('Coordinates are required to initialize this object.');
     }
 
+    coords = flattenMatrix(data.coordinates);
+
     /*
       Check that the number of coordinates set provided are the same as the
       number of samples
     */
-    if (this.ids.length !== coords.length) {
+    if (coords !== null && this.ids.length !== coords.rows) {
       throw new Error('The number of coordinates differs from the number of ' +
-                      'samples. Coords: ' + coords.length + ' samples: ' +
+                      'samples. Coords: ' + coords.rows + ' samples: ' +
                       this.ids.length);
     }
 
     /*
       Check that all the coords set have the same number of coordinates
     */
-    num_coords = coords[0].length;
-    var res = _.find(coords, function(c) {return c.length !== num_coords;});
-    if (res !== undefined) {
+    if (coords === null) {
       throw new Error('Not all samples have the same number of coordinates');
     }
+    num_coords = coords.columns;
 
     /*
       Check that we have the percentage explained values for all coordinates
@@ -197,7 +530,7 @@ function($, _, util) {
     /*
       Check that we have the metadata for all samples
     */
-    if (this.ids.length !== metadata.length) {
+    if (metadata.length !== null && this.ids.length !== metadata.length) {
       throw new Error('The number of metadata rows and the the number of ' +
                       'samples do not match. Samples: ' + this.ids.length +
                       ' Metadata rows: ' + metadata.length);
@@ -206,45 +539,89 @@ function($, _, util) {
     /*
       Check that we have all the metadata categories in all rows
     */
-    res = _.find(metadata, function(m) {
-                  return m.length !== md_headers.length;
-    });
-    if (res !== undefined) {
-      throw new Error('Not all metadata rows have the same number of values');
+    if (metadata instanceof CategoricalMetadata) {
+      if (metadata.values.length !== md_headers.length) {
+        throw new Error('Not all metadata rows have the same number of ' +
+                        'values');
+      }
+      this._categoricalMetadata = metadata;
     }
-
-    this.plottable = new Array(this.ids.length);
-    for (let i = 0; i < this.ids.length; i++) {
-      // note that ci[i] can be empty
-      this.plottable[i] = new Plottable(this.ids[i], metadata[i], coords[i], i,
-                                        ci[i]);
+    else {
+      res = _.find(metadata, function(m) {
+                    return m.length !== md_headers.length;
+      });
+      if (res !== undefined) {
+        throw new Error('Not all metadata rows have the same number of ' +
+                        'values');
+      }
     }
 
-    // use slice to make a copy of the array so we can modify it
     /**
-     * Minimum and maximum values for each axis in the ordination. More
-     * concretely this object has a `min` and a `max` attributes, each with a
-     * list of floating point arrays that describe the minimum and maximum for
-     * each axis.
-     * @type {Object}
+     * Coordinates of all the samples in row-major order, i.e. the value of
+     * the sample at index `i` in dimension `j` is at position
+     * `i * dimensions + j`. Coordinates sent as encoded buffers are kept in
+     * single precision. See `getCoordinate` and `getCoordinates`.
+     * @type {Float32Array|Float64Array}
      */
-    this.dimensionRanges = {'min': coords[0].slice(),
-                            'max': coords[0].slice()};
-    this.dimensionRanges = _.reduce(this.plottable,
-                                    DecompositionModel._minMaxReduce,
-                                    this.dimensionRanges);
+    this.coordinates = coords.values;
 
     /**
      * Number of plottables in this decomposition model
      * @type {integer}
      */
-    this.length = this.plottable.length;
+    this.length = coords.rows;
 
     /**
      * Number of dimensions in this decomposition model
      * @type {integer}
      */
-    this.dimensions = this.dimensionRanges.min.length;
+    this.dimensions = num_coords;
+
+    ci = flattenMatrix(data.ci || []);
+    if (ci === null || (ci.columns !== 0 && (ci.rows !== this.length ||
+                                             ci.columns !== num_coords))) {
+      throw new Error("The number of confidence intervals doesn't match " +
+                      'with the number of dimensions in the coordinates ' +
+                      'attribute.');
+    }
+
+    /**
+     * Confidence intervals of all the samples in the same layout as
+     * `coordinates`, empty if the samples have no confidence intervals. See
+     * `getConfidenceInterval` and `getConfidenceIntervals`.
+     * @type {Float32Array|Float64Array}
+     */
+    this.ci = ci.columns === 0 ? new Float64Array(0) : ci.values;
+
+    /**
+     * Metadata rows of the samples, `null` if the metadata is
+     * dictionary-encoded.
+     * @type {string[][]}
+     * @private
+     */
+    this._metadataRows = metadata instanceof CategoricalMetadata ? null :
+                         metadata;
+    /**
+     * Plottables created so far, indexed by sample, see `getPlottable`.
+     * @type {Plottable[]}
+     * @private
+     */
+    this._plottables = new Array(this.length);
+
+    /**
+     * Minimum and maximum values for each axis in the ordination. More
+     * concretely this object has a `min` and a `max` attributes, each with a
+     * list of floating point arrays that describe the minimum and maximum for
+     * each axis.
+     * @type {Object}
+     */
+    if (data.dimension_ranges !== undefined) {
+      this.dimensionRanges = {'min': data.dimension_ranges.min.slice(),
+                              'max': data.dimension_ranges.max.slice()};
+    }
+    else {
+      this.dimensionRanges = this._computeDimensionRanges();
+    }
 
     /**
      * Names of the axes in the ordination
@@ -261,8 +638,68 @@ function($, _, util) {
      * @type {Array[]}
      */
     this.edges = this._processEdgeList(data.edges || []);
+    /**
+     * Edges connected to each plottable (see `_getEdgeAdjacency`), built the
+     * first time the edges of a group of plottables are requested.
+     * @type {Object}
+     * @private
+     */
+    this._edgeAdjacency = null;
+    /**
+     * Trajectories of the animation precomputed by Emperor (see
+     * `_processTrajectories`), `null` if the data doesn't include them.
+     * @type {Object}
+     */
+    this.trajectories = this._processTrajectories(data.trajectories);
   }
 
+  /**
+   * All the plottables in the model, in the same order as `ids`.
+   *
+   * Reading this property creates the plottables that were not requested
+   * before, prefer `getPlottable` to retrieve a few of them.
+   * @type {Plottable[]}
+   */
+  Object.defineProperty(DecompositionModel.prototype, 'plottable', {
+    get: function() {
+      for (let i = 0; i < this.length; i++) {
+        this.getPlottable(i);
+      }
+      return this._plottables;
+    }
+  });
+
+  /**
+   *
+   * Retrieve the plottable object at a given index.
+   *
+   * The plottable is created the first time it is requested, and the same
+   * object is returned afterwards.
+   *
+   * @param {integer} index The index of the sample.
+   *
+   * @return {Plottable} The plottable object at the given index, or
+   * `undefined` if the index is out of range.
+   *
+   */
+  DecompositionModel.prototype.getPlottable = function(index) {
+    var plottable;
+
+    if (!(index >= 0 && index < this.length)) {
+      return undefined;
+    }
+
+    plottable = this._plottables[index];
+    if (plottable === undefined) {
+      // the coordinates and encoded metadata are shared by all the plottables
+      plottable = new Plottable(this.ids[index],
+                                this._categoricalMetadata ||
+                                this._metadataRows[index], this, index);
+      this._plottables[index] = plottable;
+    }
+    return plottable;
+  };
+
   /**
    *
    * Whether or not the plottables have confidence intervals
@@ -272,13 +709,98 @@ function($, _, util) {
    *
    */
   DecompositionModel.prototype.hasConfidenceIntervals = function() {
-    if (this.plottable.length <= 0) {
-      return false;
+    return this.ci.length > 0;
+  };
+
+  /**
+   *
+   * Retrieve the coordinate of a sample in one dimension.
+   *
+   * @param {integer} idx The index of the sample.
+   * @param {integer} dimension The index of the dimension.
+   *
+   * @return {float} The coordinate, `undefined` if `dimension` is `null` or
+   * `undefined` (for example the third visible dimension of a 2D plot).
+   *
+   */
+  DecompositionModel.prototype.getCoordinate = function(idx, dimension) {
+    if (dimension === null || dimension === undefined) {
+      return undefined;
+    }
+    return this.coordinates[idx * this.dimensions + dimension];
+  };
+
+  /**
+   *
+   * Retrieve the confidence interval of a sample in one dimension.
+   *
+   * @param {integer} idx The index of the sample.
+   * @param {integer} dimension The index of the dimension.
+   *
+   * @return {float} The confidence interval, `undefined` if the samples have
+   * no confidence intervals or if `dimension` is `null` or `undefined`.
+   *
+   */
+  DecompositionModel.prototype.getConfidenceInterval = function(idx,
+                                                                dimension) {
+    if (dimension === null || dimension === undefined) {
+      return undefined;
     }
-    else if (this.plottable[0].ci.length > 0) {
-      return true;
+    return this.ci[idx * this.dimensions + dimension];
+  };
+
+  /**
+   *
+   * Retrieve the coordinates of a sample.
+   *
+   * @param {integer} idx The index of the sample.
+   *
+   * @return {Float32Array|Float64Array} A view of the sample's coordinates,
+   * no data is copied.
+   *
+   */
+  DecompositionModel.prototype.getCoordinates = function(idx) {
+    return this.coordinates.subarray(idx * this.dimensions,
+                                     (idx + 1) * this.dimensions);
+  };
+
+  /**
+   *
+   * Retrieve the confidence intervals of a sample.
+   *
+   * @param {integer} idx The index of the sample.
+   *
+   * @return {Float32Array|Float64Array|Array} A view of the sample's
+   * confidence intervals, or an empty array if the samples have no
+   * confidence intervals.
+   *
+   */
+  DecompositionModel.prototype.getConfidenceIntervals = function(idx) {
+    if (!this.hasConfidenceIntervals()) {
+      return [];
     }
-    return false;
+    return this.ci.subarray(idx * this.dimensions,
+                            (idx + 1) * this.dimensions);
+  };
+
+  /**
+   *
+   * Retrieve the index of the sample with the given id.
+   *
+   * @param {string} id A string with the sample identifier.
+   *
+   * @return {integer} The index of the sample, i.e. the position of its
+   * plottable in the `plottable` array.
+   *
+   * @throws {Error} If the id is not in the model.
+   *
+   */
+  DecompositionModel.prototype.getIndexByID = function(id) {
+    var idx = this._idIndex.get(id);
+    if (idx === undefined) {
+      throw new Error(id + ' is not found in the Decomposition Model ids');
+    }
+    return idx;
   };
 
   /**
@@ -291,11 +813,7 @@ function($, _, util) {
    *
    */
   DecompositionModel.prototype.getPlottableByID = function(id) {
-    var idx = this.ids.indexOf(id);
-    if (idx === -1) {
-      throw new Error(id + ' is not found in the Decomposition Model ids');
-    }
-    return this.plottable[idx];
+    return this.getPlottable(this.getIndexByID(id));
   };
 
   /**
@@ -309,8 +827,11 @@ function($, _, util) {
    *
    */
   DecompositionModel.prototype.getPlottableByIDs = function(idArray) {
-    var dm = this;
-    return _.map(idArray, function(id) {return dm.getPlottableByID(id);});
+    var res = new Array(idArray.length);
+    for (var i = 0; i < idArray.length; i++) {
+      res[i] = this.getPlottable(this.getIndexByID(idArray[i]));
+    }
+    return res;
   };
 
   /**
@@ -332,6 +853,184 @@ function($, _, util) {
     return md_idx;
   };
 
+  /**
+   *
+   * Helper function that checks a metadata column has been loaded.
+   *
+   * @param {integer} md_idx The index of the metadata category.
+   *
+   * @throws {Error} If the column is not loaded.
+   * @private
+   *
+   */
+  DecompositionModel.prototype._checkMetadataLoaded = function(md_idx) {
+    if (!this._categoricalMetadata.isLoaded(md_idx)) {
+      throw new Error('The metadata category ' + this.md_headers[md_idx] +
+                      ' has not been loaded, see loadMetadata');
+    }
+  };
+
+  /**
+   *
+   * Make sure the metadata for a set of categories is available.
+   *
+   * Dictionary-encoded metadata columns that are not loaded are fetched with
+   * `metadataLoader`.
+   *
+   * @param {string[]} categories An array of metadata headers.
+   * @param {Function} callback Function executed once all the categories are
+   * loaded. If the categories are already available, the function is executed
+   * synchronously.
+   *
+   * @throws {Error} If any of the categories is not a metadata header, or if
+   * the columns are not loaded and there's no `metadataLoader`.
+   *
+   */
+  DecompositionModel.prototype.loadMetadata = function(categories, callback) {
+    var scope = this, table = this._categoricalMetadata, missing;
+
+    missing = _.map(categories, function(category) {
+      return scope._getMetadataIndex(category);
+    });
+
+    if (table !== null) {
+      missing = _.uniq(_.reject(missing, function(md_idx) {
+        return table.isLoaded(md_idx);
+      }));
+    }
+
+    if (table === null || missing.length === 0) {
+      callback();
+      return;
+    }
+
+    if (this.metadataLoader === null) {
+      throw new Error('Cannot load the metadata categories, there is no ' +
+                      'metadata loader');
+    }
+
+    this.metadataLoader(missing, function(columns) {
+      for (var i = 0; i < missing.length; i++) {
+        table.setColumn(missing[i], columns[i].values, columns[i].codes);
+      }
+
+      if (table.length !== scope.ids.length) {
+        throw new Error('The number of metadata rows and the the number of ' +
+                        'samples do not match. Samples: ' + scope.ids.length +
+                        ' Metadata rows: ' + table.length);
+      }
+      callback();
+    });
+  };
+
+  /**
+   *
+   * Retrieve the inverted index of a metadata column.
+   *
+   * The index is built with a single pass over the column the first time it
+   * is requested, and it is reused afterwards.
+   *
+   * @param {integer} md_idx The index of the metadata category.
+   *
+   * @return {Object} An object with a `values` attribute (the values used by
+   * at least one sample, sorted with `util.naturalSort`) and an `indices`
+   * attribute (a Map from each value to an Int32Array with the indices of the
+   * samples with that value, in increasing order).
+   *
+   * @throws {Error} If the column is not loaded.
+   * @private
+   *
+   */
+  DecompositionModel.prototype._getCategoryIndex = function(md_idx) {
+    var index = this._categoryIndex[md_idx], codes, values, starts, positions,
+        buffer, groups, value, code, i;
+
+    if (index !== undefined) {
+      return index;
+    }
+
+    index = {'values': null, 'indices': new Map()};
+
+    if (this._categoricalMetadata !== null) {
+      this._checkMetadataLoaded(md_idx);
+
+      codes = this._categoricalMetadata.codes[md_idx];
+      values = this._categoricalMetadata.values[md_idx];
+
+      // counting sort of the samples by code, so the indices of each value
+      // are a contiguous range of a single buffer
+      starts = new Int32Array(values.length + 1);
+      for (i = 0; i < codes.length; i++) {
+        starts[codes[i] + 1] += 1;
+      }
+      for (code = 0; code < values.length; code++) {
+        starts[code + 1] += starts[code];
+      }
+
+      positions = starts.slice(0, values.length);
+      buffer = new Int32Array(codes.length);
+      for (i = 0; i < codes.length; i++) {
+        buffer[positions[codes[i]]++] = i;
+      }
+
+      for (code = 0; code < values.length; code++) {
+        if (starts[code + 1] > starts[code]) {
+          index.indices.set(values[code],
+                            buffer.subarray(starts[code], starts[code + 1]));
+        }
+      }
+    }
+    else {
+      groups = new Map();
+      for (i = 0; i < this.length; i++) {
+        // avoid creating the plottables that were not requested
+        value = this._plottables[i] === undefined ?
+                this._metadataRows[i][md_idx] :
+                this._plottables[i].metadata[md_idx];
+        if (!groups.has(value)) {
+          groups.set(value, []);
+        }
+        groups.get(value).push(i);
+      }
+
+      groups.forEach(function(group, value) {
+        index.indices.set(value, new Int32Array(group));
+      });
+    }
+
+    index.values = naturalSort(Array.from(index.indices.keys()));
+    this._categoryIndex[md_idx] = index;
+
+    return index;
+  };
+
+  /**
+   *
+   * Retrieve the indices of the samples under the metadata header value.
+   *
+   * @param {string} category A string with the metadata header.
+   * @param {string} value A string with the value under the metadata category.
+   *
+   * @return {Int32Array} The indices of the samples for the given category
+   * value pair, in increasing order. The array is shared with the model's
+   * index and should not be modified.
+   *
+   * @throws {Error} If no sample has the value in the metadata category.
+   *
+   */
+  DecompositionModel.prototype.getIndicesByMetadataCategoryValue = function(
+      category, value) {
+    var md_idx = this._getMetadataIndex(category), res;
+
+    res = this._getCategoryIndex(md_idx).indices.get(value);
+
+    if (res === undefined) {
+      throw new Error('The value ' + value +
+                      ' is not found in the metadata category ' + category);
+    }
+    return res;
+  };
+
   /**
    *
    * Retrieve all the plottable objects under the metadata header value.
@@ -345,15 +1044,11 @@ function($, _, util) {
    */
   DecompositionModel.prototype.getPlottablesByMetadataCategoryValue = function(
       category, value) {
+    var indices = this.getIndicesByMetadataCategoryValue(category, value);
+    var res = new Array(indices.length);
 
-    var md_idx = this._getMetadataIndex(category);
-    var res = _.filter(this.plottable, function(pl) {
-      return pl.metadata[md_idx] === value;
-    });
-
-    if (res.length === 0) {
-      throw new Error('The value ' + value +
-                      ' is not found in the metadata category ' + category);
+    for (var i = 0; i < indices.length; i++) {
+      res[i] = this.getPlottable(indices[i]);
     }
     return res;
   };
@@ -365,16 +1060,15 @@ function($, _, util) {
    * @param {string} category A string with the metadata header.
    *
    * @return {string[]} An array of the available values for the given metadata
-   * header sorted first alphabetically and then numerically.
+   * header sorted first alphabetically and then numerically. The values are
+   * only computed (and sorted) the first time a category is requested.
    *
    */
   DecompositionModel.prototype.getUniqueValuesByCategory = function(category) {
     var md_idx = this._getMetadataIndex(category);
-    var values = _.map(this.plottable, function(pl) {
-      return pl.metadata[md_idx];
-    });
 
-    return naturalSort(_.uniq(values));
+    // copy the values so the cached index can't be modified
+    return this._getCategoryIndex(md_idx).values.slice();
   };
 
   /**
@@ -399,31 +1093,43 @@ function($, _, util) {
    *
    * Executes the provided `func` passing all the plottables as parameters.
    *
-   * @param {function} func The function to call for each plottable. It should
-   * accept a single parameter which will be the plottable.
+   * @param {function} func The function to call for each plottable. It is
+   * called with the plottable and its index.
    *
    * @return {Object[]} An array with the results of executing func over all
    * plottables.
    *
    */
   DecompositionModel.prototype.apply = function(func) {
-    return _.map(this.plottable, func);
+    var res = new Array(this.length);
+    for (var i = 0; i < this.length; i++) {
+      res[i] = func(this.getPlottable(i), i);
+    }
+    return res;
   };
 
   /**
    *
    * Transform observation names into plottable objects.
    *
+   * @param {Array[]|Object} edges An array of pairs of observation names, or
+   * an encoded buffer with pairs of observation indices.
+   *
    * @return {Array[]} An array of plottable pairs.
    * @private
    *
    */
   DecompositionModel.prototype._processEdgeList = function(edges) {
+    var u, v, scope = this;
+
+    if (util.isEncodedArray(edges)) {
+      return this._processEncodedEdgeList(edges);
+    }
+
     if (edges.length === 0) {
       return edges;
     }
 
-    var u, v, scope = this;
     edges = edges.map(function(edge) {
       if (edge[0] === edge[1]) {
         throw new Error('Cannot create edge between two identical nodes (' +
@@ -441,32 +1147,192 @@ function($, _, util) {
 
   /**
    *
-   * Helper function used to find the minimum and maximum values every
-   * dimension in the plottable objects. This function is used with
-   * underscore.js' reduce function (_.reduce).
+   * Validate the trajectories precomputed by Emperor.
+   *
+   * @param {Object} [trajectories] The trajectories as computed by
+   * `emperor.core.Emperor._precompute_trajectories`, the `indices` can be a
+   * list or an encoded buffer.
+   *
+   * @return {Object} An object with the `gradient` and `trajectory`
+   * categories, the `names` of the trajectories, the `indices` of the samples
+   * sorted by trajectory and gradient value (an Int32Array), the `offsets`
+   * where each trajectory starts and ends in `indices`, the gradient `values`
+   * of the sorted samples, the `earliest` gradient value, the
+   * `minimumDelta` between consecutive values and the `sampleIds` of the
+   * model. `null` if `trajectories` is `undefined` or `null`.
+   *
+   * @throws {Error} If the number of indices, values and offsets don't match,
+   * or if an index doesn't refer to a sample in the model.
+   * @private
+   *
+   */
+  DecompositionModel.prototype._processTrajectories = function(trajectories) {
+    var indices, offsets;
+
+    if (trajectories === undefined || trajectories === null) {
+      return null;
+    }
+
+    if (util.isEncodedArray(trajectories.indices)) {
+      indices = util.decodeArray(trajectories.indices);
+    }
+    else {
+      indices = new Int32Array(trajectories.indices);
+    }
+    offsets = trajectories.offsets;
+
+    if (indices.length !== trajectories.values.length ||
+        offsets.length !== trajectories.names.length + 1 ||
+        offsets[offsets.length - 1] !== indices.length) {
+      throw new Error('The number of indices, values and offsets in the ' +
+                      'trajectories do not match');
+    }
+
+    for (var i = 0; i < indices.length; i++) {
+      if (indices[i] < 0 || indices[i] >= this.length) {
+        throw new Error('The trajectories refer to a sample that is not in ' +
+                        'the model: ' + indices[i]);
+      }
+    }
+
+    return {'gradient': trajectories.gradient,
+            'trajectory': trajectories.trajectory,
+            'names': trajectories.names, 'offsets': offsets,
+            'indices': indices, 'values': trajectories.values,
+            'earliest': trajectories.earliest,
+            'minimumDelta': trajectories.minimum_delta,
+            'sampleIds': this.ids};
+  };
+
+  /**
+   *
+   * Retrieve the adjacency index of the edges.
+   *
+   * @return {Object} An object with an `offsets` and an `edges` attribute
+   * (both Int32Arrays), such that the positions in `edges` of the edges
+   * connected to the sample at index `i` are
+   * `edges.subarray(offsets[i], offsets[i + 1])`.
+   * @private
+   *
+   */
+  DecompositionModel.prototype._getEdgeAdjacency = function() {
+    var offsets, positions, edges, u, v, i;
+
+    if (this._edgeAdjacency !== null) {
+      return this._edgeAdjacency;
+    }
+
+    // count the edges of each sample, and use the cumulative counts as the
+    // offsets of each sample's edges
+    offsets = new Int32Array(this.length + 1);
+    for (i = 0; i < this.edges.length; i++) {
+      offsets[this.edges[i][0].idx + 1] += 1;
+      offsets[this.edges[i][1].idx + 1] += 1;
+    }
+    for (i = 0; i < this.length; i++) {
+      offsets[i + 1] += offsets[i];
+    }
+
+    positions = offsets.slice(0, this.length);
+    edges = new Int32Array(this.edges.length * 2);
+    for (i = 0; i < this.edges.length; i++) {
+      u = this.edges[i][0].idx;
+      v = this.edges[i][1].idx;
+
+      edges[positions[u]++] = i;
+      edges[positions[v]++] = i;
+    }
+
+    this._edgeAdjacency = {'offsets': offsets, 'edges': edges};
+    return this._edgeAdjacency;
+  };
+
+  /**
+   *
+   * Retrieve the edges connected to a group of plottables.
+   *
+   * @param {Plottable[]} plottables The plottables whose edges should be
+   * retrieved. Objects that are not plottables of this model are ignored.
    *
-   * @param {Object} accumulator An object with a "min" and "max" arrays that
-   * store the minimum and maximum values over all the plottables.
-   * @param {Plottable} plottable A plottable object to compare with.
+   * @return {integer[]} The positions in `edges` of the edges that have at
+   * least one of the plottables as an end, each position is included once.
    *
-   * @return {Object} An updated version of accumulator, integrating the ranges
-   * of the newly seen plottable object.
+   */
+  DecompositionModel.prototype.getEdgeIndicesByPlottables = function(
+      plottables) {
+    var adjacency, seen, res = [], idx, edge, i, j;
+
+    if (this.edges.length === 0) {
+      return res;
+    }
+
+    adjacency = this._getEdgeAdjacency();
+    seen = new Uint8Array(this.edges.length);
+
+    for (i = 0; i < plottables.length; i++) {
+      idx = plottables[i].idx;
+
+      if (this._plottables[idx] !== plottables[i]) {
+        continue;
+      }
+
+      for (j = adjacency.offsets[idx]; j < adjacency.offsets[idx + 1]; j++) {
+        edge = adjacency.edges[j];
+        if (seen[edge] === 0) {
+          seen[edge] = 1;
+          res.push(edge);
+        }
+      }
+    }
+
+    return res;
+  };
+
+  /**
+   *
+   * Transform an encoded buffer of observation indices into plottable objects.
+   *
+   * @param {Object} edges An encoded two-column buffer of integers, where
+   * each row contains the indices of the two plottables in an edge.
+   *
+   * @return {Array[]} An array of plottable pairs.
    * @private
    *
    */
-  DecompositionModel._minMaxReduce = function(accumulator, plottable) {
+  DecompositionModel.prototype._processEncodedEdgeList = function(edges) {
+    var indices = util.decodeArray(edges), result, u, v;
+
+    result = new Array(indices.length / 2);
+    for (var i = 0; i < result.length; i++) {
+      u = this.getPlottable(indices[i * 2]);
+      v = this.getPlottable(indices[i * 2 + 1]);
 
-    // iterate over every dimension
-    _.each(plottable.coordinates, function(value, index) {
-      if (value > accumulator.max[index]) {
-        accumulator.max[index] = value;
+      if (u === undefined || v === undefined) {
+        throw new Error('Edge ' + i + ' references a sample that is not' +
+                        ' found in the Decomposition Model');
       }
-      else if (value < accumulator.min[index]) {
-        accumulator.min[index] = value;
+      if (u === v) {
+        throw new Error('Cannot create edge between two identical nodes (' +
+                        u.name + ' and ' + v.name + ')');
       }
-    });
 
-    return accumulator;
+      result[i] = [u, v];
+    }
+
+    return result;
+  };
+
+  /**
+   *
+   * Find the minimum and maximum values of every dimension.
+   *
+   * @return {Object} An object with a `min` and a `max` Array, with the
+   * minimum and maximum value of each dimension over all the samples.
+   * @private
+   *
+   */
+  DecompositionModel.prototype._computeDimensionRanges = function() {
+    return util.computeRanges(this.coordinates, this.length, this.dimensions);
   };
 
   /**
@@ -561,5 +1427,6 @@ function($, _, util) {
   };
 
   return { 'DecompositionModel': DecompositionModel,
-           'Plottable': Plottable};
+           'Plottable': Plottable,
+           'CategoricalMetadata': CategoricalMetadata};
 });
@@ -970,8 +970,10 @@ define([
 
     // Only scatter plots that are not using a point cloud should be pointed
     // towards the camera. For arrow types and point clouds doing this will
-    // results in odd visual effects
+    // results in odd visual effects. Instanced meshes are pointed towards the
+    // camera by their shaders.
     if (!this.UIState.getProperty('view.usesPointCloud') &&
+        !this.UIState.getProperty('view.usesInstancing') &&
         this.decViews.scatter.decomp.isScatterType()) {
       _.each(this.decViews.scatter.markers, function(element) {
         element.quaternion.copy(camera.quaternion);
@@ -1034,6 +1036,29 @@ define([
         selected.push(collection[i]);
       }
     }
+    else if (this.UIState.getProperty('view.usesInstancing')) {
+      for (i = 0; i < collection.length; i++) {
+        var attributes = collection[i].geometry.attributes, slots;
+
+        // if there's no selection then update all the instances
+        if (collection[i].userData.selected === undefined) {
+          slots = _.range(collection[i].count);
+        }
+        else {
+          slots = collection[i].userData.selected;
+        }
+
+        for (j = 0; j < slots.length; j++) {
+          if (attributes.instanceVisible.getX(slots[j]) &&
+              attributes.instanceOpacity.getX(slots[j])) {
+            attributes.instanceEmissive.setX(slots[j], (color > 0) * 1);
+          }
+        }
+
+        attributes.instanceEmissive.needsUpdate = true;
+        selected.push(collection[i]);
+      }
+    }
     else {
       for (i = 0; i < collection.length; i++) {
         var material = collection[i].material;
@@ -1141,6 +1166,15 @@ define([
               names.push(scope.decViews.scatter.decomp.ids[indices[j]]);
             }
           }
+          else if (selected[i].isInstancedMesh) {
+            // this is a list of the selected instances in the mesh
+            indices = selected[i].userData.selected;
+
+            for (var l = 0; l < indices.length; l++) {
+              index = selected[i].userData.indices[indices[l]];
+              names.push(scope.decViews.scatter.decomp.ids[index]);
+            }
+          }
           else if (selected[i].isLineSegments) {
             var index, viewType, view;
 
@@ -1248,7 +1282,25 @@ define([
         var meshIndex = intersects[0].index;
         var modelIndex = this.decViews.scatter.getModelPointIndex(meshIndex,
                                                 this.UIState['view.viewType']);
-        intersect = this.decViews.scatter.decomp.plottable[modelIndex];
+        intersect = this.decViews.scatter.decomp.getPlottable(modelIndex);
+      }
+      else if (firstObj.isInstancedMesh) {
+        // don't search over invisible things
+        intersects = _.filter(intersects, function(marker) {
+          var attributes = marker.object.geometry.attributes;
+          return attributes.instanceVisible.getX(marker.instanceId) &&
+                 attributes.instanceOpacity.getX(marker.instanceId);
+        });
+
+        // if there's no hits then finish the execution
+        if (intersects.length === 0) {
+          return;
+        }
+
+        // each instance maps to a plottable in the scatter view
+        var instance = intersects[0].object.userData.indices[
+          intersects[0].instanceId];
+        intersect = this.decViews.scatter.decomp.getPlottable(instance);
       }
       else {
         intersects = _.filter(intersects, function(marker) {
@@ -2,9 +2,8 @@ define([
     'jquery',
     'underscore',
     'viewcontroller',
-    'shape-editor',
-    'shapes'
-], function($, _, ViewControllers, Shape, shapes) {
+    'shape-editor'
+], function($, _, ViewControllers, Shape) {
 
   // we only use the base attribute class, no need to get the base class
   var EmperorAttributeABC = ViewControllers.EmperorAttributeABC;
@@ -120,21 +119,7 @@ define([
     if (scope.UIState['view.viewType'] == 'parallel-plot')
       return;
 
-    var idx, factor = scope.getGeometryFactor();
-
-    // get the appropriately sized geometry
-    var geometry = shapes.getGeometry(shape, factor);
-
-    if (geometry === undefined) {
-      throw new Error('Unknown shape ' + shape);
-    }
-
-    _.each(group, function(element) {
-      idx = element.idx;
-      scope.markers[idx].geometry = geometry;
-      scope.markers[idx].userData.shape = shape;
-    });
-    scope.needsUpdate = true;
+    scope.setShape(shape, group);
   };
 
   return ShapeController;
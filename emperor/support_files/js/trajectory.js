@@ -75,13 +75,46 @@ define([
           'different, make sure these values are consistent.');
     }
 
+    /**
+     * The x, y and z values of each sample (as in `coordinates`) one after
+     * the other, i.e. the position of the sample at index `i` starts at
+     * `i * 3`.
+     * @type {Float32Array}
+     */
+    this.positions = new Float32Array(this.coordinates.length * 3);
+    for (var i = 0; i < this.coordinates.length; i++) {
+      this.positions[i * 3] = this.coordinates[i].x;
+      this.positions[i * 3 + 1] = this.coordinates[i].y;
+      this.positions[i * 3 + 2] = this.coordinates[i].z;
+    }
+
     // initialize as an empty array but fill it up upon request
     /**
-     * Array of objects with the corresponding interpolated x, y and z values.
-     * The interpolation operation takes place between subsequent samples.
-     * @type {Object[]}
+     * The interpolated x, y and z values in the same layout as `positions`.
+     * The interpolation operation takes place between subsequent samples. See
+     * `getInterpolatedPoint`.
+     * @type {Float32Array}
      */
     this.interpolatedCoordinates = null;
+    /**
+     * Number of interpolated points.
+     * @type {integer}
+     */
+    this.interpolatedLength = 0;
+    /**
+     * Interval (index of the starting sample) of each interpolated point,
+     * except for the last one.
+     * @type {Int32Array}
+     * @private
+     */
+    this._intervalValues = null;
+    /**
+     * Buffer returned by `interpolatedSegmentAtIndex`.
+     * @type {Float32Array}
+     * @private
+     */
+    this._segment = new Float32Array(6);
+
     this._generateInterpolatedCoordinates();
 
     return this;
@@ -95,50 +128,61 @@ define([
    *
    */
   TrajectoryOfSamples.prototype._generateInterpolatedCoordinates = function() {
-    var pointsPerStep = 0, delta = 0;
-    var interpolatedCoordinatesBuffer = new Array(),
-    intervalBuffer = new Array();
-    var currInterpolation;
-
-    // iterate over the gradient points to compute the interpolated distances
-    for (var index = 0; index < this.gradientPoints.length - 1; index++) {
+    var intervals = Math.max(this.gradientPoints.length - 1, 0),
+        steps = new Array(intervals), total = 0, offset = 0, delta, start,
+        end, last, index;
 
+    // count the points in each interval first, so the buffers are only
+    // allocated once
+    for (index = 0; index < intervals; index++) {
       // calculate the absolute difference of the current pair of points
       delta = Math.abs(Math.abs(this.gradientPoints[index]) - Math.abs(
             this.gradientPoints[index + 1]));
 
-      pointsPerStep = this.calculateNumberOfPointsForDelta(delta);
-      if (pointsPerStep > this.maxN) {
-        pointsPerStep = this.maxN;
-      }
+      steps[index] = Math.min(this.calculateNumberOfPointsForDelta(delta),
+                              this.maxN);
+      total += steps[index];
+    }
 
-      currInterpolation = linearInterpolation(this.coordinates[index]['x'],
-          this.coordinates[index]['y'],
-          this.coordinates[index]['z'],
-          this.coordinates[index + 1]['x'],
-          this.coordinates[index + 1]['y'],
-          this.coordinates[index + 1]['z'],
-          pointsPerStep);
-
-      // extend to include these interpolated points, do not include the last
-      // element of the array to avoid repeating the number per interval
-      interpolatedCoordinatesBuffer = interpolatedCoordinatesBuffer.concat(
-          currInterpolation.slice(0, -1));
-
-      // extend the interval buffer
-      for (var i = 0; i < pointsPerStep; i++) {
-        intervalBuffer.push(index);
-      }
+    // one more point to make sure the trajectory is closed
+    this.interpolatedCoordinates = new Float32Array((total + 1) * 3);
+    this.interpolatedLength = total + 1;
+    this._intervalValues = new Int32Array(total);
+
+    for (index = 0; index < intervals; index++) {
+      start = this.coordinates[index];
+      end = this.coordinates[index + 1];
+
+      // the last point of each interval is overwritten by the first point of
+      // the next one to avoid repeating it
+      linearInterpolation(start.x, start.y, start.z, end.x, end.y, end.z,
+                          steps[index], this.interpolatedCoordinates, offset);
+
+      this._intervalValues.fill(index, offset, offset + steps[index]);
+      offset += steps[index];
     }
 
-    // add the last point to make sure the trajectory is closed
-    this.interpolatedCoordinates = interpolatedCoordinatesBuffer.concat(
-        currInterpolation.slice(-1));
-    this._intervalValues = intervalBuffer;
+    last = this.coordinates.length - 1;
+    this.interpolatedCoordinates.set(this.positions.subarray(last * 3),
+                                     total * 3);
 
     return;
   };
 
+  /**
+   *
+   * Retrieve an interpolated point.
+   *
+   * @param {integer} idx The index of the interpolated point.
+   *
+   * @return {Object} An object with the x, y and z values of the point.
+   *
+   */
+  TrajectoryOfSamples.prototype.getInterpolatedPoint = function(idx) {
+    var c = this.interpolatedCoordinates;
+    return {'x': c[idx * 3], 'y': c[idx * 3 + 1], 'z': c[idx * 3 + 2]};
+  };
+
   /**
    *
    * Helper method to calculate the number of points that there should be for a
@@ -177,12 +221,12 @@ define([
     }
 
     // we only need to show the edges and none of the interpolated points
-    if (this.interpolatedCoordinates.length - 1 <= idx) {
+    if (this.interpolatedLength - 1 <= idx) {
       return this.coordinates;
     }
 
     var output = this.coordinates.slice(0, this._intervalValues[idx] + 1);
-    output = output.concat(this.interpolatedCoordinates[idx]);
+    output.push(this.getInterpolatedPoint(idx));
 
     return output;
   };
@@ -200,20 +244,52 @@ define([
    */
   TrajectoryOfSamples.prototype.representativeInterpolatedCoordinatesAtIndex =
   function(idx) {
-    if (idx === 0)
+    var segment = this.interpolatedSegmentAtIndex(idx);
+
+    if (segment === null) {
       return null;
-    if (this.interpolatedCoordinates.length - 1 <= idx)
+    }
+
+    return [this.coordinates[this._intervalValues[idx]],
+            this.getInterpolatedPoint(idx)];
+  };
+
+  /**
+   *
+   * Retrieve the start and end of the interpolated portion of
+   * representativeCoordinatesAtIndex, without creating any objects.
+   *
+   * @param {integer} idx Value for which to determine the required number of
+   * points.
+   *
+   * @return {Float32Array} The x, y and z values of the last sample before
+   * the index, followed by the x, y and z values of the interpolated point.
+   * The array is reused by subsequent calls. `null` if there is no
+   * interpolated portion at the index, or if it has no length.
+   */
+  TrajectoryOfSamples.prototype.interpolatedSegmentAtIndex = function(idx) {
+    var segment = this._segment, start, end;
+
+    if (idx === 0 || this.interpolatedLength - 1 <= idx) {
       return null;
+    }
+
+    start = this._intervalValues[idx] * 3;
+    end = idx * 3;
 
-    var lastStaticPoint = this.coordinates[this._intervalValues[idx]];
-    var interpPoint = this.interpolatedCoordinates[idx];
-    if (lastStaticPoint.x === interpPoint.x &&
-      lastStaticPoint.y === interpPoint.y &&
-      lastStaticPoint.z === interpPoint.z) {
+    segment[0] = this.positions[start];
+    segment[1] = this.positions[start + 1];
+    segment[2] = this.positions[start + 2];
+    segment[3] = this.interpolatedCoordinates[end];
+    segment[4] = this.interpolatedCoordinates[end + 1];
+    segment[5] = this.interpolatedCoordinates[end + 2];
+
+    if (segment[0] === segment[3] && segment[1] === segment[4] &&
+        segment[2] === segment[5]) {
       return null; //Shouldn't pass on a zero length segment
     }
 
-    return [lastStaticPoint, interpPoint];
+    return segment;
   };
 
   /**
@@ -232,13 +308,20 @@ define([
    * @param {float} z_2 Final value of a position in the third dimension
    * @param {integer} steps Number of steps that we want the interpolation to
    * run
-   *
-   * @return {Object[]} Array of objects that have the x, y and z attributes
+   * @param {Float32Array} [out] Array where the x, y and z values of each
+   * point are written one after the other. If not provided, an Array of
+   * objects is created instead.
+   * @param {integer} [offset = 0] Index of the point in `out` where the first
+   * point is written.
+   *
+   * @return {Object[]|Float32Array} Array of objects that have the x, y and z
+   * attributes, or `out` if it was provided.
    * @function linearInterpolation
    *
    */
 
-  function linearInterpolation(x_1, y_1, z_1, x_2, y_2, z_2, steps) {
+  function linearInterpolation(x_1, y_1, z_1, x_2, y_2, z_2, steps, out,
+                               offset) {
     var xAbs = Math.abs(x_1 - x_2);
     var yAbs = Math.abs(y_1 - y_2);
     var zAbs = Math.abs(z_1 - z_2);
@@ -255,9 +338,22 @@ define([
     var newx = 0;
     var newy = 0;
     var newz = 0;
-    var result = new Array();
+    var result = new Array(), i, s;
+
+    if (out !== undefined) {
+      i = (offset || 0) * 3;
+
+      for (s = 0; s <= steps; s++, i += 3) {
+        // with no steps only the first point is written
+        out[i] = s === 0 ? x_1 : x_1 + (xStep * s);
+        out[i + 1] = s === 0 ? y_1 : y_1 + (yStep * s);
+        out[i + 2] = s === 0 ? z_1 : z_1 + (zStep * s);
+      }
+
+      return out;
+    }
 
-    for (var s = 0; s <= steps; s++) {
+    for (s = 0; s <= steps; s++) {
       newx = x_1 + (xStep * s);
       newy = y_1 + (yStep * s);
       newz = z_1 + (zStep * s);
@@ -417,6 +513,58 @@ define([
     return out;
   }
 
+  /**
+   *
+   * Helper data wrangling function, equivalent to
+   * `getSampleNamesAndDataForSortedTrajectories` but for trajectories that
+   * were grouped and sorted by Emperor before the plot was rendered, so only
+   * the coordinates have to be looked up and the trajectories padded.
+   *
+   * @param {Object} trajectories The precomputed trajectories, as described
+   * by `DecompositionModel.trajectories`.
+   * @param {Object[]} coordinatesData An Array of Objects where the indices are
+   * the sample identifiers and each of the objects has the following
+   * properties: x, y and z.
+   *
+   * @return {Object[]} An Array with the contained data indexed by the
+   * trajectory names.
+   * @function getSampleNamesAndDataForPrecomputedTrajectories
+   *
+   */
+  function getSampleNamesAndDataForPrecomputedTrajectories(trajectories,
+      coordinatesData) {
+    var out = {}, samples, name, coordinates, first, last, i, j;
+
+    for (i = 0; i < trajectories.names.length; i++) {
+      first = trajectories.offsets[i];
+      last = trajectories.offsets[i + 1];
+      samples = new Array(last - first);
+
+      for (j = first; j < last; j++) {
+        name = trajectories.sampleIds[trajectories.indices[j]];
+        coordinates = coordinatesData[name];
+
+        samples[j - first] = {'name': name,
+                              'value': trajectories.values[j],
+                              'x': coordinates.x, 'y': coordinates.y,
+                              'z': coordinates.z};
+      }
+
+      // left-pad the trajectories, see
+      // getSampleNamesAndDataForSortedTrajectories
+      if (samples[0].value !== trajectories.earliest) {
+        samples.unshift({'name': samples[0].name,
+                         'value': trajectories.earliest,
+                         'x': samples[0].x, 'y': samples[0].y,
+                         'z': samples[0].z + 0.0001});
+      }
+
+      out[trajectories.names[i]] = samples;
+    }
+
+    return out;
+  }
+
   /**
    *
    * Function to calculate the minimum delta from an array of wrangled data by
@@ -466,6 +614,8 @@ define([
     'getMinimumDelta': getMinimumDelta,
     'getSampleNamesAndDataForSortedTrajectories':
       getSampleNamesAndDataForSortedTrajectories,
+    'getSampleNamesAndDataForPrecomputedTrajectories':
+      getSampleNamesAndDataForPrecomputedTrajectories,
     'distanceBetweenPoints': distanceBetweenPoints,
     'linearInterpolation': linearInterpolation};
 });
@@ -16,6 +16,15 @@ define(['three'], function(THREE) {
     //Properties must be flattened into UIState until we determine how to handle
     //tiered events.
     this['view.usesPointCloud'] = false;
+    this['view.usesInstancing'] = false;
+
+    // number of samples above which the markers are drawn with instanced
+    // meshes or as a point cloud (unless a rendering mode is requested), and
+    // from which exporting an SVG file has to be confirmed
+    this['view.instancingThreshold'] = 9000;
+    this['view.pointCloudThreshold'] = 20000;
+    this['view.svgWarningThreshold'] = 9000;
+
     this['view.viewType'] = 'scatter';
   }
 
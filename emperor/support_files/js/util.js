@@ -143,8 +143,239 @@ define(['underscore'], function(_) {
     return htmlString.replace(' xmlns="http://www.w3.org/1999/xhtml"', '');
   }
 
+  /**
+   *
+   * Check if an object represents an encoded numeric buffer.
+   *
+   * @param {Object} obj The object to check.
+   *
+   * @return {Boolean} `true` if the object has the `dtype`, `shape` and `data`
+   * attributes as created by `emperor.util.encode_array`, `false` otherwise.
+   * @function isEncodedArray
+   */
+  function isEncodedArray(obj) {
+    return obj !== null && obj !== undefined && !Array.isArray(obj) &&
+           obj.dtype !== undefined && obj.shape !== undefined &&
+           obj.data !== undefined;
+  }
+
+  /**
+   *
+   * Decode a base64-encoded buffer of little-endian values into a typed array.
+   *
+   * This function is also run in the Web Worker that decodes the plot data
+   * (see the `loader` module), so it can't use any other function or library.
+   *
+   * @param {Object} encoded An object with a `dtype` (one of `'float32'`,
+   * `'int32'`, `'uint8'` or `'uint16'`), a `shape` and a `data` attribute, as
+   * created by `emperor.util.encode_array`. If `data` is already a typed array
+   * (i.e. the buffer was decoded by the loader) it is returned as-is.
+   *
+   * @return {Float32Array|Int32Array|Uint8Array|Uint16Array} A flat typed
+   * array with all the values in row-major order.
+   *
+   * @throws {Error} If the data type is not supported, or if the number of
+   * decoded values doesn't match the shape.
+   * @function decodeArray
+   */
+  function decodeArray(encoded) {
+    var TypedArray, binary, bytes, values, expected = 1, i;
+
+    if (typeof encoded.data === 'string') {
+      TypedArray = {'float32': Float32Array, 'int32': Int32Array,
+                    'uint8': Uint8Array, 'uint16': Uint16Array}[encoded.dtype];
+      if (TypedArray === undefined) {
+        throw new Error('Unsupported data type ' + encoded.dtype);
+      }
+
+      binary = atob(encoded.data);
+      bytes = new Uint8Array(binary.length);
+      for (i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+      }
+      values = new TypedArray(bytes.buffer);
+    }
+    else {
+      values = encoded.data;
+    }
+
+    for (i = 0; i < encoded.shape.length; i++) {
+      expected *= encoded.shape[i];
+    }
+    if (values.length !== expected) {
+      throw new Error('The encoded data has ' + values.length + ' values but' +
+                      ' the shape requires ' + expected);
+    }
+
+    return values;
+  }
+
+  /**
+   *
+   * Compute the minimum and maximum of each column in a row-major matrix.
+   *
+   * Like `decodeArray`, this function is run in the loader's Web Worker and
+   * can't use any other function or library.
+   *
+   * @param {TypedArray} values The values of the matrix in row-major order.
+   * @param {integer} rows The number of rows in the matrix.
+   * @param {integer} columns The number of columns in the matrix.
+   *
+   * @return {Object} An object with a `min` and a `max` attribute, each an
+   * Array with one value per column.
+   * @function computeRanges
+   */
+  function computeRanges(values, rows, columns) {
+    var min = new Array(columns), max = new Array(columns), value, i, j;
+
+    for (j = 0; j < columns; j++) {
+      min[j] = max[j] = values[j];
+    }
+
+    for (i = 1; i < rows; i++) {
+      for (j = 0; j < columns; j++) {
+        value = values[i * columns + j];
+        if (value > max[j]) {
+          max[j] = value;
+        }
+        else if (value < min[j]) {
+          min[j] = value;
+        }
+      }
+    }
+
+    return {'min': min, 'max': max};
+  }
+
+  /**
+   *
+   * Decode a two-dimensional buffer into an array of rows.
+   *
+   * @param {Object} encoded An encoded two-dimensional array, see
+   * `decodeArray`.
+   *
+   * @return {Array} An array where each element is a typed array view of a row
+   * in the decoded buffer. No data is copied.
+   * @function decodeMatrix
+   */
+  function decodeMatrix(encoded) {
+    var values = decodeArray(encoded), rows = encoded.shape[0],
+        columns = encoded.shape[1], result = new Array(rows);
+
+    for (var i = 0; i < rows; i++) {
+      result[i] = values.subarray(i * columns, (i + 1) * columns);
+    }
+    return result;
+  }
+
+  /**
+   *
+   * @class FrameTimer
+   *
+   * Measures how long it takes to compute each frame of an animation, and
+   * keeps the durations of the most recent frames.
+   *
+   * @param {Integer} [size = 120] The number of frames to keep.
+   *
+   * @return {FrameTimer}
+   * @constructs FrameTimer
+   */
+  function FrameTimer(size) {
+    /**
+     * Duration of the most recent frames in milliseconds, the oldest values
+     * are overwritten first.
+     * @type {Float64Array}
+     */
+    this.durations = new Float64Array(size === undefined ? 120 : size);
+    /**
+     * Total number of frames measured since the last reset.
+     * @type {Integer}
+     */
+    this.frames = 0;
+    this._start = null;
+  }
+
+  /**
+   *
+   * Current time in milliseconds.
+   *
+   * @return {Float} A high resolution timestamp if the browser supports it.
+   * @private
+   */
+  FrameTimer.prototype._now = function() {
+    if (typeof performance !== 'undefined') {
+      return performance.now();
+    }
+    return Date.now();
+  };
+
+  /**
+   *
+   * Start measuring a frame.
+   *
+   */
+  FrameTimer.prototype.start = function() {
+    this._start = this._now();
+  };
+
+  /**
+   *
+   * Finish measuring a frame.
+   *
+   * @return {Float} The duration of the frame in milliseconds, or `null` if
+   * `start` was not called.
+   */
+  FrameTimer.prototype.stop = function() {
+    var duration;
+
+    if (this._start === null) {
+      return null;
+    }
+
+    duration = this._now() - this._start;
+    this.durations[this.frames % this.durations.length] = duration;
+    this.frames += 1;
+    this._start = null;
+
+    return duration;
+  };
+
+  /**
+   *
+   * Forget all the measured frames.
+   *
+   */
+  FrameTimer.prototype.reset = function() {
+    this.durations.fill(0);
+    this.frames = 0;
+    this._start = null;
+  };
+
+  /**
+   *
+   * Summarize the duration of the most recent frames.
+   *
+   * @return {Object} An object with the number of `frames` measured since the
+   * last reset, and the `mean` and `max` duration of the most recent frames
+   * in milliseconds (both are zero if no frames were measured).
+   */
+  FrameTimer.prototype.summary = function() {
+    var n = Math.min(this.frames, this.durations.length), total = 0, max = 0;
+
+    for (var i = 0; i < n; i++) {
+      total += this.durations[i];
+      max = Math.max(max, this.durations[i]);
+    }
+
+    return {'frames': this.frames, 'mean': n === 0 ? 0 : total / n,
+            'max': max};
+  };
+
   return {'truncateLevel': truncateLevel, 'naturalSort': naturalSort,
           'convertXMLToString': convertXMLToString,
           'escapeRegularExpression': escapeRegularExpression,
-          'cleanHTML': cleanHTML, 'splitNumericValues': splitNumericValues};
+          'cleanHTML': cleanHTML, 'splitNumericValues': splitNumericValues,
+          'isEncodedArray': isEncodedArray, 'decodeArray': decodeArray,
+          'decodeMatrix': decodeMatrix, 'computeRanges': computeRanges,
+          'FrameTimer': FrameTimer};
 });
@@ -172,6 +172,22 @@ define([
     var dm = this.getView().decomp;
     var scope = this;
 
+    // metadata columns can be loaded on demand, so before the callback is
+    // executed make sure the selected category is available. Subclasses bind
+    // this same callback to other elements, hence we replace it in `options`
+    if (options.categorySelectionCallback !== undefined) {
+      var categorySelectionCallback = options.categorySelectionCallback;
+      options.categorySelectionCallback = function() {
+        var self = this, args = arguments;
+        var category = scope.getMetadataField();
+
+        scope.getView().decomp.loadMetadata(category ? [category] : [],
+                                            function() {
+          categorySelectionCallback.apply(self, args);
+        });
+      };
+    }
+
     // http://stackoverflow.com/a/6602002
     this.$select = $('<select>');
     this.$header.append(this.$select);
@@ -78,8 +78,9 @@ function DecompositionView(multiModel, modelKey, uiState) {
    */
   this.staticTubes = [];
   /**
-   * Dynamic tubes covering the final tube segment of a trajectory
-   * Must be rebuilt each frame by the animations controller
+   * Dynamic tubes covering the final tube segment of each trajectory. The
+   * animations controller keeps a single pool of tubes (see
+   * `draw.makeTubeSegments`) that is rewritten in place every frame.
    * @type {THREE.Mesh[]}
    */
   this.dynamicTubes = [];
@@ -144,6 +145,10 @@ DecompositionView.prototype._initGeometry = function() {
   else if (this.UIState['view.usesPointCloud']) {
     this._fastInit();
   }
+  else if (this.UIState['view.usesInstancing'] &&
+           this.decomp.isScatterType()) {
+    this._instancedInit();
+  }
   else {
     this._initBaseView();
   }
@@ -179,7 +184,7 @@ DecompositionView.prototype.getTubes = function() {
 DecompositionView.prototype._initBaseView = function() {
   var mesh, x = this.visibleDimensions[0], y = this.visibleDimensions[1],
       z = this.visibleDimensions[2];
-  var scope = this;
+  var scope = this, decomp = this.decomp;
 
   // get the correctly sized geometry
   var radius = this.getGeometryFactor(), hasConfidenceIntervals;
@@ -188,9 +193,9 @@ DecompositionView.prototype._initBaseView = function() {
   hasConfidenceIntervals = this.decomp.hasConfidenceIntervals();
 
   if (this.decomp.isScatterType()) {
-    this.decomp.apply(function(plottable) {
+    _.times(this.decomp.length, function(i) {
       mesh = new THREE.Mesh(geometry, new THREE.MeshPhongMaterial());
-      mesh.name = plottable.name;
+      mesh.name = decomp.ids[i];
 
       mesh.material.color = new THREE.Color(0xff0000);
       mesh.material.transparent = false;
@@ -198,8 +203,9 @@ DecompositionView.prototype._initBaseView = function() {
       mesh.material.opacity = 1;
       mesh.matrixAutoUpdate = true;
 
-      mesh.position.set(plottable.coordinates[x], plottable.coordinates[y],
-                        plottable.coordinates[z] || 0);
+      mesh.position.set(decomp.getCoordinate(i, x),
+                        decomp.getCoordinate(i, y),
+                        decomp.getCoordinate(i, z) || 0);
 
       mesh.userData.shape = 'Sphere';
 
@@ -209,13 +215,17 @@ DecompositionView.prototype._initBaseView = function() {
         // copy the current sphere and make it an ellipsoid
         mesh = mesh.clone();
 
-        mesh.name = plottable.name + '_ci';
+        mesh.name = decomp.ids[i] + '_ci';
         mesh.material.transparent = true;
         mesh.material.opacity = 0.5;
 
-        mesh.scale.set(plottable.ci[x] / geometry.parameters.radius,
-                       plottable.ci[y] / geometry.parameters.radius,
-                       plottable.ci[z] / geometry.parameters.radius);
+        mesh.scale.set(
+          decomp.getConfidenceInterval(i, x) /
+          geometry.parameters.radius,
+          decomp.getConfidenceInterval(i, y) /
+          geometry.parameters.radius,
+          decomp.getConfidenceInterval(i, z) /
+          geometry.parameters.radius);
 
         scope.ellipsoids.push(mesh);
       }
@@ -224,11 +234,11 @@ DecompositionView.prototype._initBaseView = function() {
   else if (this.decomp.isArrowType()) {
     var arrow, zero = [0, 0, 0], point;
 
-    this.decomp.apply(function(plottable) {
-      point = [plottable.coordinates[x],
-               plottable.coordinates[y],
-               plottable.coordinates[z] || 0];
-      arrow = makeArrow(zero, point, 0xc0c0c0, plottable.name);
+    _.times(this.decomp.length, function(i) {
+      point = [decomp.getCoordinate(i, x),
+               decomp.getCoordinate(i, y),
+               decomp.getCoordinate(i, z) || 0];
+      arrow = makeArrow(zero, point, 0xc0c0c0, decomp.ids[i]);
 
       scope.markers.push(arrow);
     });
@@ -237,19 +247,31 @@ DecompositionView.prototype._initBaseView = function() {
     throw new Error('Unsupported decomposition type');
   }
 
+  this._initEdges();
+};
+
+/**
+ *
+ * Helper method to initialize the procrustes edges.
+ * @private
+ *
+ */
+DecompositionView.prototype._initEdges = function() {
+  var x = this.visibleDimensions[0], y = this.visibleDimensions[1],
+      z = this.visibleDimensions[2];
+
   if (this.decomp.edges.length) {
     var left, center, right, u, v, verticesLeft = [], verticesRight = [];
     this.decomp.edges.forEach(function(edge) {
-      u = edge[0];
-      v = edge[1];
+      // the coordinates are views of the model's data, get them only once
+      u = edge[0].coordinates;
+      v = edge[1].coordinates;
 
       // remember x, y and z
-      center = [(u.coordinates[x] + v.coordinates[x]) / 2,
-                (u.coordinates[y] + v.coordinates[y]) / 2,
-                ((u.coordinates[z] + v.coordinates[z]) / 2) || 0];
+      center = [(u[x] + v[x]) / 2, (u[y] + v[y]) / 2, ((u[z] + v[z]) / 2) || 0];
 
-      left = [u.coordinates[x], u.coordinates[y], u.coordinates[z] || 0];
-      right = [v.coordinates[x], v.coordinates[y], v.coordinates[z] || 0];
+      left = [u[x], u[y], u[z] || 0];
+      right = [v[x], v[y], v[z] || 0];
 
       verticesLeft.push(left, center);
       verticesRight.push(right, center);
@@ -260,6 +282,221 @@ DecompositionView.prototype._initBaseView = function() {
   }
 };
 
+/**
+ *
+ * Helper method to initialize the markers as one THREE.InstancedMesh per
+ * shape.
+ *
+ * Each sample is an instance in the mesh of its shape. The position and the
+ * scale of the instance are stored in the instance matrix, and the color,
+ * opacity, visibility and emissive attributes are stored in per-instance
+ * buffers, so changing these attributes only writes to the buffers. The
+ * mesh and the position (slot) of each plottable are tracked in
+ * `_instanceMeshes` and `_instanceSlots`.
+ * @private
+ *
+ */
+DecompositionView.prototype._instancedInit = function() {
+  var x = this.visibleDimensions[0], y = this.visibleDimensions[1],
+      z = this.visibleDimensions[2], scope = this, mesh, slot, matrix;
+  var decomp = this.decomp;
+
+  /**
+   * Instanced mesh where each plottable is drawn (indexed by plottable).
+   * @type {THREE.InstancedMesh[]}
+   * @private
+   */
+  this._instanceMeshes = new Array(this.count);
+  /**
+   * Position of each plottable in its instanced mesh (indexed by plottable).
+   * @type {Int32Array}
+   * @private
+   */
+  this._instanceSlots = new Int32Array(this.count);
+
+  _.each(shapes.shapes, function(shape) {
+    scope.markers.push(scope._makeInstancedMarker(shape));
+  });
+
+  // all the markers are spheres to begin with
+  mesh = this.markers[0];
+  _resizeInstancedMarker(mesh, this.count);
+  matrix = mesh.instanceMatrix.array;
+
+  _.times(this.decomp.length, function(i) {
+    slot = mesh.count;
+    mesh.count += 1;
+
+    mesh.userData.indices[slot] = i;
+    scope._instanceMeshes[i] = mesh;
+    scope._instanceSlots[i] = slot;
+
+    // identity matrix translated to the position of the plottable
+    matrix[slot * 16] = 1;
+    matrix[slot * 16 + 5] = 1;
+    matrix[slot * 16 + 10] = 1;
+    matrix[slot * 16 + 12] = decomp.getCoordinate(i, x);
+    matrix[slot * 16 + 13] = decomp.getCoordinate(i, y);
+    matrix[slot * 16 + 14] = decomp.getCoordinate(i, z) || 0;
+    matrix[slot * 16 + 15] = 1;
+
+    // set default to red, visible, full opacity and not emissive
+    mesh.geometry.attributes.color.setXYZ(slot, 1, 0, 0);
+    mesh.geometry.attributes.instanceOpacity.setX(slot, 1);
+    mesh.geometry.attributes.instanceVisible.setX(slot, 1);
+    mesh.geometry.attributes.instanceEmissive.setX(slot, 0);
+  });
+  mesh.visible = mesh.count > 0;
+
+  if (this.decomp.hasConfidenceIntervals()) {
+    var radius = this.getGeometryFactor(), ellipsoid;
+    var geometry = shapes.getGeometry('Sphere', radius);
+
+    _.times(this.decomp.length, function(i) {
+      ellipsoid = new THREE.Mesh(geometry, new THREE.MeshPhongMaterial());
+      ellipsoid.name = decomp.ids[i] + '_ci';
+
+      ellipsoid.material.color = new THREE.Color(0xff0000);
+      ellipsoid.material.transparent = true;
+      ellipsoid.material.opacity = 0.5;
+
+      ellipsoid.position.set(decomp.getCoordinate(i, x),
+                             decomp.getCoordinate(i, y),
+                             decomp.getCoordinate(i, z) || 0);
+      ellipsoid.scale.set(decomp.getConfidenceInterval(i, x) /
+                          radius,
+                          decomp.getConfidenceInterval(i, y) /
+                          radius,
+                          decomp.getConfidenceInterval(i, z) /
+                          radius);
+
+      scope.ellipsoids.push(ellipsoid);
+    });
+  }
+
+  this._initEdges();
+};
+
+/**
+ *
+ * Create an empty instanced mesh for a shape.
+ *
+ * @param {string} shape The name of the shape, see the shapes module.
+ *
+ * @return {THREE.InstancedMesh} The mesh with no instances, its capacity can
+ * be increased with `_resizeInstancedMarker`.
+ * @private
+ *
+ */
+DecompositionView.prototype._makeInstancedMarker = function(shape) {
+  var geometry, material, mesh;
+
+  geometry = new THREE.BufferGeometry().fromGeometry(
+    shapes.getGeometry(shape, this.getGeometryFactor()));
+
+  // the color is multiplied by the per-instance color attribute
+  material = new THREE.MeshPhongMaterial({color: 0xffffff,
+                                          vertexColors: true,
+                                          transparent: true});
+  material.onBeforeCompile = _instancedMarkerShader;
+
+  mesh = new THREE.InstancedMesh(geometry, material, 0);
+  mesh.count = 0;
+  mesh.visible = false;
+
+  // the geometry is centered at the origin, so the bounding sphere can't be
+  // used to cull the instances
+  mesh.frustumCulled = false;
+
+  mesh.userData.shape = shape;
+  mesh.userData.indices = new Int32Array(0);
+
+  _resizeInstancedMarker(mesh, 0);
+
+  return mesh;
+};
+
+/**
+ *
+ * Move a plottable to the instanced mesh of a different shape.
+ *
+ * The plottable is appended to the target mesh, and its slot in the original
+ * mesh is filled with the last instance of that mesh, so that the instances
+ * of each mesh are always contiguous.
+ *
+ * @param {Plottable} plottable The plottable to move.
+ * @param {THREE.InstancedMesh} target The mesh where the plottable is moved.
+ * @private
+ *
+ */
+DecompositionView.prototype._moveInstance = function(plottable, target) {
+  var source = this._instanceMeshes[plottable.idx], last, moved,
+      slot = this._instanceSlots[plottable.idx];
+
+  if (source === target) {
+    return;
+  }
+
+  // grow the buffers geometrically, there can't be more instances than
+  // plottables
+  if (target.count === target.userData.indices.length) {
+    _resizeInstancedMarker(target, Math.min(this.count,
+                                            target.count * 2 || 1));
+  }
+
+  _copyInstance(source, slot, target, target.count);
+  target.userData.indices[target.count] = plottable.idx;
+  this._instanceMeshes[plottable.idx] = target;
+  this._instanceSlots[plottable.idx] = target.count;
+  target.count += 1;
+
+  last = source.count - 1;
+  if (slot !== last) {
+    _copyInstance(source, last, source, slot);
+
+    moved = source.userData.indices[last];
+    source.userData.indices[slot] = moved;
+    this._instanceSlots[moved] = slot;
+  }
+  source.count -= 1;
+
+  source.visible = source.count > 0;
+  target.visible = target.count > 0;
+};
+
+/**
+ *
+ * Flag a per-instance attribute of the instanced markers for upload.
+ *
+ * @param {string} name The name of the attribute, or `'instanceMatrix'`.
+ * @private
+ *
+ */
+DecompositionView.prototype._instancesNeedUpdate = function(name) {
+  _.each(this.markers, function(mesh) {
+    if (name === 'instanceMatrix') {
+      mesh.instanceMatrix.needsUpdate = true;
+    }
+    else {
+      mesh.geometry.attributes[name].needsUpdate = true;
+    }
+  });
+};
+
+/**
+ *
+ * Check if the markers in this view are instanced meshes.
+ *
+ * @return {Boolean} Whether the scatter plot is drawn with instanced meshes.
+ * @private
+ *
+ */
+DecompositionView.prototype._usesInstancing = function() {
+  return Boolean(this.UIState['view.usesInstancing'] &&
+                 this.UIState['view.viewType'] === 'scatter' &&
+                 this.decomp.isScatterType());
+};
+
 DecompositionView.prototype._fastInit = function() {
   if (this.decomp.hasConfidenceIntervals()) {
     throw new Error('Ellipsoids are not supported in fast mode');
@@ -272,7 +509,7 @@ DecompositionView.prototype._fastInit = function() {
       cloud;
 
   var x = this.visibleDimensions[0], y = this.visibleDimensions[1],
-      z = this.visibleDimensions[2];
+      z = this.visibleDimensions[2], decomp = this.decomp;
 
   /**
    * In order to draw large numbers of samples we can't use full-blown
@@ -379,18 +616,17 @@ DecompositionView.prototype._fastInit = function() {
 
   cloud = new THREE.Points(geometry, material);
 
-  this.decomp.apply(function(plottable) {
-    geometry.attributes.position.setXYZ(plottable.idx,
-                                        plottable.coordinates[x],
-                                        plottable.coordinates[y],
-                                        plottable.coordinates[z] || 0);
+  _.times(this.decomp.length, function(i) {
+    geometry.attributes.position.setXYZ(i, decomp.getCoordinate(i, x),
+                                        decomp.getCoordinate(i, y),
+                                        decomp.getCoordinate(i, z) || 0);
 
     // set default to red, visible, full opacity and of scale 1
-    geometry.attributes.color.setXYZ(plottable.idx, 1, 0, 0);
-    geometry.attributes.visible.setX(plottable.idx, 1);
-    geometry.attributes.opacity.setX(plottable.idx, 1);
-    geometry.attributes.emissive.setX(plottable.idx, 0);
-    geometry.attributes.scale.setX(plottable.idx, 1);
+    geometry.attributes.color.setXYZ(i, 1, 0, 0);
+    geometry.attributes.visible.setX(i, 1);
+    geometry.attributes.opacity.setX(i, 1);
+    geometry.attributes.emissive.setX(i, 0);
+    geometry.attributes.scale.setX(i, 1);
   });
 
   geometry.attributes.position.needsUpdate = true;
@@ -482,7 +718,6 @@ DecompositionView.prototype._fastInitParallelPlot = function()
 
   for (var i = 0; i < this.decomp.length; i++)
   {
-    var plottable = this.decomp.plottable[i];
     // Each point in the model maps to (allDimensions.length * 2 - 2)
     // positions due to the use of lines rather than line strips.
     for (var j = 0; j < allDimensions.length; j++)
@@ -491,7 +726,8 @@ DecompositionView.prototype._fastInitParallelPlot = function()
       var globalMin = this.allModels.dimensionRanges.min[allDimensions[j]];
       var globalMax = this.allModels.dimensionRanges.max[allDimensions[j]];
       var maxMinusMin = globalMax - globalMin;
-      var interpVal = (plottable.coordinates[j] - globalMin) / (maxMinusMin);
+      var interpVal = (this.decomp.getCoordinate(i, j) - globalMin) /
+                      (maxMinusMin);
       geometry.attributes.position.setXYZ(attributeIndex,
                                         j,
                                         interpVal,
@@ -573,6 +809,13 @@ DecompositionView.prototype.getVisibleCount = function() {
         perMarkerCount += (attrVisible.getX(i) + 0);
       }
     }
+    else if (marker.isInstancedMesh) {
+      attrVisible = marker.geometry.attributes.instanceVisible;
+
+      for (i = 0; i < marker.count; i++) {
+        perMarkerCount += attrVisible.getX(i);
+      }
+    }
     else {
       // +0 cast bool to int
       perMarkerCount += (marker.visible + 0);
@@ -595,7 +838,8 @@ DecompositionView.prototype.getVisibleCount = function() {
 DecompositionView.prototype.updatePositions = function() {
   var x = this.visibleDimensions[0], y = this.visibleDimensions[1],
       z = this.visibleDimensions[2], scope = this, hasConfidenceIntervals,
-      radius = 0, is2D = (z === null || z === undefined);
+      radius = 0, is2D = (z === null || z === undefined),
+      decomp = this.decomp;
 
   hasConfidenceIntervals = this.decomp.hasConfidenceIntervals();
 
@@ -608,12 +852,12 @@ DecompositionView.prototype.updatePositions = function() {
       (this.UIState['view.viewType'] === 'scatter')) {
     var cloud = this.markers[0];
 
-    this.decomp.apply(function(plottable) {
+    _.times(this.decomp.length, function(i) {
       cloud.geometry.attributes.position.setXYZ(
-        plottable.idx,
-        plottable.coordinates[x] * scope.axesOrientation[0],
-        plottable.coordinates[y] * scope.axesOrientation[1],
-        is2D ? 0 : plottable.coordinates[z] * scope.axesOrientation[2]);
+        i,
+        decomp.getCoordinate(i, x) * scope.axesOrientation[0],
+        decomp.getCoordinate(i, y) * scope.axesOrientation[1],
+        is2D ? 0 : decomp.getCoordinate(i, z) * scope.axesOrientation[2]);
     });
     cloud.geometry.attributes.position.needsUpdate = true;
   }
@@ -622,42 +866,60 @@ DecompositionView.prototype.updatePositions = function() {
     //TODO:  Do we need to do anything when axes are changed in parallel plots?
   }
   else if (this.decomp.isScatterType()) {
-    this.decomp.apply(function(plottable) {
-      var mesh = scope.markers[plottable.idx];
+    var instanced = this._usesInstancing();
+
+    _.times(this.decomp.length, function(i) {
+      var mesh, matrix, offset, px, py, pz;
 
       // always use the original data plus the axis orientation
-      mesh.position.set(
-        plottable.coordinates[x] * scope.axesOrientation[0],
-        plottable.coordinates[y] * scope.axesOrientation[1],
-        is2D ? 0 : plottable.coordinates[z] * scope.axesOrientation[2]);
-      mesh.updateMatrix();
+      px = decomp.getCoordinate(i, x) * scope.axesOrientation[0];
+      py = decomp.getCoordinate(i, y) * scope.axesOrientation[1];
+      pz = is2D ? 0 : decomp.getCoordinate(i, z) * scope.axesOrientation[2];
+
+      if (instanced) {
+        // the position is the translation of the instance matrix
+        matrix = scope._instanceMeshes[i].instanceMatrix.array;
+        offset = scope._instanceSlots[i] * 16;
+
+        matrix[offset + 12] = px;
+        matrix[offset + 13] = py;
+        matrix[offset + 14] = pz;
+      }
+      else {
+        mesh = scope.markers[i];
+        mesh.position.set(px, py, pz);
+        mesh.updateMatrix();
+      }
 
       if (hasConfidenceIntervals) {
-        mesh = scope.ellipsoids[plottable.idx];
+        mesh = scope.ellipsoids[i];
 
-        mesh.position.set(
-          plottable.coordinates[x] * scope.axesOrientation[0],
-          plottable.coordinates[y] * scope.axesOrientation[1],
-          is2D ? 0 : plottable.coordinates[z] * scope.axesOrientation[2]);
+        mesh.position.set(px, py, pz);
 
         // flatten the ellipsoids ever so slightly
-        mesh.scale.set(plottable.ci[x] / radius, plottable.ci[y] / radius,
-                       is2D ? 0.01 : plottable.ci[z] / radius);
+        mesh.scale.set(decomp.getConfidenceInterval(i, x) / radius,
+                       decomp.getConfidenceInterval(i, y) / radius,
+                       is2D ? 0.01 :
+                       decomp.getConfidenceInterval(i, z) / radius);
 
         mesh.updateMatrix();
       }
     });
+
+    if (instanced) {
+      this._instancesNeedUpdate('instanceMatrix');
+    }
   }
   else if (this.decomp.isArrowType()) {
     var target, arrow;
 
-    this.decomp.apply(function(plottable) {
-      arrow = scope.markers[plottable.idx];
+    _.times(this.decomp.length, function(i) {
+      arrow = scope.markers[i];
 
       target = new THREE.Vector3(
-        plottable.coordinates[x] * scope.axesOrientation[0],
-        plottable.coordinates[y] * scope.axesOrientation[1],
-        is2D ? 0 : plottable.coordinates[z] * scope.axesOrientation[2]);
+        decomp.getCoordinate(i, x) * scope.axesOrientation[0],
+        decomp.getCoordinate(i, y) * scope.axesOrientation[1],
+        is2D ? 0 : decomp.getCoordinate(i, z) * scope.axesOrientation[2]);
 
       arrow.setPointsTo(target);
     });
@@ -680,41 +942,68 @@ DecompositionView.prototype.updatePositions = function() {
  * should be redrawn. If this object is not supplied, all the edges are drawn.
  */
 DecompositionView.prototype._redrawEdges = function(plottables) {
-  var u, v, j = 0, left = [], right = [];
+  var u, v, uc, vc, i, j, n, slots, center, left, right, first, last;
   var x = this.visibleDimensions[0], y = this.visibleDimensions[1],
-      z = this.visibleDimensions[2], scope = this,
-      is2D = (z === null), drawAll = (plottables === undefined);
+      z = this.visibleDimensions[2], edges = this.decomp.edges,
+      is2D = (z === null);
 
-  this.decomp.edges.forEach(function(edge) {
-    u = edge[0];
-    v = edge[1];
+  // only look at the edges connected to the plottables
+  slots = this._getEdgeSlots(plottables);
+  n = slots === null ? edges.length : slots.length;
 
-    if (drawAll ||
-        (plottables.indexOf(u) !== -1 || plottables.indexOf(v) !== -1)) {
+  if (n === 0) {
+    return;
+  }
 
-      var center = [(u.coordinates[x] + v.coordinates[x]) / 2,
-                    (u.coordinates[y] + v.coordinates[y]) / 2,
-                    is2D ? 0 : (u.coordinates[z] + v.coordinates[z]) / 2];
+  first = Infinity;
+  last = -1;
 
-      left = [u.coordinates[x], u.coordinates[y],
-              is2D ? 0 : u.coordinates[z]];
-      right = [v.coordinates[x], v.coordinates[y],
-               is2D ? 0 : v.coordinates[z]];
+  for (i = 0; i < n; i++) {
+    j = slots === null ? i : slots[i];
 
-      scope.lines.left.setLineAtIndex(j, left, center);
-      scope.lines.right.setLineAtIndex(j, right, center);
-    }
+    u = edges[j][0];
+    v = edges[j][1];
 
-    j++;
-  });
+    uc = u.coordinates;
+    vc = v.coordinates;
+
+    center = [(uc[x] + vc[x]) / 2, (uc[y] + vc[y]) / 2,
+              is2D ? 0 : (uc[z] + vc[z]) / 2];
+
+    left = [uc[x], uc[y], is2D ? 0 : uc[z]];
+    right = [vc[x], vc[y], is2D ? 0 : vc[z]];
+
+    this.lines.left.setLineAtIndex(j, left, center);
+    this.lines.right.setLineAtIndex(j, right, center);
+
+    first = Math.min(first, j);
+    last = Math.max(last, j);
+  }
 
   // otherwise the geometry will remain unchanged
-  this.lines.left.geometry.attributes.position.needsUpdate = true;
-  this.lines.right.geometry.attributes.position.needsUpdate = true;
+  this.lines.left.linesNeedUpdate(first, last);
+  this.lines.right.linesNeedUpdate(first, last);
 
   this.needsUpdate = true;
 };
 
+/**
+ *
+ * Internal method to find the edges connected to a group of plottables
+ *
+ * @param {Plottable[]} plottables An array of plottables.
+ *
+ * @return {integer[]} The positions of the edges (and of their lines) that
+ * are connected to the plottables, or null if plottables is undefined i.e.
+ * when all the edges should be considered.
+ */
+DecompositionView.prototype._getEdgeSlots = function(plottables) {
+  if (plottables === undefined) {
+    return null;
+  }
+  return this.decomp.getEdgeIndicesByPlottables(plottables);
+};
+
 /**
  *
  * Change the visible coordinates
@@ -843,26 +1132,28 @@ DecompositionView.prototype.hideEdgesForPlottables = function(plottables) {
     return;
   }
 
-  var u, v, j = 0, hideAll, scope = this;
+  var i, j, n, slots, first = Infinity, last = -1;
 
-  hideAll = plottables === undefined;
+  slots = this._getEdgeSlots(plottables);
+  n = slots === null ? this.decomp.edges.length : slots.length;
 
-  this.decomp.edges.forEach(function(edge) {
-    u = edge[0];
-    v = edge[1];
+  if (n === 0) {
+    return;
+  }
 
-    if (hideAll ||
-        (plottables.indexOf(u) !== -1 || plottables.indexOf(v) !== -1)) {
+  for (i = 0; i < n; i++) {
+    j = slots === null ? i : slots[i];
 
-      scope.lines.left.setLineAtIndex(j, [0, 0, 0], [0, 0, 0]);
-      scope.lines.right.setLineAtIndex(j, [0, 0, 0], [0, 0, 0]);
-    }
-    j++;
-  });
+    this.lines.left.setLineAtIndex(j, [0, 0, 0], [0, 0, 0]);
+    this.lines.right.setLineAtIndex(j, [0, 0, 0], [0, 0, 0]);
+
+    first = Math.min(first, j);
+    last = Math.max(last, j);
+  }
 
   // otherwise the geometry will remain unchanged
-  this.lines.left.geometry.attributes.position.needsUpdate = true;
-  this.lines.right.geometry.attributes.position.needsUpdate = true;
+  this.lines.left.linesNeedUpdate(first, last);
+  this.lines.right.linesNeedUpdate(first, last);
 };
 
 /**
@@ -921,6 +1212,20 @@ DecompositionView.prototype.setColor = function(color, group) {
     });
     lines.geometry.attributes.color.needsUpdate = true;
   }
+  else if (this._usesInstancing()) {
+    color = new THREE.Color(color);
+
+    group.forEach(function(plottable) {
+      idx = plottable.idx;
+      scope._instanceMeshes[idx].geometry.attributes.color.setXYZ(
+        scope._instanceSlots[idx], color.r, color.g, color.b);
+
+      if (hasConfidenceIntervals) {
+        scope.ellipsoids[idx].material.color = new THREE.Color(color);
+      }
+    });
+    this._instancesNeedUpdate('color');
+  }
   else if (this.decomp.isScatterType()) {
     group.forEach(function(plottable) {
       idx = plottable.idx;
@@ -975,6 +1280,18 @@ DecompositionView.prototype.setVisibility = function(visible, group) {
     });
     lines.geometry.attributes.visible.needsUpdate = true;
   }
+  else if (this._usesInstancing()) {
+    _.each(group, function(plottable) {
+      scope._instanceMeshes[plottable.idx].geometry.attributes
+        .instanceVisible.setX(scope._instanceSlots[plottable.idx],
+                              visible * 1);
+
+      if (hasConfidenceIntervals) {
+        scope.ellipsoids[plottable.idx].visible = visible;
+      }
+    });
+    this._instancesNeedUpdate('instanceVisible');
+  }
   else {
     _.each(group, function(plottable) {
       scope.markers[plottable.idx].visible = visible;
@@ -1005,7 +1322,7 @@ DecompositionView.prototype.setVisibility = function(visible, group) {
  * view will be have the scale set.
  */
 DecompositionView.prototype.setScale = function(scale, group) {
-  var scope = this;
+  var scope = this, matrix, offset;
 
   if (this.decomp.isArrowType()) {
     throw Error('Cannot change the scale of an arrow.');
@@ -1026,6 +1343,18 @@ DecompositionView.prototype.setScale = function(scale, group) {
            this.decomp.isScatterType()) {
     //Nothing to do for parallel plots.
   }
+  else if (this._usesInstancing()) {
+    // the scale is the diagonal of the instance matrix
+    _.each(group, function(element) {
+      offset = scope._instanceSlots[element.idx] * 16;
+      matrix = scope._instanceMeshes[element.idx].instanceMatrix.array;
+
+      matrix[offset] = scale;
+      matrix[offset + 5] = scale;
+      matrix[offset + 10] = scale;
+    });
+    this._instancesNeedUpdate('instanceMatrix');
+  }
   else {
     _.each(group, function(element) {
       scope.markers[element.idx].scale.set(scale, scale, scale);
@@ -1034,6 +1363,46 @@ DecompositionView.prototype.setScale = function(scale, group) {
   this.needsUpdate = true;
 };
 
+/**
+ * Set the shape for a group of plottables.
+ *
+ * @param {string} shape The name of the shape, see the shapes module.
+ * @param {Plottable[]} group An array of plottables for which the shape
+ * should be set. If this object is not provided, all the plottables in the
+ * view will be have the shape set.
+ *
+ * @throws {Error} If the shape is unknown.
+ */
+DecompositionView.prototype.setShape = function(shape, group) {
+  var scope = this, target, geometry;
+
+  group = group || this.decomp.plottable;
+
+  if (this._usesInstancing()) {
+    target = _.find(this.markers, function(mesh) {
+      return mesh.userData.shape === shape;
+    });
+
+    if (target === undefined) {
+      throw new Error('Unknown shape ' + shape);
+    }
+
+    _.each(group, function(plottable) {
+      scope._moveInstance(plottable, target);
+    });
+  }
+  else {
+    // get the appropriately sized geometry
+    geometry = shapes.getGeometry(shape, this.getGeometryFactor());
+
+    _.each(group, function(plottable) {
+      scope.markers[plottable.idx].geometry = geometry;
+      scope.markers[plottable.idx].userData.shape = shape;
+    });
+  }
+  this.needsUpdate = true;
+};
+
 /**
  * Set the opacity for a group of plottables.
  *
@@ -1071,6 +1440,13 @@ DecompositionView.prototype.setOpacity = function(opacity, group) {
     });
     lines.geometry.attributes.opacity.needsUpdate = true;
   }
+  else if (this._usesInstancing()) {
+    _.each(group, function(plottable) {
+      scope._instanceMeshes[plottable.idx].geometry.attributes
+        .instanceOpacity.setX(scope._instanceSlots[plottable.idx], opacity);
+    });
+    this._instancesNeedUpdate('instanceOpacity');
+  }
   else {
     if (this.decomp.isScatterType()) {
       funk = _changeMeshOpacity;
@@ -1097,8 +1473,8 @@ DecompositionView.prototype.toggleLabelVisibility = function() {
   }
   var scope = this;
 
-  this.decomp.apply(function(plottable) {
-    var arrow = scope.markers[plottable.idx];
+  _.times(this.decomp.length, function(i) {
+    var arrow = scope.markers[i];
     arrow.label.visible = Boolean(arrow.label.visible ^ true);
   });
   this.needsUpdate = true;
@@ -1148,6 +1524,16 @@ DecompositionView.prototype.setEmissive = function(emissive, group) {
     }
     emissives.needsUpdate = true;
   }
+  else if (this._usesInstancing()) {
+    // the emissive attribute is a boolean one
+    emissive = (emissive > 0) * 1;
+
+    for (i = 0; i < group.length; i++) {
+      this._instanceMeshes[group[i].idx].geometry.attributes
+        .instanceEmissive.setX(this._instanceSlots[group[i].idx], emissive);
+    }
+    this._instancesNeedUpdate('instanceEmissive');
+  }
   else {
     for (i = 0; i < group.length; i++) {
       var material = this.markers[group[i].idx].material;
@@ -1166,7 +1552,7 @@ DecompositionView.prototype.setEmissive = function(emissive, group) {
  */
 DecompositionView.prototype.groupByColor = function(names) {
 
-  var colorGroups = {}, groupping, markers = this.markers;
+  var colorGroups = {}, groupping, markers = this.markers, scope = this;
   var plottables = this.decomp.getPlottableByIDs(names);
 
   // we need to retrieve colors in a very different way
@@ -1187,6 +1573,17 @@ DecompositionView.prototype.groupByColor = function(names) {
       return ('000000' + (r ^ g ^ b).toString(16)).slice(-6);
     };
   }
+  else if (this._usesInstancing()) {
+    var color = new THREE.Color();
+
+    groupping = function(plottable) {
+      var colors = scope._instanceMeshes[plottable.idx].geometry.attributes
+                     .color, slot = scope._instanceSlots[plottable.idx];
+
+      color.setRGB(colors.getX(slot), colors.getY(slot), colors.getZ(slot));
+      return color.getHexString();
+    };
+  }
   else {
     if (this.decomp.isScatterType()) {
       groupping = function(plottable) {
@@ -1234,7 +1631,10 @@ DecompositionView.prototype._buildVegaSpec = function() {
     var points = [], marker, i;
     for (i = 0; i < markers.length; i++) {
       marker = markers[i];
-      if (marker.visible) {
+      if (marker.isInstancedMesh) {
+        points = points.concat(instancesAsVegaDataset(marker));
+      }
+      else if (marker.visible) {
         points.push({
           id: marker.name,
           x: marker.position.x,
@@ -1250,15 +1650,41 @@ DecompositionView.prototype._buildVegaSpec = function() {
     return points;
   };
 
+  function instancesAsVegaDataset(mesh) {
+    var points = [], attributes = mesh.geometry.attributes, i, matrix,
+        color = new THREE.Color();
+
+    for (i = 0; i < mesh.count; i++) {
+      if (attributes.instanceVisible.getX(i)) {
+        matrix = mesh.instanceMatrix.array.subarray(i * 16, (i + 1) * 16);
+        color.setRGB(attributes.color.getX(i), attributes.color.getY(i),
+                     attributes.color.getZ(i));
+
+        points.push({
+          id: scope.decomp.ids[mesh.userData.indices[i]],
+          x: matrix[12],
+          y: matrix[13],
+          color: rgbColor(color),
+          originalShape: mesh.userData.shape,
+          shape: getShape[mesh.userData.shape],
+          scale: { x: matrix[0], y: matrix[5] },
+          opacity: attributes.instanceOpacity.getX(i)
+        });
+      }
+    }
+    return points;
+  }
+
   // This is probably horribly slow on QIITA-scale MD files, probably needs
   // some attention
   function plottablesAsMetadata(points, header) {
-    var md = [], point, row, i, j;
+    var md = [], metadata, row, i, j;
     for (i = 0; i < points.length; i++) {
-      point = points[i];
+      // read the metadata once, as it can be decoded on every access
+      metadata = points[i].metadata;
       row = {};
       for (j = 0; j < header.length; j++) {
-        row[header[j]] = point.metadata[j];
+        row[header[j]] = metadata[j];
       }
       md.push(row);
     }
@@ -1379,5 +1805,112 @@ function _changeMeshOpacity(mesh, value, transparent) {
   mesh.material.opacity = value;
 }
 
+/**
+ * Per-instance attributes of the instanced markers and their item sizes. The
+ * position and the scale of each instance are stored in the instance matrix.
+ *
+ * @private
+ */
+var INSTANCE_ATTRIBUTES = {'color': 3, 'instanceOpacity': 1,
+                           'instanceVisible': 1, 'instanceEmissive': 1};
+
+/**
+ * Helper function to change the capacity of an instanced marker.
+ *
+ * The existing instances are preserved, and new buffers are allocated so they
+ * are re-uploaded to the GPU.
+ *
+ * @private
+ */
+function _resizeInstancedMarker(mesh, capacity) {
+  var resize = function(attribute, itemSize) {
+    var array = new Float32Array(capacity * itemSize);
+
+    if (attribute !== undefined) {
+      array.set(attribute.array.subarray(0, mesh.count * itemSize));
+    }
+
+    attribute = new THREE.InstancedBufferAttribute(array, itemSize);
+    attribute.setUsage(THREE.DynamicDrawUsage);
+    return attribute;
+  };
+
+  mesh.instanceMatrix = resize(mesh.instanceMatrix, 16);
+  _.each(INSTANCE_ATTRIBUTES, function(itemSize, name) {
+    mesh.geometry.setAttribute(name, resize(mesh.geometry.attributes[name],
+                                            itemSize));
+  });
+
+  var indices = new Int32Array(capacity);
+  indices.set(mesh.userData.indices.subarray(0, mesh.count));
+  mesh.userData.indices = indices;
+}
+
+/**
+ * Helper function to copy an instance between (or within) instanced markers.
+ *
+ * @private
+ */
+function _copyInstance(source, sourceSlot, target, targetSlot) {
+  var copy = function(from, to) {
+    var size = from.itemSize;
+
+    to.array.set(from.array.subarray(sourceSlot * size,
+                                     (sourceSlot + 1) * size),
+                 targetSlot * size);
+    to.needsUpdate = true;
+  };
+
+  copy(source.instanceMatrix, target.instanceMatrix);
+  _.each(INSTANCE_ATTRIBUTES, function(itemSize, name) {
+    copy(source.geometry.attributes[name], target.geometry.attributes[name]);
+  });
+}
+
+/**
+ * Helper function to modify the shaders of the instanced markers.
+ *
+ * The markers face the camera (like the meshes in ScenePlotView3D.render),
+ * and the opacity, visibility and emissive attributes are read from the
+ * per-instance buffers. Hidden or fully transparent instances are moved
+ * outside of the clipping volume.
+ *
+ * @private
+ */
+function _instancedMarkerShader(shader) {
+  shader.vertexShader = shader.vertexShader
+    .replace('#include <common>', [
+      '#include <common>',
+      'attribute float instanceOpacity;',
+      'attribute float instanceVisible;',
+      'attribute float instanceEmissive;',
+      'varying float vOpacity;',
+      'varying float vEmissive;'].join('\n'))
+    .replace('#include <defaultnormal_vertex>',
+             'vec3 transformedNormal = objectNormal;')
+    .replace('#include <project_vertex>', [
+      'vec4 mvPosition = modelViewMatrix * vec4(instanceMatrix[3].xyz, 1.0);',
+      'mvPosition.xyz += mat3(instanceMatrix) * transformed;',
+      'gl_Position = projectionMatrix * mvPosition;',
+
+      'vOpacity = instanceOpacity;',
+      'vEmissive = instanceEmissive;',
+      'if (instanceVisible == 0.0 || instanceOpacity == 0.0) {',
+      '  gl_Position = vec4(2.0, 2.0, 2.0, 1.0);',
+      '}'].join('\n'));
+
+  // selected markers are highlighted with the same color as the meshes
+  shader.fragmentShader = shader.fragmentShader
+    .replace('#include <common>', [
+      '#include <common>',
+      'varying float vOpacity;',
+      'varying float vEmissive;'].join('\n'))
+    .replace('vec4 diffuseColor = vec4( diffuse, opacity );',
+             'vec4 diffuseColor = vec4(diffuse, opacity * vOpacity);')
+    .replace('vec3 totalEmissiveRadiance = emissive;',
+             'vec3 totalEmissiveRadiance = emissive + ' +
+             'vEmissive * vec3(0.549, 0.549, 0.561);');
+}
+
   return DecompositionView;
 });
@@ -6,16 +6,25 @@
 # The full license is in the file LICENSE.md, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import json
 import pandas as pd
 import numpy as np
 import warnings
 
-from os.path import abspath, dirname, join
+from base64 import b64encode
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from hashlib import sha256
 
-from emperor.qiime_backports.make_3d_plots import (get_custom_coords,
-                                                   remove_nans,
-                                                   scale_custom_coords)
-from emperor.qiime_backports.util import summarize_pcoas
+from os import (cpu_count, getpid, link as os_link, makedirs, remove, replace,
+                sep, symlink, walk)
+from os.path import (abspath, dirname, exists, getsize, join, lexists,
+                     relpath)
+from shutil import copyfile
+from tempfile import TemporaryFile
+
+from emperor import __version__
 
 
 class EmperorSupportFilesError(IOError):
@@ -38,6 +47,15 @@ class EmperorWarning(UserWarning):
     pass
 
 
+# numeric types that can be decoded by the JavaScript code, these are always
+# serialized as little-endian values (the byte order used by browsers)
+ENCODED_DTYPES = {'float32': '<f4', 'int32': '<i4', 'uint8': '<u1',
+                  'uint16': '<u2'}
+
+# file where deploy_support_files records the files it has written
+MANIFEST_NAME = '.emperor-manifest.json'
+
+
 def get_emperor_project_dir():
     """ Returns the top-level Emperor directory
 
@@ -56,6 +74,162 @@ def get_emperor_support_files_dir():
     return join(get_emperor_project_dir(), 'emperor/support_files/')
 
 
+@lru_cache(maxsize=None)
+def _support_files_digests(source):
+    """SHA-256 digest of each of the support files
+
+    Parameters
+    ----------
+    source : str
+        Directory with the support files.
+
+    Returns
+    -------
+    dict
+        The hexadecimal digest of each file keyed by its path relative to
+        ``source`` (using ``/`` as the separator). The digests are computed
+        once per process, as the installed support files don't change.
+    """
+    digests = {}
+    for root, _, names in walk(source):
+        for name in names:
+            path = join(root, name)
+            with open(path, 'rb') as f:
+                digest = sha256(f.read()).hexdigest()
+            digests[relpath(path, source).replace(sep, '/')] = digest
+
+    return digests
+
+
+def _replace(path, create):
+    """Atomically create or replace a file
+
+    Parameters
+    ----------
+    path : str
+        The file to create.
+    create : callable
+        Function that creates a file at the path it is called with.
+
+    Notes
+    -----
+    The file is created next to ``path`` and renamed, so other processes
+    deploying to the same directory never see a partially written file.
+    """
+    temporary = '%s.%d.tmp' % (path, getpid())
+    try:
+        create(temporary)
+        replace(temporary, path)
+    finally:
+        if lexists(temporary):
+            remove(temporary)
+
+
+def deploy_support_files(target, link=None, shared=None):
+    """Copy or link the support files, skipping the ones that are up to date
+
+    Parameters
+    ----------
+    target : str
+        Directory where the support files are deployed. If it doesn't exist
+        it is created.
+    link : {None, 'symlink', 'hardlink'}, optional
+        By default the files are copied. ``"symlink"`` and ``"hardlink"``
+        create links to the files instead, hard links fall back to copies
+        when they are not supported (for example across file systems).
+    shared : str, optional
+        Directory with versioned copies of the support files that ``link``
+        points to. The support files are copied to a subdirectory named after
+        the Emperor version and the digest of the files, so linked plots
+        are not modified when Emperor is updated. By default the links point
+        to the installed support files. Ignored when ``link`` is ``None``.
+
+    Returns
+    -------
+    list of str
+        Paths (relative to ``target``) of the files that were written.
+
+    Raises
+    ------
+    ValueError
+        If ``link`` is not one of the supported values.
+
+    Notes
+    -----
+    The SHA-256 digest of each deployed file is recorded in a manifest
+    stored in ``target``. Files whose digest and size are unchanged are not
+    written again, so deploying to the same directory many times (for
+    example once per plot) only copies the files the first time, and after
+    Emperor is updated only the modified files are copied. Files in
+    ``target`` that are not support files are left untouched.
+    """
+    if link not in (None, 'symlink', 'hardlink'):
+        raise ValueError('Unsupported link type "%s", the valid options are:'
+                         ' symlink, hardlink' % link)
+
+    source = abspath(get_emperor_support_files_dir())
+    digests = _support_files_digests(source)
+
+    if link is not None and shared is not None:
+        tree = sha256(json.dumps(digests, sort_keys=True).encode())
+        source = abspath(join(shared, '%s-%s' % (__version__,
+                                                 tree.hexdigest()[:12])))
+        deploy_support_files(source)
+
+    manifest_path = join(target, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    # the files have to be written again when switching between links and
+    # copies, or when links point to a different directory
+    if (manifest.get('link') != link or
+       manifest.get('source') != (source if link else None)):
+        manifest = {}
+    deployed = manifest.get('files', {})
+
+    written = []
+    for name, digest in sorted(digests.items()):
+        src = join(source, *name.split('/'))
+        dst = join(target, *name.split('/'))
+
+        # exists is False for broken symbolic links
+        if (deployed.get(name) == digest and exists(dst) and
+           getsize(dst) == getsize(src)):
+            continue
+
+        makedirs(dirname(dst), exist_ok=True)
+        if link == 'symlink':
+            _replace(dst, partial(symlink, src))
+        elif link == 'hardlink':
+            def create(path, src=src):
+                try:
+                    os_link(src, path)
+                except OSError:
+                    copyfile(src, path)
+            _replace(dst, create)
+        else:
+            _replace(dst, partial(copyfile, src))
+
+        deployed[name] = digest
+        written.append(name)
+
+    if written or not manifest:
+        makedirs(target, exist_ok=True)
+        contents = json.dumps({'link': link,
+                               'source': source if link else None,
+                               'files': deployed}, sort_keys=True)
+
+        def create(path):
+            with open(path, 'w') as f:
+                f.write(contents)
+        _replace(manifest_path, create)
+
+    return written
+
+
 def nbinstall(overwrite=False, user=True, prefix=None):
     """Copies resources to the '/nbextensions' folder in your IPython directory
 
@@ -114,7 +288,8 @@ def preprocess_coords_file(coords_header, coords_data, coords_eigenvals,
                            coords_pct, mapping_header, mapping_data,
                            custom_axes=None, jackknifing_method=None,
                            is_comparison=False,
-                           pct_variation_below_one=False):
+                           pct_variation_below_one=False,
+                           scale_jackknifed=False):
     """Process a PCoA data and handle customizations in the contents
 
     This controller function handles any customization that has to be done to
@@ -131,29 +306,37 @@ def preprocess_coords_file(coords_header, coords_data, coords_eigenvals,
     coords_data: 2d array of float or list of 2d array of float
         If 2d array of float, matrix of coordinates in the PCoA file
         If list of 2d array of float,  with coordinates for each file
-        (if jackknifing or comparing plots)
+        (if jackknifing or comparing plots). If jackknifing, this can also be
+        an iterable that is consumed one set of coordinates at a time, or a
+        tuple of arrays that are read in blocks, for example memory-mapped
+        from a file (see summarize_jackknifed_stream).
     coords_eigenvals: 1d or 2d array of float
         If 1d array, eigenvalues for the coordinates file
         If 2d array, list of  arrays with the eigenvalues
-        (if jackknifing or comparing plots)
+        (if jackknifing or comparing plots), or an iterable if coords_data is
+        an iterable
     coords_pct: 1d or 2d array of float
         If 1d array, the percent explained by each principal coordinates axis
         If 2d array, a list of lists with numpy arrays (if jackknifing or
         comparing plots)
-    mapping_header: list of str
-        mapping file headers names
-    mapping_data: list of lists of str
-        mapping file data
+    mapping_header: list of str or None
+        mapping file headers names, ignored if mapping_data is a DataFrame
+    mapping_data: list of lists of str or pd.DataFrame
+        mapping file data, or a DataFrame indexed by sample identifier (only
+        the columns in custom_axes are used)
     custom_axes: str, optional
         name of the mapping data fields to add to coords_data. Default: None
-    jackknifing_method: {'sdev', 'IRQ', None}, optional
-        For more info see qiime.util.summarize_pcoas. Default: None
+    jackknifing_method: {'sdev', 'IQR', 'ideal_fourths', None}, optional
+        For more info see summarize_jackknifed. Default: None
     is_comparison: bool, optional
         whether or not the inputs should be considered as the ones for a
         comparison plot. Default: false
     pct_variation_below_one: bool, optional
         boolean to allow percet variation of the axes be under one.
         Default: false
+    scale_jackknifed: bool, optional
+        whether to divide each set of jackknifed coordinates by its largest
+        absolute value before summarizing them. Default: false
 
     Returns
     -------
@@ -189,32 +372,36 @@ def preprocess_coords_file(coords_header, coords_data, coords_eigenvals,
             ("Cannot process a comparison with the data from a single "
              "coordinates file")
 
-    mapping_file = [mapping_header] + mapping_data
+    if custom_axes and not isinstance(mapping_data, pd.DataFrame):
+        mapping_data = pd.DataFrame(mapping_data, columns=mapping_header)
+        mapping_data.index = mapping_data[mapping_header[0]]
+
     coords_file = [coords_header, coords_data]
 
     # number PCoA files; zero for any case except for comparison plots
     clones = 0
 
     if custom_axes and isinstance(coords_data, np.ndarray):
-        # sequence ported from qiime/scripts/make_3d_plots.py @ 9115351
-        get_custom_coords(custom_axes, mapping_file, coords_file)
-        remove_nans(coords_file)
-        scale_custom_coords(custom_axes, coords_file)
-    elif isinstance(coords_data, list) and not is_comparison:
+        coords_file = list(embed_custom_axes(coords_header, coords_data,
+                                             mapping_data, custom_axes))
+    elif not isinstance(coords_data, np.ndarray) and not is_comparison:
         # take the first pcoa file as the master set of coordinates
-        master_pcoa = [coords_header[0], coords_data[0],
-                       coords_eigenvals[0], coords_pct[0]]
-
-        # support pcoas must be a list of lists where each list contain
-        # all the elements that compose a coordinates file
-        support_pcoas = [[h, d, e, p] for h, d, e, p in zip(coords_header,
-                         coords_data, coords_eigenvals, coords_pct)]
+        identifiers, master_pct = coords_header[0], coords_pct[0]
+
+        # lists are summarized at once, other iterables one at a time so they
+        # are never fully loaded in memory
+        if isinstance(coords_data, list):
+            if scale_jackknifed:
+                coords_data = [coords / np.max(np.abs(coords))
+                               for coords in coords_data]
+            summarize = summarize_jackknifed
+        else:
+            summarize = partial(summarize_jackknifed_stream,
+                                scale=scale_jackknifed)
 
         # do not apply procrustes, at least not for now
-        coords_data, coords_low, coords_high, eigenvalues_average, \
-            identifiers = summarize_pcoas(master_pcoa, support_pcoas,
-                                          method=jackknifing_method,
-                                          apply_procrustes=False)
+        coords_data, coords_low, coords_high, eigenvalues_average = \
+            summarize(coords_data, coords_eigenvals, method=jackknifing_method)
 
         # custom axes and jackknifing is a tricky thing to do, you only have to
         # add the custom values to the master file which is represented as the
@@ -222,10 +409,8 @@ def preprocess_coords_file(coords_header, coords_data, coords_eigenvals,
         # axis then you have to change the values of coords_high and of
         # coords_low to something really small so that WebGL work properly
         if custom_axes:
-            coords_file = [master_pcoa[0], coords_data]
-            get_custom_coords(custom_axes, mapping_file, coords_file)
-            remove_nans(coords_file)
-            scale_custom_coords(custom_axes, coords_file)
+            _, coords_data = embed_custom_axes(identifiers, coords_data,
+                                               mapping_data, custom_axes)
 
             # this opens support for as many custom axes as needed
             axes = len(custom_axes)
@@ -236,13 +421,11 @@ def preprocess_coords_file(coords_header, coords_data, coords_eigenvals,
                                              fill_value=0.00001),
                                      coords_high])
 
-            coords_data = coords_file[1]
-
-        if master_pcoa[3][0] < 1.0 and not pct_variation_below_one:
-            master_pcoa[3] = master_pcoa[3]*100
+        if master_pct[0] < 1.0 and not pct_variation_below_one:
+            master_pct = master_pct*100
 
         # return a value containing coords_low and coords_high
-        return identifiers, coords_data, eigenvalues_average, master_pcoa[3], \
+        return identifiers, coords_data, eigenvalues_average, master_pct, \
             coords_low, coords_high, clones
     # comparison plots are processed almost individually
     elif isinstance(coords_data, list) and is_comparison:
@@ -274,10 +457,9 @@ def preprocess_coords_file(coords_header, coords_data, coords_eigenvals,
         coords_file = [out_headers, out_coords]
 
         if custom_axes:
-            # sequence ported from qiime/scripts/make_3d_plots.py @ 9115351
-            get_custom_coords(custom_axes, mapping_file, coords_file)
-            remove_nans(coords_file)
-            scale_custom_coords(custom_axes, coords_file)
+            coords_file = list(embed_custom_axes(coords_file[0],
+                                                 coords_file[1], mapping_data,
+                                                 custom_axes))
 
     if coords_pct[0] < 1.0 and not pct_variation_below_one:
         coords_pct = coords_pct*100
@@ -288,6 +470,365 @@ def preprocess_coords_file(coords_header, coords_data, coords_eigenvals,
         None, None, clones
 
 
+def embed_custom_axes(coords_header, coords_data, mapping, custom_axes):
+    """Add custom axes as the first columns of a coordinates matrix
+
+    Parameters
+    ----------
+    coords_header : list of str
+        Sample identifiers for each row in ``coords_data``.
+    coords_data : np.ndarray
+        Matrix of coordinates.
+    mapping : pd.DataFrame
+        Sample metadata indexed by sample identifier, should include all the
+        columns in ``custom_axes``.
+    custom_axes : list of str
+        Names of the metadata columns to embed in the coordinates.
+
+    Returns
+    -------
+    list of str
+        Sample identifiers, excluding any samples with missing values.
+    np.ndarray
+        Coordinates with the custom axes as the first columns, excluding any
+        samples with missing values. The custom axes are scaled to range from
+        the minimum of the first (non-custom) axis to twice its maximum.
+
+    Raises
+    ------
+    ValueError
+        If any of the ``custom_axes`` is not a column in ``mapping``.
+
+    Notes
+    -----
+    This function produces the same result as ``get_custom_coords``,
+    ``remove_nans`` and ``scale_custom_coords`` in
+    ``emperor.qiime_backports.make_3d_plots``, but processes all the samples
+    and axes at once. Values that are not numeric and samples that are not in
+    ``mapping`` are considered missing.
+    """
+    missing = [axis for axis in custom_axes if axis not in mapping.columns]
+    if missing:
+        raise ValueError('Could not find the custom axes %s in the metadata '
+                         'headers: %s' % (', '.join(missing),
+                                          ', '.join(mapping.columns)))
+
+    custom = mapping[custom_axes]
+    if not custom.index.is_unique:
+        custom = custom[~custom.index.duplicated()]
+
+    custom = custom.reindex(coords_header).apply(pd.to_numeric,
+                                                 errors='coerce')
+
+    coords = np.hstack([custom.to_numpy(dtype=float), coords_data])
+
+    # remove any samples with missing values
+    keep = ~np.isnan(coords).any(axis=1)
+    coords = coords[keep]
+    coords_header = np.asarray(coords_header)[keep].tolist()
+
+    # affine transformation of the custom axes to the range of the first axis
+    axes = len(custom_axes)
+    to_mn = coords[:, axes].min()
+    to_mx = 2 * coords[:, axes].max()
+
+    from_mn = coords[:, :axes].min(axis=0)
+    from_mx = coords[:, :axes].max(axis=0)
+
+    coords[:, :axes] = ((coords[:, :axes] - from_mn) / (from_mx - from_mn) *
+                        (to_mx - to_mn) + to_mn)
+
+    return coords_header, coords
+
+
+def summarize_jackknifed(coords_data, coords_eigenvals, method='IQR'):
+    """Summarize a set of jackknifed ordinations
+
+    Parameters
+    ----------
+    coords_data : list of np.ndarray or np.ndarray
+        Coordinates of each replicate, all with the same shape and with the
+        samples in the same order. A 3D array is interpreted as replicates by
+        samples by axes. The first replicate is the master set of coordinates.
+    coords_eigenvals : list of np.ndarray or np.ndarray
+        Eigenvalues of each replicate.
+    method : {'IQR', 'ideal_fourths', 'sdev'}, optional
+        How to compute the ranges around the average, using the inter-quartile
+        range (``'IQR'``), the ideal fourths (``'ideal_fourths'``) or the
+        standard deviation (``'sdev'``). Defaults to ``'IQR'``.
+
+    Returns
+    -------
+    np.ndarray
+        The average coordinates.
+    np.ndarray
+        The lower values of the ranges, the first quartile for ``'IQR'`` and
+        ``'ideal_fourths'`` or half a standard deviation below zero for
+        ``'sdev'``.
+    np.ndarray
+        The upper values of the ranges, the third quartile for ``'IQR'`` and
+        ``'ideal_fourths'`` or half a standard deviation above zero for
+        ``'sdev'``.
+    np.ndarray
+        The average eigenvalues.
+
+    Raises
+    ------
+    ValueError
+        If ``method`` is not one of the supported methods.
+
+    Notes
+    -----
+    This function produces the same result as ``summarize_pcoas`` in
+    ``emperor.qiime_backports.util`` (without procrustes), but operates on
+    all the replicates at once. The sign of each axis in a replicate is
+    flipped when doing so brings it closer to the master coordinates.
+    """
+    _validate_jackknifing_method(method)
+
+    replicates = np.array(coords_data, dtype=float)
+    master = replicates[0]
+
+    # distance to the master coordinates for each replicate and axis, with
+    # and without flipping the sign
+    same = np.abs(master - replicates).sum(axis=1)
+    flipped = np.abs(master + replicates).sum(axis=1)
+    replicates *= np.where(same > flipped, -1.0, 1.0)[:, np.newaxis, :]
+
+    average = replicates.mean(axis=0)
+
+    if method == 'sdev':
+        sdevs = replicates.std(axis=0, ddof=1)
+        low, high = -sdevs / 2, sdevs / 2
+    else:
+        replicates.sort(axis=0)
+        low, high = _quartiles(replicates, method)
+
+    eigenvalues = np.asarray(coords_eigenvals, dtype=float).mean(axis=0)
+
+    return average, low, high, eigenvalues
+
+
+def summarize_jackknifed_stream(coords_data, coords_eigenvals, method='IQR',
+                                chunk_bytes=2**26, scale=False):
+    """Summarize jackknifed ordinations one replicate at a time
+
+    Parameters
+    ----------
+    coords_data : iterable of np.ndarray
+        Coordinates of each replicate, all with the same shape and with the
+        samples in the same order. The first replicate is the master set of
+        coordinates. A list or tuple of arrays (for example memory-mapped
+        from a file) is read again to compute the quartiles, instead of
+        writing the replicates to a temporary file.
+    coords_eigenvals : iterable of np.ndarray
+        Eigenvalues of each replicate.
+    method : {'IQR', 'ideal_fourths', 'sdev'}, optional
+        How to compute the ranges around the average. Defaults to ``'IQR'``.
+    chunk_bytes : int, optional
+        Approximate number of bytes that are loaded into memory at once when
+        computing the quartiles. Defaults to 64 MiB.
+    scale : bool, optional
+        Whether to divide each replicate by its largest absolute value before
+        summarizing it. Defaults to ``False``.
+
+    Returns
+    -------
+    np.ndarray
+        The average coordinates.
+    np.ndarray
+        The lower values of the ranges.
+    np.ndarray
+        The upper values of the ranges.
+    np.ndarray
+        The average eigenvalues.
+
+    Raises
+    ------
+    ValueError
+        If ``method`` is not one of the supported methods.
+        If there are no replicates.
+
+    See Also
+    --------
+    summarize_jackknifed
+
+    Notes
+    -----
+    The inputs are only iterated once, so they can be generators that load
+    each replicate on demand. The average and the standard deviation are
+    updated with each replicate using Welford's algorithm. The quartiles are
+    exact and are computed for a block of samples at a time, either from
+    ``coords_data`` when it's a list or tuple, or from a temporary file where
+    the replicates are written as they are iterated.
+    """
+    _validate_jackknifing_method(method)
+
+    # sequences can be sliced again, only the scaling and the sign of each
+    # axis are needed to compute the quartiles from them
+    stored = isinstance(coords_data, (list, tuple))
+
+    n, spool, factors = 0, None, []
+    try:
+        for coords, eigvals in zip(coords_data, coords_eigenvals):
+            coords = np.array(coords, dtype=float)
+            factor = np.ones(coords.shape[1])
+
+            if scale:
+                factor /= np.max(np.abs(coords))
+                coords *= factor
+
+            if n == 0:
+                master = coords
+                average = np.zeros_like(coords)
+                squares = np.zeros_like(coords)
+                eigenvalues = np.zeros(len(eigvals))
+
+                if method != 'sdev' and not stored:
+                    spool = TemporaryFile()
+            else:
+                same = np.abs(master - coords).sum(axis=0)
+                flipped = np.abs(master + coords).sum(axis=0)
+                signs = np.where(same > flipped, -1.0, 1.0)
+                coords *= signs
+                factor *= signs
+
+            factors.append(factor)
+            n += 1
+            delta = coords - average
+            average += delta / n
+            squares += delta * (coords - average)
+            eigenvalues += eigvals
+
+            if spool is not None:
+                coords.tofile(spool)
+
+        if n == 0:
+            raise ValueError('At least one replicate is needed to summarize '
+                             'jackknifed ordinations')
+
+        if method == 'sdev':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sdevs = np.sqrt(squares / (n - 1))
+            low, high = -sdevs / 2, sdevs / 2
+        else:
+            if stored:
+                replicates = coords_data[:n]
+                factors = np.array(factors)[:, np.newaxis, :]
+            else:
+                spool.flush()
+                replicates = np.memmap(spool, dtype=float, mode='r',
+                                       shape=(n, ) + average.shape)
+
+            low, high = np.empty_like(average), np.empty_like(average)
+            step = max(1, chunk_bytes // (n * average[0].nbytes))
+            for start in range(0, len(average), step):
+                block = slice(start, start + step)
+                if stored:
+                    chunk = np.array([replica[block] for replica in
+                                      replicates], dtype=float)
+                    chunk *= factors
+                else:
+                    chunk = np.array(replicates[:, block])
+                chunk.sort(axis=0)
+                low[block], high[block] = _quartiles(chunk, method)
+
+            del replicates
+    finally:
+        if spool is not None:
+            spool.close()
+
+    return average, low, high, eigenvalues / n
+
+
+def parallel_map(function, iterable, n_jobs=1):
+    """Apply a function to each element of an iterable using a thread pool
+
+    Parameters
+    ----------
+    function : callable
+        The function to apply, it's called with one element at a time.
+    iterable : iterable
+        The elements to process.
+    n_jobs : int, optional
+        Number of threads to use. ``1`` (the default) or ``None`` process the
+        elements serially in the calling thread, negative values are relative
+        to the number of processors, e.g. ``-1`` uses all of them.
+
+    Returns
+    -------
+    generator
+        The results, in the same order as the elements in ``iterable``.
+
+    Raises
+    ------
+    ValueError
+        If ``n_jobs`` is zero.
+
+    Notes
+    -----
+    The iterable is consumed lazily, and at most ``2 * n_jobs`` elements are
+    processed ahead of the consumer of the results. If ``function`` raises an
+    exception it is raised when the corresponding result is reached. Threads
+    are only useful when ``function`` releases the GIL, as most of NumPy and
+    pandas' heavy operations do.
+    """
+    if n_jobs is None:
+        n_jobs = 1
+    elif n_jobs == 0:
+        raise ValueError('n_jobs cannot be zero')
+    elif n_jobs < 0:
+        n_jobs = max(1, (cpu_count() or 1) + 1 + n_jobs)
+
+    def serial():
+        for element in iterable:
+            yield function(element)
+
+    def threaded():
+        with ThreadPoolExecutor(n_jobs) as executor:
+            pending = deque()
+            for element in iterable:
+                pending.append(executor.submit(function, element))
+
+                if len(pending) >= 2 * n_jobs:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+    return serial() if n_jobs == 1 else threaded()
+
+
+def _validate_jackknifing_method(method):
+    methods = {'IQR', 'ideal_fourths', 'sdev'}
+    if method not in methods:
+        raise ValueError('Unsupported jackknifing method "%s", the valid '
+                         'options are: %s' % (method,
+                                              ', '.join(sorted(methods))))
+
+
+def _quartiles(replicates, method):
+    """Lower and upper quartiles of replicates sorted along the first axis"""
+    n = len(replicates)
+
+    if method == 'IQR':
+        # medians of the lower and upper halves, excluding the median itself
+        # when the number of replicates is odd
+        half = n // 2
+        low = np.median(replicates[:half], axis=0)
+        high = np.median(replicates[n - half:], axis=0)
+    elif n < 3:
+        low = np.full(replicates.shape[1:], np.nan)
+        high = np.full(replicates.shape[1:], np.nan)
+    else:
+        j, h = divmod(n / 4. + 5 / 12., 1)
+        j = int(j)
+        low = (1 - h) * replicates[j - 1] + h * replicates[j]
+        high = (1 - h) * replicates[n - j] + h * replicates[n - j - 1]
+
+    return low, high
+
+
 def validate_and_process_custom_axes(mf, custom_axes):
     """Validate and process mapping file for custom axes
 
@@ -383,3 +924,233 @@ def resolve_stable_url(version, base_url):
         version = version.replace('b', '-beta.')
 
     return base_url % version
+
+
+class Base64Buffer(object):
+    """Bytes of an array that are base64-encoded as they are serialized
+
+    Parameters
+    ----------
+    array : np.ndarray
+        C-contiguous array with the bytes to encode.
+
+    Notes
+    -----
+    ``iterencode_json`` serializes these objects as a JSON string with the
+    same contents as ``b64encode(array.tobytes())``, but the bytes are
+    encoded in chunks instead of creating the whole string at once.
+    """
+    # a multiple of 3 bytes, so the chunks can be concatenated
+    chunk_size = 3 * 2**14
+
+    def __init__(self, array):
+        self.array = array
+
+    def iterencode(self):
+        """Serialize the buffer as a JSON string
+
+        Returns
+        -------
+        generator of str
+            The quoted base64-encoded bytes of the array.
+        """
+        data = memoryview(self.array.reshape(-1)).cast('B')
+
+        yield '"'
+        for start in range(0, len(data), self.chunk_size):
+            yield b64encode(data[start:start + self.chunk_size]).decode(
+                'ascii')
+        yield '"'
+
+
+def encode_array(array, dtype='float32', lazy=False):
+    """Encode a numeric array as a base64 string of little-endian values
+
+    Parameters
+    ----------
+    array : array_like
+        The numeric data to encode. Multi-dimensional arrays are serialized in
+        row-major order.
+    dtype : {'float32', 'int32', 'uint8', 'uint16'}, optional
+        The type used to represent each element in the buffer. Defaults to
+        ``'float32'``.
+    lazy : bool, optional
+        Whether to defer the base64 encoding until the data is serialized by
+        ``iterencode_json``. Defaults to ``False``.
+
+    Returns
+    -------
+    dict
+        A dictionary with the type (``dtype``), the dimensions (``shape``) and
+        the base64-encoded bytes (``data``) of the array. If ``lazy`` is
+        ``True``, ``data`` is a ``Base64Buffer``.
+
+    Raises
+    ------
+    ValueError
+        If ``dtype`` is not one of the supported types.
+
+    Notes
+    -----
+    The resulting object is decoded by ``util.decodeArray`` in the JavaScript
+    code.
+    """
+    if dtype not in ENCODED_DTYPES:
+        raise ValueError('Unsupported dtype "%s", the valid options are: %s' %
+                         (dtype, ', '.join(sorted(ENCODED_DTYPES))))
+
+    array = np.ascontiguousarray(array, dtype=ENCODED_DTYPES[dtype])
+
+    if lazy:
+        data = Base64Buffer(array)
+    else:
+        data = b64encode(array.tobytes()).decode('ascii')
+
+    return {'dtype': dtype, 'shape': list(array.shape), 'data': data}
+
+
+def encode_categories(values):
+    """Dictionary-encode a column of values
+
+    Parameters
+    ----------
+    values : pd.Series or pd.Index
+        The values to encode, these are represented as strings regardless of
+        their original type.
+
+    Returns
+    -------
+    list of str
+        The unique values in the order in which they first appear.
+    np.ndarray
+        The position of each element of ``values`` in the list of unique
+        values, using the smallest integer type supported by ``encode_array``
+        that can represent all the positions.
+
+    Notes
+    -----
+    Values are converted to strings after the encoding is computed, so the
+    conversion only happens once per unique value. Values that are different
+    but are represented by the same string are merged together.
+    """
+    codes, uniques = pd.factorize(values)
+    uniques = uniques.astype(str)
+
+    # missing values are represented as "nan" (same as DataFrame.astype(str))
+    missing = codes == -1
+    if missing.any():
+        codes[missing] = len(uniques)
+        uniques = uniques.append(pd.Index(['nan']))
+
+    # merge any values that have the same string representation
+    remap, uniques = pd.factorize(uniques)
+    codes = remap[codes]
+
+    if len(uniques) <= 2**8:
+        dtype = np.uint8
+    elif len(uniques) <= 2**16:
+        dtype = np.uint16
+    else:
+        dtype = np.int32
+
+    return uniques.tolist(), codes.astype(dtype)
+
+
+def _is_plain_json(obj):
+    """Whether an object is a JSON scalar or a list of them"""
+    if isinstance(obj, (list, tuple)):
+        return all(_is_plain_json(element) for element in obj)
+    return isinstance(obj, (str, int, float, type(None)))
+
+
+def iterencode_json(obj, batch_size=1000, **kwargs):
+    """Serialize an object as JSON in chunks
+
+    Parameters
+    ----------
+    obj : object
+        The object to serialize. In addition to the types supported by
+        ``json.dumps``, it can contain NumPy arrays (serialized as nested
+        lists, like ``ndarray.tolist``) and ``Base64Buffer`` objects.
+    batch_size : int, optional
+        Number of elements of a list or rows of an array that are serialized
+        at once.
+    **kwargs
+        Keyword arguments passed to ``json.dumps``.
+
+    Returns
+    -------
+    generator of str
+        The serialized object, joining the chunks results in the same string
+        as ``json.dumps(obj, **kwargs)``.
+
+    Notes
+    -----
+    Unlike ``json.JSONEncoder.iterencode``, which is written in Python and
+    yields every token separately, the lists are serialized in batches of
+    ``batch_size`` elements by ``json.dumps`` (which uses the C encoder when
+    available). Dictionaries, short lists of lists or dictionaries, and the
+    batches of long lists with anything other than strings, numbers,
+    ``None`` or lists of them, are traversed one element at a time, so the
+    size of the chunks is bounded by the size of the batches. Arrays are
+    converted to lists one batch of rows at a time, so the lists of the
+    whole array are never created. The ``indent`` and ``separators``
+    arguments are not supported.
+    """
+    if 'indent' in kwargs or 'separators' in kwargs:
+        raise ValueError('The indent and separators arguments are not '
+                         'supported')
+
+    containers = (list, tuple, dict, np.ndarray, Base64Buffer)
+
+    if isinstance(obj, Base64Buffer):
+        yield from obj.iterencode()
+    elif isinstance(obj, np.ndarray) and obj.ndim:
+        yield '['
+        for start in range(0, len(obj), batch_size):
+            if start:
+                yield ', '
+            yield json.dumps(obj[start:start + batch_size].tolist(),
+                             **kwargs)[1:-1]
+        yield ']'
+    elif isinstance(obj, np.ndarray):
+        yield json.dumps(obj.tolist(), **kwargs)
+    elif isinstance(obj, (list, tuple)) and len(obj) > batch_size:
+        yield '['
+        for start in range(0, len(obj), batch_size):
+            if start:
+                yield ', '
+
+            batch = obj[start:start + batch_size]
+
+            # batches with dictionaries can have arrays or lazy buffers that
+            # json.dumps can't serialize
+            if all(_is_plain_json(element) for element in batch):
+                yield json.dumps(batch, **kwargs)[1:-1]
+            else:
+                for i, element in enumerate(batch):
+                    if i:
+                        yield ', '
+                    yield from iterencode_json(element, batch_size, **kwargs)
+        yield ']'
+    elif (isinstance(obj, (list, tuple)) and
+          any(isinstance(element, containers) for element in obj)):
+        # short lists can have large elements (like the metadata columns)
+        yield '['
+        for i, element in enumerate(obj):
+            if i:
+                yield ', '
+            yield from iterencode_json(element, batch_size, **kwargs)
+        yield ']'
+    elif (isinstance(obj, dict) and obj and
+          all(isinstance(key, str) for key in obj)):
+        keys = sorted(obj) if kwargs.get('sort_keys') else list(obj)
+
+        yield '{'
+        for i, key in enumerate(keys):
+            yield '%s%s: ' % (', ' if i else '',
+                              json.dumps(key, **kwargs))
+            yield from iterencode_json(obj[key], batch_size, **kwargs)
+        yield '}'
+    else:
+        yield json.dumps(obj, **kwargs)
@@ -68,6 +68,7 @@ setup(
                     'support_files/templates/*.html']},
     data_files={},
     install_requires=base,
+    entry_points={'console_scripts': ['emperor=emperor.cli:emperor']},
     extras_require={'doc': doc, 'test': test, 'all': all_deps},
     long_description=long_description,
     long_description_content_type='text/markdown',
@@ -107,6 +107,20 @@ requirejs([
           'PC.355': ['PC.355', 'YATGCTGCCTCCCGTAGGAGT', 'D', '-9999'],
           'PC.354': ['PC.354', 'YATGCTGCCTCCCGTAGGAGT', 'D', '0'],
           'PC.356': ['PC.356', 'YATGCTGCCTCCCGTAGGAGT', 'D', '100000'] };
+
+        // trajectories for mappingFileData as computed by Emperor, note that
+        // samples with the same value in the gradient are kept in the same
+        // order as in mappingFileData
+        this.precomputed = {
+          'gradient': 'DOB', 'trajectory': 'Treatment',
+          'names': ['Fast', 'Control'], 'offsets': [0, 4, 9],
+          'indices': new Int32Array([7, 8, 1, 0, 2, 6, 4, 3, 5]),
+          'values': [20071112, 20080116, 20080116, 20080116, 20061126,
+                     20061218, 20061218, 20070314, 20071210],
+          'earliest': 20061126, 'minimumDelta': 92,
+          'sampleIds': ['PC.636', 'PC.635', 'PC.356', 'PC.481', 'PC.354',
+                        'PC.593', 'PC.355', 'PC.607', 'PC.634']
+        };
       },
 
       afterEach() {
@@ -114,6 +128,7 @@ requirejs([
         this.mappingFileHeaders = null;
         this.mappingFileData = null;
         this.coordinatesData = null;
+        this.precomputed = null;
       }
 
     });
@@ -384,6 +399,56 @@ requirejs([
     });
 
 
+   QUnit.test('Test precomputed trajectories', function(assert) {
+      var expected = new AnimationDirector(this.mappingFileHeaders,
+                                           this.mappingFileData,
+                                           this.coordinatesData,
+                                           'DOB', 'Treatment', 1);
+      var director = new AnimationDirector(this.mappingFileHeaders,
+                                           this.mappingFileData,
+                                           this.coordinatesData,
+                                           'DOB', 'Treatment', 1,
+                                           this.precomputed);
+      var byName = function(trajectory) {
+        return trajectory.metadataCategoryName;
+      };
+      var obs = _.sortBy(director.trajectories, byName),
+          exp = _.sortBy(expected.trajectories, byName);
+
+     assert.equal(director.precomputed, this.precomputed);
+     assert.equal(director.minimumDelta, expected.minimumDelta);
+     assert.deepEqual(director.gradientPoints, expected.gradientPoints);
+     assert.equal(director.getMaximumTrajectoryLength(),
+                  expected.getMaximumTrajectoryLength());
+
+     assert.equal(obs.length, 2);
+      for (var i = 0; i < obs.length; i++) {
+       assert.equal(obs[i].metadataCategoryName, exp[i].metadataCategoryName);
+       assert.deepEqual(obs[i].sampleNames, exp[i].sampleNames);
+       assert.deepEqual(obs[i].positions, exp[i].positions);
+       assert.deepEqual(obs[i].interpolatedCoordinates,
+                        exp[i].interpolatedCoordinates);
+      }
+    });
+
+   QUnit.test('Test precomputed trajectories exceptions', function(assert) {
+      var scope = this;
+
+     assert.throws(function() {
+        new AnimationDirector(scope.mappingFileHeaders,
+                              scope.mappingFileData, scope.coordinatesData,
+                              'DOB', 'LinkerPrimerSequence', 1,
+                              scope.precomputed);
+      }, /The precomputed trajectories are for a different/);
+
+     assert.throws(function() {
+        new AnimationDirector(scope.mappingFileHeaders,
+                              scope.mappingFileData, scope.coordinatesData,
+                              'Treatment', 'Treatment', 1,
+                              scope.precomputed);
+      }, /The precomputed trajectories are for a different/);
+    });
+
    QUnit.test('Test currentFrameIsGradientPoint works', function(assert) {
       var director = new AnimationDirector(this.mappingFileHeaders,
                                            this.mappingFileDataShort,
@@ -295,6 +295,76 @@ requirejs([
       });
     });
 
+   QUnit.test('Test drawFrame reuses the dynamic tubes', function(assert) {
+      const done = assert.async();
+      var container = $('<div id="does-not-exist" style="height:1000px; ' +
+                          'width:12px"></div>');
+      var controller = new AnimationsController(
+          new UIState(),
+          container,
+          this.sharedDecompositionViewDict
+      );
+      var view = controller.getView();
+
+      controller.setGradientCategory('DOB');
+      controller.setTrajectoryCategory('Treatment');
+
+      $(function() {
+          var pool;
+
+          controller._playButtonClicked();
+          controller.drawFrame();
+
+          assert.equal(view.dynamicTubes.length, 1);
+          pool = view.dynamicTubes[0];
+          assert.equal(pool.capacity, controller.director.trajectories.length);
+
+          controller.drawFrame();
+          controller.drawFrame();
+          assert.equal(view.dynamicTubes[0], pool);
+          assert.equal(controller.frameTimer.summary().frames, 3);
+
+          controller._rewindButtonClicked();
+          assert.deepEqual(view.dynamicTubes, []);
+          done();
+      });
+    });
+
+   QUnit.test('Test _playButtonClicked with precomputed trajectories',
+     function(assert) {
+      const done = assert.async();
+      var container = $('<div id="does-not-exist" style="height:1000px; ' +
+                          'width:12px"></div>');
+      var controller = new AnimationsController(
+          new UIState(),
+          container,
+          this.sharedDecompositionViewDict
+      );
+      var decomp = controller.getView().decomp;
+
+      // PC.635 is left out on purpose, so it should not be looked up
+      decomp.trajectories = {'gradient': 'DOB', 'trajectory': 'Treatment',
+                             'names': ['Fast'], 'offsets': [0, 2],
+                             'indices': new Int32Array([0, 2]),
+                             'values': [20070314, 20071112],
+                             'earliest': 20070314, 'minimumDelta': 798,
+                             'sampleIds': decomp.ids};
+
+      controller.setGradientCategory('DOB');
+      controller.setTrajectoryCategory('Treatment');
+
+      $(function() {
+          controller._playButtonClicked();
+
+          assert.equal(controller.director.precomputed, decomp.trajectories);
+          assert.deepEqual(controller.director.mappingFileData, {});
+          assert.deepEqual(_.keys(controller.director.coordinatesData),
+                           ['PC.636', 'PC.634']);
+          assert.equal(controller.director.trajectories.length, 1);
+          done();
+      });
+    });
+
    QUnit.test('Test _pauseButtonClicked', function(assert) {
      const done = assert.async();
      var container = $('<div id="does-not-exist" style="height:1000px; ' +
@@ -11,6 +11,36 @@ requirejs([
     // these variables are reused throughout this test suite
     var name, ids, coords, pct_var, md_headers, metadata;
 
+    // mimics the output of emperor.util.encode_array
+    function encode(values, shape, TypedArray, dtype) {
+      var bytes = new Uint8Array(new TypedArray(values).buffer), binary = '';
+      for (var i = 0; i < bytes.length; i++) {
+        binary += String.fromCharCode(bytes[i]);
+      }
+      return {'dtype': dtype, 'shape': shape, 'data': btoa(binary)};
+    }
+
+    // mimics the output of emperor.core.Emperor._to_categorical_map
+    function categorical(rows) {
+      var values = [], codes = [], column;
+      for (var j = 0; j < rows[0].length; j++) {
+        column = _.map(rows, function(row) { return row[j]; });
+        values.push(_.uniq(column));
+        codes.push(encode(_.map(column, function(value) {
+          return _.last(values).indexOf(value);
+        }), [column.length], Uint8Array, 'uint8'));
+      }
+      return {'values': values, 'codes': codes};
+    }
+
+    // the plottables in a model are views of the model's data, so these are
+    // compared by their values
+    function asObject(plottable) {
+      return {'name': plottable.name, 'metadata': plottable.metadata,
+              'coordinates': Array.from(plottable.coordinates),
+              'idx': plottable.idx, 'ci': Array.from(plottable.ci)};
+    }
+
     QUnit.module('Decomposition Model', {
       beforeEach() {
         // setup function
@@ -144,7 +174,8 @@ requirejs([
             [-0.349339, -0.120788, 0.115275, 0.069495, -0.025372, 0.067853,
             0.244448, -0.059883],
             8)];
-     assert.deepEqual(dm.plottable, exp, 'Plottables set correctly');
+     assert.deepEqual(_.map(dm.plottable, asObject), _.map(exp, asObject),
+                      'Plottables set correctly');
 
      assert.deepEqual(dm.dimensionRanges.min, [-0.349339, -0.194113, -0.287149,
                                          -0.346121, -0.247485, -0.279924,
@@ -174,6 +205,35 @@ requirejs([
      assert.equal(dm.edges[1][1].name, 'PC.634');
     });
 
+   QUnit.test('Test getEdgeIndicesByPlottables', function(assert) {
+      this.data.edges = [['PC.607', 'PC.634'], ['PC.355', 'PC.634']];
+
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata, 'scatter');
+      var obs, other = new DecompositionModel(this.data, this.md_headers,
+                                              this.metadata, 'scatter');
+
+     assert.deepEqual(dm.getEdgeIndicesByPlottables(
+                      dm.getPlottableByIDs(['PC.607'])), [0]);
+      obs = dm.getEdgeIndicesByPlottables(dm.getPlottableByIDs(['PC.634']));
+     assert.deepEqual(obs.sort(), [0, 1]);
+      obs = dm.getEdgeIndicesByPlottables(
+        dm.getPlottableByIDs(['PC.607', 'PC.355', 'PC.634']));
+     assert.deepEqual(obs.sort(), [0, 1], 'Each edge is included once');
+     assert.deepEqual(dm.getEdgeIndicesByPlottables(
+                      dm.getPlottableByIDs(['PC.636'])), []);
+
+      // plottables from other models and other objects are ignored
+     assert.deepEqual(dm.getEdgeIndicesByPlottables(
+                      other.getPlottableByIDs(['PC.607'])), []);
+     assert.deepEqual(dm.getEdgeIndicesByPlottables('Not a plottable'), []);
+
+      // the index is only built once
+     assert.equal(dm._getEdgeAdjacency(), dm._getEdgeAdjacency());
+     assert.deepEqual(Array.from(dm._getEdgeAdjacency().edges),
+                      [1, 0, 0, 1]);
+    });
+
    QUnit.test('Test add edges error', function(assert) {
       this.data.edges = [['PC.607', 'PC.607'], ['PC.355', 'PC.634']];
 
@@ -183,6 +243,194 @@ requirejs([
           }, Error);
     });
 
+   QUnit.test('Test constructor with encoded buffers', function(assert) {
+      var dm, expected = new DecompositionModel(this.data, this.md_headers,
+                                                this.metadata);
+
+      this.data.coordinates = encode(_.flatten(this.data.coordinates),
+                                     [9, 8], Float32Array, 'float32');
+      this.data.ci = encode(_.range(72), [9, 8], Float32Array, 'float32');
+      this.data.edges = encode([7, 8, 6, 8], [2, 2], Int32Array, 'int32');
+
+      dm = new DecompositionModel(this.data, this.md_headers, this.metadata);
+
+     assert.equal(dm.length, 9);
+     assert.equal(dm.dimensions, 8);
+     assert.ok(dm.plottable[0].coordinates instanceof Float32Array);
+     assert.ok(dm.hasConfidenceIntervals());
+     assert.deepEqual(Array.from(dm.plottable[8].ci), _.range(64, 72));
+
+      // values are stored with single precision
+      for (var i = 0; i < dm.length; i++) {
+        for (var j = 0; j < dm.dimensions; j++) {
+         assert.ok(Math.abs(dm.plottable[i].coordinates[j] -
+                            expected.plottable[i].coordinates[j]) < 1e-6);
+        }
+      }
+     assert.ok(Array.isArray(dm.dimensionRanges.min));
+     assert.ok(Array.isArray(dm.dimensionRanges.max));
+
+     assert.equal(dm.edges[0][0].name, 'PC.607');
+     assert.equal(dm.edges[0][1].name, 'PC.634');
+     assert.equal(dm.edges[1][0].name, 'PC.355');
+     assert.equal(dm.edges[1][1].name, 'PC.634');
+    });
+
+   QUnit.test('Test add encoded edges error', function(assert) {
+      var data = this.data, md_headers = this.md_headers,
+          metadata = this.metadata;
+
+      data.edges = encode([8, 8], [1, 2], Int32Array, 'int32');
+     assert.throws(function() {
+            var dm = new DecompositionModel(data, md_headers, metadata);
+          }, /identical nodes/);
+
+      data.edges = encode([0, 100], [1, 2], Int32Array, 'int32');
+     assert.throws(function() {
+            var dm = new DecompositionModel(data, md_headers, metadata);
+          }, /not found/);
+    });
+
+   QUnit.test('Test precomputed trajectories', function(assert) {
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata), obs;
+     assert.equal(dm.trajectories, null);
+
+      this.data.trajectories = {
+        'gradient': 'DOB', 'trajectory': 'Treatment',
+        'names': ['Control', 'Fast'], 'offsets': [0, 5, 9],
+        'indices': encode([8, 6, 7, 0, 4, 1, 2, 3, 5], [9], Int32Array,
+                          'int32'),
+        'values': [20061126, 20061218, 20061218, 20070314, 20071210,
+                   20071112, 20080116, 20080116, 20080116],
+        'earliest': 20061126, 'minimum_delta': 92
+      };
+      dm = new DecompositionModel(this.data, this.md_headers, this.metadata);
+      obs = dm.trajectories;
+
+     assert.ok(obs.indices instanceof Int32Array);
+     assert.deepEqual(Array.from(obs.indices), [8, 6, 7, 0, 4, 1, 2, 3, 5]);
+     assert.deepEqual(obs.offsets, [0, 5, 9]);
+     assert.equal(obs.minimumDelta, 92);
+     assert.equal(obs.earliest, 20061126);
+     assert.equal(obs.sampleIds, dm.ids);
+
+      // indices can also be sent as a list
+      this.data.trajectories.indices = [8, 6, 7, 0, 4, 1, 2, 3, 5];
+      dm = new DecompositionModel(this.data, this.md_headers, this.metadata);
+     assert.deepEqual(dm.trajectories.indices, obs.indices);
+    });
+
+   QUnit.test('Test precomputed trajectories errors', function(assert) {
+      var data = this.data, md_headers = this.md_headers,
+          metadata = this.metadata;
+
+      data.trajectories = {
+        'gradient': 'DOB', 'trajectory': 'Treatment', 'names': ['Control'],
+        'offsets': [0, 2], 'indices': [8, 6, 7], 'values': [0, 1],
+        'earliest': 0, 'minimum_delta': 1
+      };
+     assert.throws(function() {
+        var dm = new DecompositionModel(data, md_headers, metadata);
+      }, /do not match/);
+
+      data.trajectories.indices = [8, 9];
+     assert.throws(function() {
+        var dm = new DecompositionModel(data, md_headers, metadata);
+      }, /not in the model: 9/);
+    });
+
+   QUnit.test('Test constructor with categorical metadata', function(assert) {
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      categorical(this.metadata));
+
+     assert.equal(dm.length, 9);
+     assert.ok(dm._categoricalMetadata instanceof model.CategoricalMetadata);
+     assert.deepEqual(dm._categoricalMetadata.values[2], ['Control', 'Fast']);
+
+      for (var i = 0; i < dm.length; i++) {
+       assert.deepEqual(dm.plottable[i].metadata, this.metadata[i]);
+      }
+
+     assert.deepEqual(dm.getUniqueValuesByCategory('DOB'),
+                      ['20061126', '20061218', '20070314', '20071112',
+                       '20071210', '20080116']);
+     assert.deepEqual(_.pluck(dm.getPlottablesByMetadataCategoryValue(
+                        'Treatment', 'Fast'), 'name'),
+                      ['PC.635', 'PC.356', 'PC.481', 'PC.593']);
+     assert.throws(function() {
+        dm.getPlottablesByMetadataCategoryValue('Treatment', 'Slow');
+      }, /not found/);
+    });
+
+   QUnit.test('Test constructor with categorical metadata errors',
+              function(assert) {
+      var data = this.data, md_headers = this.md_headers,
+          metadata = categorical(this.metadata);
+
+      md_headers.pop();
+     assert.throws(function() {
+            var dm = new DecompositionModel(data, md_headers, metadata);
+          }, /same number of values/);
+
+      md_headers.push('DOB');
+      metadata.codes[3] = encode([0, 1], [2], Uint8Array, 'uint8');
+     assert.throws(function() {
+            var dm = new DecompositionModel(data, md_headers, metadata);
+          }, /same number of values/);
+
+      metadata.codes.pop();
+     assert.throws(function() {
+            var dm = new DecompositionModel(data, md_headers, metadata);
+          }, /do not match/);
+    });
+
+   QUnit.test('Test loadMetadata', function(assert) {
+      var metadata = categorical(this.metadata), loaded = false, dm;
+      var columns = {'values': metadata.values.slice(),
+                     'codes': metadata.codes.slice()};
+      var requested = [], done = assert.async();
+
+      // only the treatment column is available
+      metadata.values = [null, null, metadata.values[2], null];
+      metadata.codes = [null, null, metadata.codes[2], null];
+      dm = new DecompositionModel(this.data, this.md_headers, metadata);
+
+     assert.deepEqual(dm.plottable[1].metadata,
+                      [undefined, undefined, 'Fast', undefined]);
+     assert.deepEqual(dm.getUniqueValuesByCategory('Treatment'),
+                      ['Control', 'Fast']);
+     assert.throws(function() {
+        dm.getUniqueValuesByCategory('DOB');
+      }, /has not been loaded/);
+     assert.throws(function() {
+        dm.loadMetadata(['DOB'], function() {});
+      }, /there is no metadata loader/);
+
+      // available columns are loaded synchronously
+      dm.loadMetadata(['Treatment'], function() { loaded = true; });
+     assert.ok(loaded);
+
+      dm.metadataLoader = function(indices, callback) {
+        requested.push(indices);
+        setTimeout(function() {
+          callback(_.map(indices, function(i) {
+            return {'values': columns.values[i], 'codes': columns.codes[i]};
+          }));
+        }, 0);
+      };
+
+      dm.loadMetadata(['DOB', 'Treatment', 'SampleID', 'DOB'], function() {
+       assert.deepEqual(requested, [[3, 0]]);
+       assert.deepEqual(dm.plottable[1].metadata,
+                        ['PC.635', undefined, 'Fast', '20071112']);
+       assert.deepEqual(dm.getUniqueValuesByCategory('DOB'),
+                        ['20061126', '20061218', '20070314', '20071112',
+                         '20071210', '20080116']);
+        done();
+      });
+    });
+
    QUnit.test('Test axesNames', function(assert) {
       var names = ['PC 1', 'PC 2', 'PC 3', 'PC 4', 'PC 5', 'PC 6', 'PC 7',
                    'PC 8', 'PC 9'];
@@ -438,7 +686,8 @@ requirejs([
           -0.229889, -0.046599],
           0);
 
-     assert.deepEqual(obs, exp, 'Plottable retrieved successfully');
+     assert.deepEqual(asObject(obs), asObject(exp),
+                      'Plottable retrieved successfully');
 
     });
 
@@ -493,7 +742,8 @@ requirejs([
             0.057609, 0.024248],
             6)];
 
-     assert.deepEqual(obs, exp, 'Plottable list retrieved successfully');
+     assert.deepEqual(_.map(obs, asObject), _.map(exp, asObject),
+                      'Plottable list retrieved successfully');
     });
 
     /**
@@ -595,7 +845,7 @@ requirejs([
             0.244448, -0.059883],
             8)];
 
-     assert.deepEqual(obs, exp,
+     assert.deepEqual(_.map(obs, asObject), _.map(exp, asObject),
           'Plottables for the given metadata category value retrieved ' +
           'successfully');
     });
@@ -646,25 +896,6 @@ requirejs([
               );
         });
 
-    /**
-     *
-     * Test the function used to find minimum and maximum values works.
-     *
-     */
-   QUnit.test('Test the _minMaxReduce function', function(assert) {
-        var p = new Plottable('PC.635', ['PC.635', 'YATGCTGCCTCCCGTAGGAGT',
-                              'Fast', '20071112'], [-0.237661, 0.046053,
-                              -0.138136, 0.159061, -0.247485, -0.115211,
-                              -0.112864, 0.064794], 1);
-        var accumulator = {'min': [-5, -5, -5, -5, -5, -6, -0.01, -8],
-                           'max': [0, 0, 0, 0, 0, 0, 0, 0]};
-
-        var val = DecompositionModel._minMaxReduce(accumulator, p);
-
-       assert.deepEqual(val.min, [-5, -5, -5, -5, -5, -6, -0.112864, -8]);
-       assert.deepEqual(val.max, [0, 0.046053, 0, 0.159061, 0, 0, 0, 0.064794]);
-    });
-
     /**
      *
      * Tests if a unique set of metadata category values can be obtained from a
@@ -742,6 +973,197 @@ requirejs([
       var exp = ['PC.636', 'PC.635', 'PC.356', 'PC.481', 'PC.354', 'PC.593',
       'PC.355', 'PC.607', 'PC.634'];
      assert.deepEqual(obs, exp, 'Apply works as expected');
+
+      obs = dm.apply(function(pl, idx) {return idx;});
+     assert.deepEqual(obs, _.range(9), 'Apply passes the indices');
+    });
+
+    /**
+     *
+     * Test the coordinates are stored in a single typed array, and that the
+     * plottables are views of that array.
+     *
+     */
+   QUnit.test('Test coordinates are stored by column', function(assert) {
+      this.data.ci = _.map(_.range(9), function(i) {
+        return _.range(i * 8, (i + 1) * 8);
+      });
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata);
+
+     assert.ok(dm.coordinates instanceof Float64Array);
+     assert.equal(dm.coordinates.length, 72);
+     assert.equal(dm.getCoordinate(3, 3), -0.346121);
+     assert.equal(dm.getCoordinate(8, 0), -0.349339);
+     assert.equal(dm.getCoordinate(8, null), undefined);
+     assert.equal(dm.getCoordinate(8, undefined), undefined);
+     assert.deepEqual(Array.from(dm.getCoordinates(1)),
+                      this.data.coordinates[1]);
+
+     assert.equal(dm.getConfidenceInterval(2, 5), 21);
+     assert.equal(dm.getConfidenceInterval(2, null), undefined);
+     assert.deepEqual(Array.from(dm.getConfidenceIntervals(8)),
+                      _.range(64, 72));
+
+      // no data is copied
+     assert.equal(dm.plottable[4].coordinates.buffer, dm.coordinates.buffer);
+     assert.equal(dm.plottable[4].ci.buffer, dm.ci.buffer);
+     assert.equal(dm.plottable[4].coordinates[1], -0.006013);
+     assert.equal(dm.plottable[4].ci[1], 33);
+    });
+
+   QUnit.test('Test coordinates without confidence intervals',
+              function(assert) {
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata);
+
+     assert.equal(dm.ci.length, 0);
+     assert.equal(dm.getConfidenceInterval(0, 0), undefined);
+     assert.deepEqual(dm.getConfidenceIntervals(0), []);
+     assert.deepEqual(dm.plottable[0].ci, []);
+    });
+
+   QUnit.test('Test constructor excepts confidence intervals mismatch',
+              function(assert) {
+      var data = this.data, headers = this.md_headers, md = this.metadata;
+      data.ci = [[1, 2], [3, 4]];
+     assert.throws(function() {
+        return new DecompositionModel(data, headers, md);
+      }, /The number of confidence intervals/);
+    });
+
+    /**
+     *
+     * Test getIndexByID and getIndicesByMetadataCategoryValue
+     *
+     */
+   QUnit.test('Test index accessors', function(assert) {
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata);
+
+     assert.equal(dm.getIndexByID('PC.636'), 0);
+     assert.equal(dm.getIndexByID('PC.634'), 8);
+     assert.throws(function() {
+        dm.getIndexByID('PC.000');
+      }, /PC.000 is not found in the Decomposition Model ids/);
+
+     assert.deepEqual(Array.from(dm.getIndicesByMetadataCategoryValue(
+                      'Treatment', 'Control')), [0, 4, 6, 7, 8]);
+     assert.deepEqual(Array.from(dm.getIndicesByMetadataCategoryValue(
+                      'DOB', '20080116')), [2, 3, 5]);
+     assert.throws(function() {
+        dm.getIndicesByMetadataCategoryValue('Treatment', 'foo');
+      }, /The value foo is not found in the metadata category Treatment/);
+    });
+
+   QUnit.test('Test id index', function(assert) {
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata);
+
+     assert.ok(dm._idIndex instanceof Map);
+     assert.equal(dm._idIndex.size, 9);
+      _.each(dm.ids, function(id, idx) {
+       assert.equal(dm.getIndexByID(id), idx);
+       assert.equal(dm.getPlottableByID(id).idx, idx);
+      });
+
+     assert.deepEqual(_.map(dm.getPlottableByIDs(['PC.634', 'PC.636']),
+                            function(pl) { return pl.idx; }), [8, 0]);
+     assert.throws(function() {
+        dm.getPlottableByIDs(['PC.634', 'toString']);
+      }, /toString is not found in the Decomposition Model ids/);
+    });
+
+    /**
+     *
+     * Test the plottables are only created when they are requested
+     *
+     */
+   QUnit.test('Test plottables are created lazily', function(assert) {
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata), p, group;
+
+     assert.equal(_.compact(dm._plottables).length, 0);
+
+      // querying the metadata doesn't create the plottables
+     assert.deepEqual(dm.getUniqueValuesByCategory('Treatment'),
+                      ['Control', 'Fast']);
+     assert.equal(_.compact(dm._plottables).length, 0);
+
+      p = dm.getPlottableByID('PC.634');
+     assert.equal(p, dm.getPlottable(8));
+     assert.equal(p.name, 'PC.634');
+     assert.equal(_.compact(dm._plottables).length, 1);
+
+      group = dm.getPlottablesByMetadataCategoryValue('Treatment', 'Fast');
+     assert.deepEqual(_.pluck(group, 'idx'), [1, 2, 3, 5]);
+     assert.equal(_.compact(dm._plottables).length, 5);
+
+     assert.equal(dm.getPlottable(-1), undefined);
+     assert.equal(dm.getPlottable(9), undefined);
+
+      // reading all the plottables creates the rest, and keeps the others
+     assert.equal(dm.plottable.length, 9);
+     assert.equal(_.compact(dm._plottables).length, 9);
+     assert.equal(dm.plottable[8], p);
+     assert.equal(dm.plottable[1], group[0]);
+    });
+
+    /**
+     *
+     * Test the inverted index of a category is built once and reused
+     *
+     */
+   QUnit.test('Test category index is cached', function(assert) {
+      var dm = new DecompositionModel(this.data, this.md_headers,
+                                      this.metadata), index, values;
+
+     assert.equal(dm._categoryIndex[2], undefined);
+
+      values = dm.getUniqueValuesByCategory('Treatment');
+     assert.deepEqual(values, ['Control', 'Fast']);
+      index = dm._categoryIndex[2];
+     assert.ok(index !== undefined);
+     assert.equal(dm._categoryIndex[3], undefined);
+
+      // modifying the result doesn't modify the index
+      values.push('foo');
+     assert.deepEqual(dm.getUniqueValuesByCategory('Treatment'),
+                      ['Control', 'Fast']);
+
+      // the same arrays are returned every time
+     assert.equal(dm.getIndicesByMetadataCategoryValue('Treatment', 'Fast'),
+                  dm.getIndicesByMetadataCategoryValue('Treatment', 'Fast'));
+     assert.equal(dm._categoryIndex[2], index);
+     assert.deepEqual(Array.from(index.indices.get('Fast')), [1, 2, 3, 5]);
+    });
+
+   QUnit.test('Test category index with encoded metadata', function(assert) {
+      var dm, indices;
+
+      // the unused value can't be retrieved
+      var metadata = categorical(this.metadata);
+      metadata.values[2].push('Unused');
+
+      dm = new DecompositionModel(this.data, this.md_headers, metadata);
+
+     assert.deepEqual(dm.getUniqueValuesByCategory('Treatment'),
+                      ['Control', 'Fast']);
+     assert.throws(function() {
+        dm.getIndicesByMetadataCategoryValue('Treatment', 'Unused');
+      }, /The value Unused is not found/);
+
+      indices = dm.getIndicesByMetadataCategoryValue('Treatment', 'Control');
+     assert.ok(indices instanceof Int32Array);
+     assert.deepEqual(Array.from(indices), [0, 4, 6, 7, 8]);
+     assert.deepEqual(
+        _.map(dm.getPlottablesByMetadataCategoryValue('DOB', '20061218'),
+              function(pl) { return pl.name; }), ['PC.355', 'PC.607']);
+
+      // all the values in a column share one buffer
+     assert.equal(indices.buffer,
+                  dm.getIndicesByMetadataCategoryValue('Treatment',
+                                                       'Fast').buffer);
     });
 
     /**
@@ -688,6 +688,35 @@ requirejs([
       dv.hideEdgesForPlottables('Not a plottable');
     });
 
+   QUnit.test('Test edges only update the affected lines', function(assert) {
+      var UIState1 = new UIState();
+      UIState1.setProperty('view.usesPointCloud', false);
+      var dv = new DecompositionView(this.multiModelWithEdges,
+                                     'scatter',
+                                     UIState1);
+      var left = dv.lines.left.geometry.attributes.position,
+          right = dv.lines.right.geometry.attributes.position;
+      var version = left.version;
+
+      // simulate an upload to the GPU
+      left.updateRange.count = -1;
+      right.updateRange.count = -1;
+
+      // plottables from a different model
+      dv.hideEdgesForPlottables(this.decomp.getPlottableByIDs(['PC.636']));
+     assert.equal(left.version, version);
+     assert.equal(left.updateRange.count, -1);
+
+      dv.hideEdgesForPlottables(dv.decomp.getPlottableByIDs(['PC.636']));
+     assert.ok(left.version > version);
+     assert.deepEqual(left.updateRange, {offset: 0, count: 6});
+     assert.deepEqual(right.updateRange, {offset: 0, count: 6});
+     assert.deepEqual(left.array, new Float32Array(6));
+
+      dv.showEdgesForPlottables(dv.decomp.getPlottableByIDs(['PC.635']));
+     assert.notDeepEqual(left.array, new Float32Array(6));
+    });
+
    QUnit.test('Test setters for attributes (scatter plot)', function(assert) {
       var UIState1 = new UIState();
       UIState1.setProperty('view.usesPointCloud', false);
@@ -956,5 +985,218 @@ requirejs([
          assert.equal(obs['0f0f0f'].length, 1);
     });
 
+
+   QUnit.test('Test constructor (using instancing)', function(assert) {
+      var UIState1 = new UIState();
+      UIState1.setProperty('view.usesInstancing', true);
+      var dv = new DecompositionView(this.multiModel, 'scatter', UIState1);
+      var matrix, colors;
+
+      // one instanced mesh per shape, all the samples start as spheres
+      assert.equal(dv.markers.length, 8);
+      assert.ok(dv.markers[0].isInstancedMesh);
+      assert.equal(dv.markers[0].userData.shape, 'Sphere');
+      assert.equal(dv.markers[0].count, 2);
+      assert.equal(dv.markers[0].visible, true);
+      for (var i = 1; i < dv.markers.length; i++) {
+        assert.equal(dv.markers[i].count, 0);
+        assert.equal(dv.markers[i].visible, false);
+      }
+      assert.deepEqual(Array.from(dv.markers[0].userData.indices), [0, 1]);
+      assert.equal(dv.getVisibleCount(), 2);
+
+      matrix = dv.markers[0].instanceMatrix.array;
+      assert.deepEqual(Array.from(matrix.subarray(12, 15)),
+                       Array.from(new Float32Array([-0.276542, -0.144964,
+                                                    0.066647])));
+      assert.deepEqual(Array.from(matrix.subarray(28, 31)),
+                       Array.from(new Float32Array([-0.237661, 0.046053,
+                                                    -0.138136])));
+      assert.equal(matrix[0], 1);
+      assert.equal(matrix[16 + 5], 1);
+
+      colors = dv.markers[0].geometry.attributes.color;
+      assert.deepEqual([colors.getX(1), colors.getY(1), colors.getZ(1)],
+                       [1, 0, 0]);
+    });
+
+   QUnit.test('Test constructor (biplot using instancing)', function(assert) {
+      this.decomp.type = 'arrow';
+      var UIState1 = new UIState();
+      UIState1.setProperty('view.usesInstancing', true);
+
+      // arrows are not instanced
+      var dv = new DecompositionView(this.multiModel, 'scatter', UIState1);
+      assert.equal(dv._usesInstancing(), false);
+    });
+
+   QUnit.test('Test setters for attributes (using instancing)',
+     function(assert) {
+         var UIState1 = new UIState();
+         UIState1.setProperty('view.usesInstancing', true);
+         var dv = new DecompositionView(this.multiModel, 'scatter', UIState1);
+         var plottables = [this.decomp.plottable[1]];
+         var observed = dv.markers[0].geometry.attributes;
+         var matrix = dv.markers[0].instanceMatrix;
+
+         // color
+         dv.setColor(0x00ff00);
+         dv.setColor(0x0000ff, plottables);
+         assert.deepEqual([observed.color.getX(0), observed.color.getY(0),
+                           observed.color.getZ(0)], [0, 1, 0]);
+         assert.deepEqual([observed.color.getX(1), observed.color.getY(1),
+                           observed.color.getZ(1)], [0, 0, 1]);
+         assert.equal(observed.color.version > 0, true);
+
+         // visibility
+         dv.setVisibility(false);
+         dv.setVisibility(true, plottables);
+         assert.equal(observed.instanceVisible.getX(0), 0);
+         assert.equal(observed.instanceVisible.getX(1), 1);
+         assert.equal(dv.getVisibleCount(), 1);
+
+         // scale
+         dv.setScale(3);
+         dv.setScale(1, plottables);
+         assert.deepEqual([matrix.array[0], matrix.array[5],
+                           matrix.array[10]], [3, 3, 3]);
+         assert.deepEqual([matrix.array[16], matrix.array[21],
+                           matrix.array[26]], [1, 1, 1]);
+
+         // opacity
+         dv.setOpacity(0.5);
+         dv.setOpacity(1.0, plottables);
+         assert.equal(observed.instanceOpacity.getX(0), 0.5);
+         assert.equal(observed.instanceOpacity.getX(1), 1.0);
+
+         // emissive
+         dv.setEmissive(0xffffff, plottables);
+         assert.equal(observed.instanceEmissive.getX(0), 0);
+         assert.equal(observed.instanceEmissive.getX(1), 1);
+
+         var obs = dv.groupByColor(['PC.636', 'PC.635']);
+         assert.equal(obs['0000ff'].length, 1);
+         assert.equal(obs['00ff00'].length, 1);
+    });
+
+   QUnit.test('Test setShape (using instancing)', function(assert) {
+      var UIState1 = new UIState();
+      UIState1.setProperty('view.usesInstancing', true);
+      var dv = new DecompositionView(this.multiModel, 'scatter', UIState1);
+      var sphere = dv.markers[0], square, color;
+
+      square = _.find(dv.markers, function(mesh) {
+        return mesh.userData.shape === 'Square';
+      });
+
+      dv.setColor(0x0000ff, [this.decomp.plottable[0]]);
+      dv.setScale(2, [this.decomp.plottable[0]]);
+
+      // the second sample fills the slot of the first one
+      dv.setShape('Square', [this.decomp.plottable[0]]);
+      assert.equal(sphere.count, 1);
+      assert.equal(square.count, 1);
+      assert.equal(square.visible, true);
+      assert.equal(sphere.userData.indices[0], 1);
+      assert.equal(square.userData.indices[0], 0);
+      assert.equal(dv._instanceSlots[1], 0);
+      assert.equal(dv._instanceMeshes[0], square);
+      assert.equal(dv._instanceMeshes[1], sphere);
+
+      // the attributes move with the sample
+      color = square.geometry.attributes.color;
+      assert.deepEqual([color.getX(0), color.getY(0), color.getZ(0)],
+                       [0, 0, 1]);
+      assert.equal(square.instanceMatrix.array[0], 2);
+      assert.equal(square.instanceMatrix.array[12],
+                   Math.fround(-0.276542));
+      assert.equal(sphere.instanceMatrix.array[0], 1);
+      assert.equal(sphere.instanceMatrix.array[12],
+                   Math.fround(-0.237661));
+
+      dv.setShape('Square');
+      assert.equal(sphere.count, 0);
+      assert.equal(sphere.visible, false);
+      assert.equal(square.count, 2);
+      assert.deepEqual(Array.from(square.userData.indices), [0, 1]);
+      assert.equal(dv.getVisibleCount(), 2);
+
+      dv.setShape('Sphere', [this.decomp.plottable[0]]);
+      assert.equal(sphere.count, 1);
+      assert.equal(square.count, 1);
+      assert.equal(square.userData.indices[0], 1);
+
+      assert.throws(function() {
+        dv.setShape('WEIRD');
+      }, Error, 'Unknown shapes are not allowed');
+    });
+
+   QUnit.test('Test setShape (meshes)', function(assert) {
+      var UIState1 = new UIState();
+      var dv = new DecompositionView(this.multiModel, 'scatter', UIState1);
+
+      dv.setShape('Cylinder', [this.decomp.plottable[1]]);
+      assert.equal(dv.markers[0].userData.shape, 'Sphere');
+      assert.equal(dv.markers[1].userData.shape, 'Cylinder');
+      assert.equal(dv.markers[1].geometry.type, 'CylinderGeometry');
+
+      assert.throws(function() {
+        dv.setShape('WEIRD');
+      }, Error, 'Unknown shapes are not allowed');
+    });
+
+   QUnit.test('Test change flip axes (using instancing)', function(assert) {
+      var UIState1 = new UIState();
+      UIState1.setProperty('view.usesInstancing', true);
+      var dv = new DecompositionView(this.multiModel, 'scatter', UIState1);
+      var matrix = dv.markers[0].instanceMatrix.array;
+
+      dv.flipVisibleDimension(2);
+      assert.equal(matrix[14], Math.fround(-0.066647));
+      assert.equal(matrix[30], Math.fround(0.138136));
+
+      dv.changeVisibleDimensions([3, 4, 5]);
+      assert.deepEqual(Array.from(matrix.subarray(12, 15)),
+                       Array.from(new Float32Array([-0.067711, 0.176070,
+                                                    0.072969])));
+    });
+
+   QUnit.test('Test constructor (jackknifed using instancing)',
+     function(assert) {
+         var data = {
+             name: 'pcoa',
+             sample_ids: ['PC.636', 'PC.635'],
+             coordinates: [[-0.276542, -0.144964, 0.066647, -0.067711,
+                            0.176070, 0.072969, -0.229889, -0.046599],
+                           [-0.237661, 0.046053, -0.138136, 0.159061,
+                            -0.247485, -0.115211, -0.112864, 0.064794]],
+             percents_explained: [26.6887048633, 16.2563704022, 13.7754129161,
+                                  11.217215823, 10.024774995, 8.22835130237,
+                                  7.55971173665, 6.24945796136],
+             ci: [[0.3, 0.1, 0.06, 0.06, 0.1, 0.07, 0.2, 0.04],
+                  [0.3, 0.1, 0.06, 0.06, 0.1, 0.07, 0.2, 0.04]]};
+         var md_headers = ['SampleID', 'LinkerPrimerSequence', 'Treatment',
+                           'DOB'];
+         var metadata = [['PC.636', 'YATGCTGCCTCCCGTAGGAGT', 'Control',
+                          '20070314'],
+                         ['PC.635', 'YATGCTGCCTCCCGTAGGAGT', 'Fast',
+                          '20071112']];
+         var decomp = new DecompositionModel(data, md_headers, metadata);
+         var multiModel = new MultiModel({'scatter': decomp});
+
+         var UIState1 = new UIState();
+         UIState1.setProperty('view.usesInstancing', true);
+         var dv = new DecompositionView(multiModel, 'scatter', UIState1);
+
+         // confidence intervals are regular meshes
+         assert.equal(dv.ellipsoids.length, 2);
+         assert.equal(dv.ellipsoids[1].name, 'PC.635_ci');
+
+         dv.setColor(0x00ff00, [decomp.plottable[1]]);
+         assert.equal(dv.ellipsoids[1].material.color.getHexString(),
+                      '00ff00');
+         dv.setVisibility(false, [decomp.plottable[1]]);
+         assert.equal(dv.ellipsoids[1].visible, false);
+     });
   });
 });
@@ -1,9 +1,11 @@
-requirejs(['draw', 'three'], function(draw, THREE) {
+requirejs(['draw', 'three', 'trajectory', 'underscore'],
+          function(draw, THREE, trajectory, _) {
   var formatSVGLegend = draw.formatSVGLegend;
   var makeLine = draw.makeLine;
   var makeLabel = draw.makeLabel;
   var makeArrow = draw.makeArrow;
   var makeLineCollection = draw.makeLineCollection;
+  var TrajectoryOfSamples = trajectory.TrajectoryOfSamples;
   $(document).ready(function() {
 
     QUnit.module('Drawing utilities', {
@@ -72,6 +74,44 @@ requirejs(['draw', 'three'], function(draw, THREE) {
 
       expected = new Float32Array([1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 1, 0]);
      assert.deepEqual(lines.geometry.attributes.position.array, expected);
+     assert.ok(lines.geometry.index.array instanceof Uint16Array);
+    });
+
+   QUnit.test('Test makeLineCollection with many vertices', function(assert) {
+      var vertices = [], lines, i;
+
+      for (i = 0; i < 70000; i++) {
+        vertices.push([i, 0, 0]);
+      }
+
+      lines = makeLineCollection(vertices, 0xf0f0f0);
+     assert.ok(lines.geometry.index.array instanceof Uint32Array);
+     assert.equal(lines.geometry.index.array[69999], 69999);
+    });
+
+   QUnit.test('Test linesNeedUpdate', function(assert) {
+      var vertices = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [0, 1, 0],
+                      [1, 1, 1], [1, 1, 0], [0, 0, 0], [1, 0, 1]];
+      var lines = makeLineCollection(vertices, 0xf0f0f0);
+      var attribute = lines.geometry.attributes.position;
+      var version = attribute.version;
+
+      lines.linesNeedUpdate(1, 2);
+     assert.deepEqual(attribute.updateRange, {offset: 6, count: 12});
+     assert.ok(attribute.version > version);
+
+      // pending ranges are merged
+      lines.linesNeedUpdate(0, 0);
+     assert.deepEqual(attribute.updateRange, {offset: 0, count: 18});
+
+      // once uploaded the renderer resets the count
+      attribute.updateRange.count = -1;
+      lines.linesNeedUpdate(3, 3);
+     assert.deepEqual(attribute.updateRange, {offset: 18, count: 6});
+
+      attribute.updateRange.count = -1;
+      lines.linesNeedUpdate();
+     assert.deepEqual(attribute.updateRange, {offset: 0, count: 24});
     });
 
     /**
@@ -241,5 +281,136 @@ requirejs(['draw', 'three'], function(draw, THREE) {
       res = formatSVGLegend(names, colors);
      assert.deepEqual(res, e, 'SVG file is formatted correcly');
     });
+
+   QUnit.test('Test EmperorTrajectory', function(assert) {
+      var positions = new Float32Array([0, 0, 0, 2, 4, 6, 2, 4, 10]);
+      var path = new THREE.EmperorTrajectory(positions), target;
+
+     assert.equal(path.positions, positions, 'Positions are not copied');
+     assert.deepEqual(path.getPoint(0).toArray(), [0, 0, 0]);
+     assert.deepEqual(path.getPoint(0.25).toArray(), [1, 2, 3]);
+     assert.deepEqual(path.getPoint(0.75).toArray(), [2, 4, 8]);
+     assert.deepEqual(path.getPoint(1).toArray(), [2, 4, 10]);
+
+      target = new THREE.Vector3();
+     assert.equal(path.getPoint(0.5, target), target);
+     assert.deepEqual(target.toArray(), [2, 4, 6]);
+
+      // vectors are converted into positions
+      path = new THREE.EmperorTrajectory([new THREE.Vector3(0, 0, 0),
+                                          new THREE.Vector3(2, 4, 6)]);
+     assert.deepEqual(Array.from(path.positions), [0, 0, 0, 2, 4, 6]);
+     assert.deepEqual(path.getPoint(0.5).toArray(), [1, 2, 3]);
+    });
+
+   QUnit.test('Test trajectory tubes', function(assert) {
+      var traj = new TrajectoryOfSamples(['a', 'b', 'c'], 'Treatment',
+                                         [1, 2, 3],
+                                         [{'x': 0, 'y': 0, 'z': 0},
+                                          {'x': 1, 'y': 1, 'z': 1},
+                                          {'x': 2, 'y': 0, 'z': 0}], 1, 4);
+      var tube = draw.drawTrajectoryLineStatic(traj, 'red', 0.1);
+
+     assert.ok(tube instanceof THREE.Mesh);
+     assert.equal(tube.geometry.parameters.path.positions, traj.positions);
+     assert.equal(tube.geometry.parameters.tubularSegments, 6);
+
+      tube = draw.drawTrajectoryLineDynamic(traj, 2, 'red', 0.1);
+     assert.ok(tube instanceof THREE.Mesh);
+     assert.deepEqual(Array.from(tube.geometry.parameters.path.positions),
+                      [0, 0, 0, 0.5, 0.5, 0.5]);
+
+      // first frame and zero-length segments are not drawn
+     assert.equal(draw.drawTrajectoryLineDynamic(traj, 0, 'red', 0.1), null);
+     assert.equal(draw.drawTrajectoryLineDynamic(traj, 4, 'red', 0.1), null);
+    });
+
+   QUnit.test('Test makeTubeSegments', function(assert) {
+      var pool = draw.makeTubeSegments(3), geometry = pool.geometry;
+
+     assert.ok(pool instanceof THREE.Mesh);
+     assert.equal(pool.capacity, 3);
+     assert.equal(pool.count, 0);
+     assert.ok(pool.material.vertexColors);
+     assert.ok(!pool.frustumCulled);
+
+      // 4 rings of 10 vertices, and 3 * 10 * 2 triangles per tube
+     assert.equal(geometry.attributes.position.count, 120);
+     assert.equal(geometry.attributes.normal.count, 120);
+     assert.equal(geometry.attributes.color.count, 120);
+     assert.equal(geometry.index.count, 540);
+     assert.ok(geometry.index.array instanceof Uint16Array);
+     assert.equal(geometry.drawRange.count, 0);
+
+      // the triangles of the last tube use its own vertices
+     assert.equal(_.min(geometry.index.array.slice(360)), 80);
+     assert.equal(_.max(geometry.index.array.slice(360)), 119);
+
+      // 32 bit indices are needed after 65536 vertices
+      pool = draw.makeTubeSegments(2000);
+     assert.ok(pool.geometry.index.array instanceof Uint32Array);
+    });
+
+   QUnit.test('Test setSegmentAtIndex', function(assert) {
+      var pool = draw.makeTubeSegments(2), geometry = pool.geometry;
+      var positions = geometry.attributes.position.array,
+          normals = geometry.attributes.normal.array,
+          colors = geometry.attributes.color.array;
+      var segment = new Float32Array([1, 2, 3, 1, 2, 9]), i, x, y, z;
+
+      pool.setSegmentAtIndex(1, segment, 0.5, '#ff0000');
+
+      // the first tube is not modified
+     assert.deepEqual(_.uniq(positions.slice(0, 120)), [0]);
+
+      for (i = 40; i < 80; i++) {
+        x = positions[i * 3] - 1;
+        y = positions[i * 3 + 1] - 2;
+        z = positions[i * 3 + 2];
+
+        // each ring is a circle around the segment, and the normals point
+        // away from the segment
+       assert.ok(Math.abs(Math.sqrt(x * x + y * y) - 0.5) < 1e-6);
+       assert.ok(Math.abs(normals[i * 3] * 0.5 - x) < 1e-6);
+       assert.ok(Math.abs(normals[i * 3 + 2]) < 1e-6);
+       assert.deepEqual(Array.from(colors.slice(i * 3, i * 3 + 3)),
+                        [1, 0, 0]);
+      }
+
+      // rings are evenly spaced along the segment
+     assert.deepEqual([positions[122], positions[152], positions[182],
+                       positions[212]], [3, 5, 7, 9]);
+
+      // zero-length segments don't produce invalid values
+      pool.setSegmentAtIndex(0, new Float32Array([1, 1, 1, 1, 1, 1]), 0.5,
+                             0x00ff00);
+     assert.ok(_.every(positions, isFinite));
+     assert.deepEqual(Array.from(colors.slice(0, 3)), [0, 1, 0]);
+    });
+
+   QUnit.test('Test segmentsNeedUpdate', function(assert) {
+      var pool = draw.makeTubeSegments(3), geometry = pool.geometry;
+      var version = geometry.attributes.position.version;
+
+      pool.segmentsNeedUpdate(2);
+
+     assert.equal(pool.count, 2);
+     assert.equal(geometry.drawRange.start, 0);
+     assert.equal(geometry.drawRange.count, 360);
+      _.each(['position', 'normal', 'color'], function(name) {
+       assert.deepEqual(geometry.attributes[name].updateRange,
+                        {'offset': 0, 'count': 240});
+      });
+     assert.equal(geometry.attributes.position.version, version + 1);
+
+      // nothing is uploaded when no tubes are drawn
+      pool.segmentsNeedUpdate(0);
+     assert.equal(geometry.drawRange.count, 0);
+     assert.equal(geometry.attributes.position.version, version + 1);
+
+      // the count is limited by the capacity
+      pool.segmentsNeedUpdate(10);
+     assert.equal(pool.count, 3);
+    });
   });
 });
@@ -0,0 +1,196 @@
+requirejs([
+    'jquery',
+    'underscore',
+    'model',
+    'util',
+    'loader'
+], function($, _, model, util, loader) {
+
+  $(document).ready(function() {
+    var DecompositionModel = model.DecompositionModel;
+
+    // mimics the output of emperor.util.encode_array
+    function encode(values, shape, TypedArray, dtype) {
+      var bytes = new Uint8Array(new TypedArray(values).buffer), binary = '';
+      for (var i = 0; i < bytes.length; i++) {
+        binary += String.fromCharCode(bytes[i]);
+      }
+      return {'dtype': dtype, 'shape': shape, 'data': btoa(binary)};
+    }
+
+    // collects the messages that a worker would send to the main thread
+    function FakeScope() {
+      this.messages = [];
+      this.transfers = [];
+    }
+    FakeScope.prototype.postMessage = function(message, transfer) {
+      this.messages.push(message);
+      this.transfers.push(transfer);
+    };
+
+    QUnit.module('Loader', {
+      beforeEach() {
+        this.data = {
+          'plot': {
+            'decomposition': {
+              'sample_ids': ['a', 'b', 'c'],
+              'coordinates': encode([1, 2, -3, 4, 5, 6], [3, 2], Float32Array,
+                                    'float32'),
+              'ci': null,
+              'edges': encode([0, 1, 1, 2], [2, 2], Int32Array, 'int32'),
+              'percents_explained': [60, 40],
+              'axes_names': ['x', 'y']
+            },
+            'metadata_headers': ['SampleID', 'Treatment'],
+            'metadata': {
+              'values': [['a', 'b', 'c'], ['x', 'y']],
+              'codes': [encode([0, 1, 2], [3], Uint8Array, 'uint8'), null]
+            },
+            'type': 'scatter'
+          }
+        };
+      },
+
+      afterEach() {
+        this.data = null;
+      }
+    });
+
+   QUnit.test('Test _findEncodedBuffers', function(assert) {
+      var obs = loader._findEncodedBuffers(this.data);
+
+     assert.deepEqual(_.pluck(obs, 'key'), ['coordinates', 'edges', 0]);
+     assert.deepEqual(_.pluck(obs, 'ranges'), [true, false, false]);
+     assert.equal(obs[0].target, this.data.plot.decomposition);
+     assert.equal(obs[2].target, this.data.plot.metadata.codes);
+
+      // decoded buffers and JSON data are ignored
+      this.data.plot.decomposition.coordinates.data = new Float32Array(6);
+      this.data.plot.decomposition.edges = [['a', 'b']];
+      this.data.plot.metadata = [['a', 'x'], ['b', 'y'], ['c', 'x']];
+     assert.deepEqual(loader._findEncodedBuffers(this.data), []);
+    });
+
+   QUnit.test('Test _findEncodedBuffers with a biplot', function(assert) {
+      this.data.biplot = {
+        'decomposition': {
+          'coordinates': encode([1, 2], [1, 2], Float32Array, 'float32')
+        },
+        'metadata': [['f1']]
+      };
+      var obs = loader._findEncodedBuffers(this.data);
+
+     assert.equal(obs.length, 4);
+     assert.equal(obs[3].target, this.data.biplot.decomposition);
+     assert.equal(obs[3].key, 'coordinates');
+    });
+
+   QUnit.test('Test _workerMain', function(assert) {
+      var scope = new FakeScope(), result;
+
+      loader._workerMain(scope, util.decodeArray, util.computeRanges);
+      scope.onmessage({'data': {'buffers': [
+        _.extend({'ranges': true}, this.data.plot.decomposition.coordinates),
+        _.extend({'ranges': false}, this.data.plot.decomposition.edges)
+      ]}});
+
+     assert.deepEqual(scope.messages.slice(0, 2),
+                      [{'progress': 0.5}, {'progress': 1}]);
+
+      result = scope.messages[2];
+     assert.ok(result.arrays[0] instanceof Float32Array);
+     assert.deepEqual(Array.from(result.arrays[0]), [1, 2, -3, 4, 5, 6]);
+     assert.ok(result.arrays[1] instanceof Int32Array);
+     assert.deepEqual(Array.from(result.arrays[1]), [0, 1, 1, 2]);
+     assert.deepEqual(result.ranges, [{'min': [-3, 2], 'max': [5, 6]}, null]);
+
+      // the buffers are transferred instead of copied
+     assert.deepEqual(scope.transfers[2], [result.arrays[0].buffer,
+                                           result.arrays[1].buffer]);
+    });
+
+   QUnit.test('Test _workerMain errors', function(assert) {
+      var scope = new FakeScope();
+
+      loader._workerMain(scope, util.decodeArray, util.computeRanges);
+      scope.onmessage({'data': {'buffers': [
+        {'dtype': 'float32', 'shape': [3, 3], 'ranges': true,
+         'data': this.data.plot.decomposition.coordinates.data}
+      ]}});
+
+     assert.equal(scope.messages.length, 1);
+     assert.ok(/the shape requires 9/.test(scope.messages[0].error));
+    });
+
+   QUnit.test('Test _workerSource is self-contained', function(assert) {
+      var scope = new FakeScope();
+
+      // evaluate the code without access to the modules
+      new Function('self', loader._workerSource())(scope);
+      scope.onmessage({'data': {'buffers': [
+        _.extend({'ranges': true}, this.data.plot.decomposition.coordinates)
+      ]}});
+
+     assert.deepEqual(Array.from(scope.messages[1].arrays[0]),
+                      [1, 2, -3, 4, 5, 6]);
+     assert.deepEqual(scope.messages[1].ranges,
+                      [{'min': [-3, 2], 'max': [5, 6]}]);
+    });
+
+   QUnit.test('Test loadData', function(assert) {
+      var done = assert.async(), data = this.data;
+      var expected = new DecompositionModel(data.plot.decomposition,
+                                            data.plot.metadata_headers,
+                                            data.plot.metadata);
+
+      loader.loadData(data, function(obs) {
+        var dm = new DecompositionModel(obs.plot.decomposition,
+                                        obs.plot.metadata_headers,
+                                        obs.plot.metadata);
+
+       assert.equal(obs, data);
+       assert.deepEqual(Array.from(dm.coordinates),
+                        Array.from(expected.coordinates));
+       assert.deepEqual(dm.dimensionRanges, expected.dimensionRanges);
+       assert.deepEqual(dm.getPlottableByID('a').metadata,
+                        expected.getPlottableByID('a').metadata);
+       assert.equal(dm.edges.length, 2);
+       assert.equal(dm.edges[1][1].name, 'c');
+        done();
+      });
+    });
+
+   QUnit.test('Test loadData without encoded buffers', function(assert) {
+      var data = {'plot': {'decomposition': {'coordinates': [[1, 2]]},
+                           'metadata': [['a']]}}, obs = null;
+
+      // nothing to decode, so the callback is executed right away
+      loader.loadData(data, function(result) {
+        obs = result;
+      });
+     assert.equal(obs, data);
+     assert.deepEqual(data.plot.decomposition.coordinates, [[1, 2]]);
+    });
+
+   QUnit.test('Test DecompositionModel with decoded buffers',
+     function(assert) {
+      var decomposition = this.data.plot.decomposition, dm;
+
+      decomposition.coordinates = {'dtype': 'float32', 'shape': [3, 2],
+                                   'data': new Float32Array([1, 2, -3, 4, 5,
+                                                             6])};
+      decomposition.dimension_ranges = {'min': [-3, 2], 'max': [5, 6]};
+
+      dm = new DecompositionModel(decomposition,
+                                  this.data.plot.metadata_headers,
+                                  this.data.plot.metadata);
+
+     assert.equal(dm.coordinates, decomposition.coordinates.data);
+     assert.deepEqual(dm.dimensionRanges, decomposition.dimension_ranges);
+
+      // the ranges are modified by the views, so these are copied
+     assert.notEqual(dm.dimensionRanges.min,
+                     decomposition.dimension_ranges.min);
+    });
+  });
+});
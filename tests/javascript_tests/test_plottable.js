@@ -74,6 +74,25 @@ requirejs(['jquery', 'model'], function($, model) {
      * arguments.
      *
      */
+   QUnit.test('Test constructor with categorical metadata', function(assert) {
+      // codes [0, 1, 0] and [1, 0, 2] as base64-encoded unsigned 8-bit integers
+      var metadata = new model.CategoricalMetadata({
+        'values': [['a', 'b', 'z'], ['c', 'd', 'e']],
+        'codes': [{'dtype': 'uint8', 'shape': [3], 'data': 'AAEA'},
+                  {'dtype': 'uint8', 'shape': [3], 'data': 'AQAC'}]
+      });
+      var plot = new Plottable('foo', metadata, [0.2, 0.3], 2);
+
+     assert.equal(metadata.length, 3);
+     assert.deepEqual(plot.metadata, ['a', 'e'], 'The metadata matches!');
+     assert.deepEqual(metadata.row(1), ['b', 'c']);
+     assert.deepEqual(metadata.usedValues(1), ['c', 'd', 'e']);
+     assert.deepEqual(metadata.usedValues(0), ['a', 'b']);
+
+      plot.metadata = ['x', 'y'];
+     assert.deepEqual(plot.metadata, ['x', 'y'], 'The metadata matches!');
+    });
+
    QUnit.test('Test constructor exceptions', function(assert) {
       var result;
 
@@ -4,6 +4,8 @@ requirejs(['underscore', 'trajectory'], function(_, trajectory) {
     var getMinimumDelta = trajectory.getMinimumDelta;
     var getSampleNamesAndDataForSortedTrajectories =
       trajectory.getSampleNamesAndDataForSortedTrajectories;
+    var getSampleNamesAndDataForPrecomputedTrajectories =
+      trajectory.getSampleNamesAndDataForPrecomputedTrajectories;
     var distanceBetweenPoints = trajectory.distanceBetweenPoints;
     var linearInterpolation = trajectory.linearInterpolation;
 
@@ -16,6 +18,14 @@ requirejs(['underscore', 'trajectory'], function(_, trajectory) {
 
     var expectedResult;
 
+    // the interpolated points are stored as single precision floats
+    function flatten(points) {
+      return Array.from(new Float32Array(_.flatten(_.map(points,
+        function(point) {
+          return [point.x, point.y, point.z];
+        }))));
+    }
+
     QUnit.module('Trajectory', {
 
       beforeEach() {
@@ -264,11 +274,14 @@ requirejs(['underscore', 'trajectory'], function(_, trajectory) {
           10);
 
       // test the interpolated values and the interval values
-     assert.deepEqual(trajectory.interpolatedCoordinates,
-          expectedInterpolatedCoordinates,
+     assert.ok(trajectory.interpolatedCoordinates instanceof Float32Array);
+     assert.equal(trajectory.interpolatedLength, 41);
+     assert.deepEqual(Array.from(trajectory.interpolatedCoordinates),
+          flatten(expectedInterpolatedCoordinates),
           'Check the interpolated coordinates are computed correctly');
 
-     assert.deepEqual(trajectory._intervalValues,
+     assert.ok(trajectory._intervalValues instanceof Int32Array);
+     assert.deepEqual(Array.from(trajectory._intervalValues),
                       [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1,
                        1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 3, 3,
                        3, 3],
@@ -294,14 +307,61 @@ requirejs(['underscore', 'trajectory'], function(_, trajectory) {
       trajectory = new TrajectoryOfSamples(sampleNames, 'Treatment',
           gradientPoints, coordinates, 2,
           3);
-     assert.deepEqual(trajectory.interpolatedCoordinates,
-          expectedInterpolatedCoordinates,
+     assert.equal(trajectory.interpolatedLength, 15);
+     assert.deepEqual(Array.from(trajectory.interpolatedCoordinates),
+          flatten(expectedInterpolatedCoordinates),
           'Check the interpolated coordinates are computed correctly');
-     assert.deepEqual(trajectory._intervalValues,
+     assert.deepEqual(Array.from(trajectory._intervalValues),
           [0, 0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 3] ,
           'Check the interpolated coordinates are computed correctly');
     });
 
+   QUnit.test('Test _generateInterpolatedCoordinates with repeated values',
+     function(assert) {
+      // the last two samples are at the same point in the gradient
+      var trajectory = new TrajectoryOfSamples(['a', 'b', 'c'], 'Treatment',
+          [1, 2, 2], [{'x': 0, 'y': 0, 'z': 0}, {'x': 2, 'y': 2, 'z': 2},
+                      {'x': 5, 'y': 5, 'z': 5}], 1, 2);
+
+     assert.equal(trajectory.interpolatedLength, 3);
+     assert.deepEqual(Array.from(trajectory.interpolatedCoordinates),
+                      [0, 0, 0, 1, 1, 1, 5, 5, 5]);
+     assert.deepEqual(Array.from(trajectory._intervalValues), [0, 0]);
+    });
+
+   QUnit.test('Test positions and getInterpolatedPoint', function(assert) {
+      var trajectory = new TrajectoryOfSamples(sampleNames, 'Treatment',
+                                               gradientPoints, coordinates, 2,
+                                               3);
+
+     assert.ok(trajectory.positions instanceof Float32Array);
+     assert.deepEqual(Array.from(trajectory.positions), flatten(coordinates));
+     assert.deepEqual(trajectory.getInterpolatedPoint(0),
+                      {'x': 0, 'y': 0, 'z': 0});
+     assert.deepEqual(trajectory.getInterpolatedPoint(12),
+                      {'x': 5.5, 'y': 5.5, 'z': 5.5});
+    });
+
+   QUnit.test('Test interpolatedSegmentAtIndex', function(assert) {
+      var trajectory = new TrajectoryOfSamples(sampleNames, 'Treatment',
+                                               gradientPoints, coordinates, 2,
+                                               3);
+      var segment = trajectory.interpolatedSegmentAtIndex(11);
+
+     assert.ok(segment instanceof Float32Array);
+     assert.deepEqual(Array.from(segment), [3, 3, 3, 4.25, 4.25, 4.25]);
+
+      // the same array is reused
+     assert.equal(trajectory.interpolatedSegmentAtIndex(3), segment);
+     assert.deepEqual(Array.from(segment), [0, 0, 0, 0.75, 0.75, 0.75]);
+
+      // no interpolated portion, or a zero-length one
+     assert.equal(trajectory.interpolatedSegmentAtIndex(0), null);
+     assert.equal(trajectory.interpolatedSegmentAtIndex(4), null);
+     assert.equal(trajectory.interpolatedSegmentAtIndex(14), null);
+     assert.equal(trajectory.interpolatedSegmentAtIndex(100), null);
+    });
+
     /**
      *
      * Test the trajectory object retrieves only the needed points for a given
@@ -454,6 +514,19 @@ requirejs(['underscore', 'trajectory'], function(_, trajectory) {
                       'Linear interpolation is computed correctly');
     });
 
+   QUnit.test('Test linearInterpolation into a buffer', function(assert) {
+      var out = new Float32Array(12);
+
+     assert.equal(linearInterpolation(0, 0, 0, 1, 2, 3, 2, out, 1), out);
+     assert.deepEqual(Array.from(out), [0, 0, 0, 0, 0, 0, 0.5, 1, 1.5, 1, 2,
+                                        3]);
+
+      // without steps only the first point is written
+      out = new Float32Array(3);
+      linearInterpolation(1, 2, 3, 1, 2, 3, 0, out);
+     assert.deepEqual(Array.from(out), [1, 2, 3]);
+    });
+
     /**
      *
      * Test distanceBetweenPoints function.
@@ -546,6 +619,45 @@ requirejs(['underscore', 'trajectory'], function(_, trajectory) {
 
     });
 
+    /**
+     *
+     * Test getSampleNamesAndDataForPrecomputedTrajectories function.
+     *
+     */
+   QUnit.test('Test getSampleNamesAndDataForPrecomputedTrajectories',
+     function(assert) {
+       var result, expected, precomputed = {
+         'names': ['Control', 'Fast'], 'offsets': [0, 5, 9],
+         'indices': new Int32Array([2, 0, 1, 3, 4, 5, 6, 7, 8]),
+         'values': [20061126, 20061218, 20061218, 20070314, 20071210,
+                    20071112, 20080116, 20080116, 20080116],
+         'earliest': 20061126,
+         'sampleIds': ['PC.355', 'PC.354', 'PC.356', 'PC.481', 'PC.593',
+                       'PC.607', 'PC.634', 'PC.635', 'PC.636']
+       };
+
+       // the precomputed values are numbers instead of strings
+       expected = _.mapObject(crunchedDataTwoCategories, function(samples) {
+         return _.map(samples, function(sample) {
+           return _.extend({}, sample, {'value': parseFloat(sample.value)});
+         });
+       });
+
+       result = getSampleNamesAndDataForPrecomputedTrajectories(
+         precomputed, coordinatesData);
+
+       assert.deepEqual(_.keys(result), ['Control', 'Fast']);
+       assert.equal(result.Control.length, 5);
+       assert.equal(result.Fast.length, 5, 'Fast is left-padded');
+       _.each(result, function(samples, key) {
+         _.each(samples, function(sample, i) {
+           assert.deepEqual(_.omit(sample, 'z'),
+                            _.omit(expected[key][i], 'z'));
+           assert.ok(Math.abs(sample.z - expected[key][i].z) < 1e-9);
+         });
+       });
+    });
+
     /**
      *
      * Test getMinimumDelta function computes data correctly.
@@ -217,6 +217,82 @@ requirejs(['jquery', 'underscore', 'util'], function($, _, util) {
      assert.deepEqual(split.nonNumeric, ['0.0.0', 'boaty']);
     });
 
+   QUnit.test('Test isEncodedArray', function(assert) {
+     assert.ok(util.isEncodedArray({'dtype': 'int32', 'shape': [0],
+                                    'data': ''}));
+     assert.notOk(util.isEncodedArray([[1, 2], [3, 4]]));
+     assert.notOk(util.isEncodedArray([]));
+     assert.notOk(util.isEncodedArray(null));
+     assert.notOk(util.isEncodedArray(undefined));
+     assert.notOk(util.isEncodedArray({'dtype': 'int32'}));
+    });
+
+   QUnit.test('Test decodeArray', function(assert) {
+      // values encoded with emperor.util.encode_array
+      var obs = util.decodeArray({'dtype': 'float32', 'shape': [2, 2],
+                                  'data': 'AADAPwAAAMAAAIA+AACAQA=='});
+     assert.ok(obs instanceof Float32Array);
+     assert.deepEqual(Array.from(obs), [1.5, -2, 0.25, 4]);
+
+      obs = util.decodeArray({'dtype': 'int32', 'shape': [2, 2],
+                              'data': 'AAAAAAEAAAACAAAAAwAAAA=='});
+     assert.ok(obs instanceof Int32Array);
+     assert.deepEqual(Array.from(obs), [0, 1, 2, 3]);
+
+      obs = util.decodeArray({'dtype': 'uint8', 'shape': [4],
+                              'data': 'AAECAw=='});
+     assert.ok(obs instanceof Uint8Array);
+     assert.deepEqual(Array.from(obs), [0, 1, 2, 3]);
+
+      obs = util.decodeArray({'dtype': 'uint16', 'shape': [3],
+                              'data': 'AAABACwB'});
+     assert.ok(obs instanceof Uint16Array);
+     assert.deepEqual(Array.from(obs), [0, 1, 300]);
+    });
+
+   QUnit.test('Test decodeArray with decoded data', function(assert) {
+      var values = new Float32Array([1.5, -2, 0.25, 4]);
+
+     assert.equal(util.decodeArray({'dtype': 'float32', 'shape': [2, 2],
+                                    'data': values}), values);
+     assert.throws(function() {
+        util.decodeArray({'dtype': 'float32', 'shape': [3, 2],
+                          'data': values});
+      }, /the shape requires 6/);
+    });
+
+   QUnit.test('Test computeRanges', function(assert) {
+      var values = new Float32Array([1.5, -2, 0.25, 4, -1, 3]);
+
+     assert.deepEqual(util.computeRanges(values, 3, 2),
+                      {'min': [-1, -2], 'max': [1.5, 4]});
+     assert.deepEqual(util.computeRanges(values, 1, 6),
+                      {'min': [1.5, -2, 0.25, 4, -1, 3],
+                       'max': [1.5, -2, 0.25, 4, -1, 3]});
+    });
+
+   QUnit.test('Test decodeArray errors', function(assert) {
+     assert.throws(function() {
+        util.decodeArray({'dtype': 'float64', 'shape': [1], 'data': ''});
+      }, /Unsupported data type/);
+
+     assert.throws(function() {
+        util.decodeArray({'dtype': 'int32', 'shape': [3, 2],
+                          'data': 'AAAAAAEAAAACAAAAAwAAAA=='});
+      }, /the shape requires 6/);
+    });
+
+   QUnit.test('Test decodeMatrix', function(assert) {
+      var obs = util.decodeMatrix({'dtype': 'float32', 'shape': [2, 2],
+                                   'data': 'AADAPwAAAMAAAIA+AACAQA=='});
+     assert.equal(obs.length, 2);
+     assert.deepEqual(Array.from(obs[0]), [1.5, -2]);
+     assert.deepEqual(Array.from(obs[1]), [0.25, 4]);
+
+      // rows are views of the same buffer
+     assert.equal(obs[0].buffer, obs[1].buffer);
+    });
+
    QUnit.test('Test regular expressions are escaped correctly',
      function(assert) {
          assert.equal(escapeRegularExpression('some.sample.id'),
@@ -226,5 +302,28 @@ requirejs(['jquery', 'underscore', 'util'], function($, _, util) {
          assert.equal(escapeRegularExpression('s/.*?ome.sample.id'),
                       's/\\.\\*\\?ome\\.sample\\.id');
     });
+
+   QUnit.test('Test FrameTimer', function(assert) {
+      var timer = new util.FrameTimer(3), now = 0;
+      timer._now = function() {
+        return now;
+      };
+
+     assert.deepEqual(timer.summary(), {'frames': 0, 'mean': 0, 'max': 0});
+     assert.equal(timer.stop(), null, 'Nothing to stop');
+
+      _.each([4, 2, 6, 10], function(duration) {
+        timer.start();
+        now += duration;
+       assert.equal(timer.stop(), duration);
+      });
+
+      // only the three most recent frames are kept
+     assert.deepEqual(timer.summary(), {'frames': 4, 'mean': 6, 'max': 10});
+
+      timer.reset();
+     assert.deepEqual(timer.summary(), {'frames': 0, 'mean': 0, 'max': 0});
+     assert.equal(timer.durations.length, 3);
+    });
   });
 });
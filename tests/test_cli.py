@@ -0,0 +1,163 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, emperor development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE.md, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from glob import glob
+from os import listdir
+from os.path import dirname, exists, islink, join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import re
+import warnings
+
+from click.testing import CliRunner
+from skbio import OrdinationResults
+
+from emperor.cli import emperor, load_metadata
+from emperor.core import Emperor
+from emperor.util import EmperorWarning
+
+DATA_DIR = join(dirname(__file__), 'scripts_test_data', 'make_emperor')
+
+
+def remove_plot_id(plot):
+    """Remove the randomly generated identifiers from a plot"""
+    return re.sub('emperor-notebook-0x[0-9a-f]+', 'emperor-notebook', plot)
+
+
+class CLITests(TestCase):
+    def setUp(self):
+        self.output_dir = self.root = mkdtemp()
+        self.metadata = join(DATA_DIR, 'Fasting_Map.txt')
+        self.ordinations = sorted(glob(join(DATA_DIR, 'unweighted_unifrac_pc',
+                                            '*.txt')))[:3]
+        self.runner = CliRunner()
+
+        warnings.simplefilter('ignore', category=EmperorWarning)
+
+    def tearDown(self):
+        rmtree(self.root)
+        warnings.resetwarnings()
+
+    def read_plots(self):
+        plots = {}
+        for name in listdir(self.output_dir):
+            if name.endswith('.html'):
+                with open(join(self.output_dir, name)) as f:
+                    plots[name] = f.read()
+        return plots
+
+    def test_load_metadata(self):
+        mf = load_metadata(self.metadata)
+
+        self.assertEqual(mf.index.name, 'SampleID')
+        self.assertEqual(mf.columns.tolist(), ['BarcodeSequence',
+                                               'LinkerPrimerSequence',
+                                               'Treatment', 'DOB',
+                                               'Description'])
+        # the comment line is ignored
+        self.assertEqual(mf.index[0], 'PC.354')
+        self.assertEqual(len(mf), 9)
+        self.assertEqual(mf.loc['PC.354', 'DOB'], '20061218')
+
+    def test_emperor(self):
+        result = self.runner.invoke(emperor, self.ordinations +
+                                    ['-m', self.metadata,
+                                     '-o', self.output_dir])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        names = ['pcoa_unweighted_unifrac_rarefaction_110_%d.html' % i
+                 for i in range(3)]
+        plots = self.read_plots()
+        self.assertEqual(sorted(plots), names)
+        self.assertTrue(exists(join(self.output_dir, 'emperor-support-files',
+                                    'js', 'controller.js')))
+
+        lines = result.output.splitlines()
+        self.assertEqual(len(lines), 4)
+        for line, name in zip(lines, names):
+            self.assertTrue(line.startswith(join(self.output_dir, name) +
+                                            '\t'))
+        self.assertTrue(lines[-1].startswith('Wrote 3 of 3 plots in '))
+
+        # same plot as the one written with the Python API
+        emp = Emperor(OrdinationResults.read(self.ordinations[0]),
+                      load_metadata(self.metadata),
+                      remote='emperor-support-files')
+        exp = emp.make_emperor(standalone=True)
+
+        self.assertEqual(remove_plot_id(plots[names[0]]), remove_plot_id(exp))
+        self.assertIn("'jquery': 'emperor-support-files/vendor/js/",
+                      plots[names[0]])
+
+    def test_emperor_processes(self):
+        args = ['-m', self.metadata, '--data-encoding', 'binary']
+
+        result = self.runner.invoke(emperor, self.ordinations + args +
+                                    ['-o', self.output_dir])
+        self.assertEqual(result.exit_code, 0, result.output)
+        exp = self.read_plots()
+
+        self.output_dir = join(self.output_dir, 'processes')
+        result = self.runner.invoke(emperor, self.ordinations + args +
+                                    ['-o', self.output_dir, '-j', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        obs = self.read_plots()
+
+        self.assertEqual(sorted(obs), sorted(exp))
+        for name in exp:
+            self.assertEqual(remove_plot_id(obs[name]),
+                             remove_plot_id(exp[name]))
+
+    def test_emperor_remote(self):
+        result = self.runner.invoke(emperor, self.ordinations[:1] +
+                                    ['-m', self.metadata, '--remote',
+                                     '-o', self.output_dir])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(listdir(self.output_dir),
+                         ['pcoa_unweighted_unifrac_rarefaction_110_0.html'])
+
+    def test_emperor_link(self):
+        result = self.runner.invoke(emperor, self.ordinations[:1] +
+                                    ['-m', self.metadata, '--link', 'symlink',
+                                     '-o', self.output_dir])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue(islink(join(self.output_dir, 'emperor-support-files',
+                                    'js', 'controller.js')))
+
+    def test_emperor_failures(self):
+        result = self.runner.invoke(emperor, [self.metadata,
+                                              self.ordinations[0],
+                                              '-m', self.metadata,
+                                              '-o', self.output_dir])
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('Fasting_Map.html\tfailed: ', result.output)
+        self.assertIn('Wrote 1 of 2 plots in ', result.output)
+
+    def test_emperor_duplicated_names(self):
+        result = self.runner.invoke(emperor, [self.ordinations[0],
+                                              self.ordinations[0],
+                                              '-m', self.metadata,
+                                              '-o', self.output_dir])
+
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('should have different names', result.output)
+
+    def test_emperor_invalid_n_jobs(self):
+        result = self.runner.invoke(emperor, self.ordinations +
+                                    ['-m', self.metadata, '-j', '0',
+                                     '-o', self.output_dir])
+
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn('Should be a positive integer or -1', result.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,20 +6,28 @@
 # The full license is in the file LICENSE.md, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from unittest import TestCase, main
+from unittest import TestCase, main, mock
 from copy import deepcopy
-from os.path import exists
+from os import listdir, makedirs
+from os.path import exists, join
+from pathlib import Path
 from shutil import rmtree
+from tempfile import gettempdir
 from io import StringIO
+from base64 import b64decode
 from skbio import OrdinationResults
 from jinja2 import Template
 
+import gc
+import json
 import warnings
+import weakref
 import pandas as pd
 import numpy as np
 
 from emperor.core import Emperor
-from emperor.util import EmperorWarning
+from emperor.util import (Base64Buffer, EmperorWarning, encode_array,
+                          validate_and_process_custom_axes)
 
 # account for what's allowed in python 2 vs PY3K
 try:
@@ -28,6 +36,26 @@ except Exception:
     import _test_core_strings as tcs
 
 
+def read_data_module(path):
+    """Load the contents of a data file written by write_emperor"""
+    with open(path) as f:
+        contents = f.read()
+
+    return json.loads(contents[len('define('):-len(');\n')])
+
+
+def decode_categorical_map(metadata):
+    """Convert the output of _to_categorical_map into a list of lists"""
+    dtypes = {'uint8': '<u1', 'uint16': '<u2', 'int32': '<i4'}
+
+    columns = []
+    for values, codes in zip(metadata['values'], metadata['codes']):
+        codes = np.frombuffer(b64decode(codes['data']),
+                              dtype=dtypes[codes['dtype']])
+        columns.append([values[code] for code in codes])
+    return [list(row) for row in zip(*columns)]
+
+
 class TopLevelTests(TestCase):
     def setUp(self):
         self.maxDiff = None
@@ -183,6 +211,33 @@ class TopLevelTests(TestCase):
         emp.jackknifing_method = 'sdev'
         self.assertEqual(emp.jackknifing_method, 'sdev')
 
+    def test_template_environment_shared(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        other = Emperor(self.ord_res, self.mf, remote=False)
+
+        self.assertIs(emp._environment, other._environment)
+        self.assertIs(emp._get_template(True), other._get_template(True))
+
+    def test_template_cache(self):
+        path = join(gettempdir(), 'emperor-template-cache')
+        self.files_to_remove.append(path)
+        if exists(path):
+            rmtree(path)
+
+        emp = Emperor(self.ord_res, self.mf, remote='./some-local-path/',
+                      template_cache=path)
+        other = Emperor(self.ord_res, self.mf, remote=False,
+                        template_cache=Path(path))
+        self.assertIs(emp._environment, other._environment)
+        self.assertIsNot(emp._environment,
+                         Emperor(self.ord_res, self.mf)._environment)
+
+        obs = emp.make_emperor(standalone=True)
+        self.assertEqual(tcs.STANDALONE_HTML_STRING, obs)
+
+        # one compiled file per template
+        self.assertEqual(len(listdir(path)), 5)
+
     def test_initial_biplots(self):
         emp = Emperor(self.biplot, self.mf, self.feature_mf, remote=self.url)
 
@@ -339,6 +394,41 @@ class TopLevelTests(TestCase):
                                     'corresponding to the same dataset.'):
             Emperor(self.biplot, self.mf, fmf, remote=self.url)
 
+    def test_metadata_duplicated_ids(self):
+        mf = pd.concat([self.mf, self.mf.loc[['PC.354']]])
+
+        with self.assertRaisesRegex(ValueError, 'The sample metadata has '
+                                    'duplicated identifiers: PC.354'):
+            Emperor(self.ord_res, mf, remote=self.url)
+
+    def test_metadata_shared_when_aligned(self):
+        mf = self.mf.loc[self.ord_res.samples.index]
+
+        emp = Emperor(self.ord_res, mf, remote=self.url)
+        pd.testing.assert_frame_equal(emp.mf, mf)
+        self.assertTrue(np.shares_memory(emp.mf['Treatment'].values,
+                                         mf['Treatment'].values))
+
+        emp = Emperor(self.ord_res, mf, remote=self.url, copy_metadata=True)
+        pd.testing.assert_frame_equal(emp.mf, mf)
+        self.assertFalse(np.shares_memory(emp.mf['Treatment'].values,
+                                          mf['Treatment'].values))
+
+    def test_metadata_reordered(self):
+        mf = self.mf.copy()
+        mf.loc['not.in.ordination'] = ['a', 'b', 'c']
+        original = mf.copy()
+
+        emp = Emperor(self.ord_res, mf, remote=self.url)
+
+        self.assertEqual(emp.mf.index.tolist(),
+                         self.ord_res.samples.index.tolist())
+        pd.testing.assert_frame_equal(emp.mf,
+                                      mf.loc[self.ord_res.samples.index])
+
+        # the input should not be modified
+        pd.testing.assert_frame_equal(mf, original)
+
     def test_get_template(self):
         emp = Emperor(self.ord_res, self.mf, remote=False)
         obs = emp._get_template(False)
@@ -430,6 +520,432 @@ class TopLevelTests(TestCase):
         self.files_to_remove.append(local_path)
         self.files_to_remove.append('./something-else')
 
+    def test_write_emperor(self):
+        local_path = './some-local-plot/'
+        self.files_to_remove.append(local_path)
+
+        emp = Emperor(self.ord_res, self.mf, remote='.')
+        emp.color_by('Treatment')
+
+        obs = emp.write_emperor(local_path)
+
+        self.assertEqual(obs, join(local_path, 'index.html'))
+        self.assertEqual(emp.data_encoding, 'json')
+
+        with open(obs) as f:
+            html = f.read()
+
+        # the data is loaded as a dependency and is not embedded
+        self.assertTrue('"emperor-data/plot.js", "emperor-data/coordinates.js"'
+                        '],' in html)
+        self.assertTrue('var data = plotData;' in html)
+        self.assertTrue('-0.65199581' not in html)
+        self.assertTrue('var metadataFiles = ["emperor-data/metadata-0.js", '
+                        'null, "emperor-data/metadata-2.js", '
+                        '"emperor-data/metadata-3.js"];' in html)
+
+        plot = read_data_module(join(local_path, 'emperor-data', 'plot.js'))
+        self.assertEqual(plot['info'], emp.info)
+        self.assertEqual(plot['render_mode'], 'auto')
+        self.assertEqual(plot['render_thresholds'], {})
+        self.assertEqual(plot['plot']['settings'], emp.settings)
+        self.assertEqual(plot['plot']['metadata_headers'],
+                         ['SampleID', 'Treatment', 'DOB', 'Description'])
+        self.assertTrue('coordinates' not in plot['plot']['decomposition'])
+
+        # only the category used by the settings is embedded
+        metadata = plot['plot']['metadata']
+        self.assertEqual(metadata['values'], [None, ['Fast', 'Control'],
+                                              None, None])
+        self.assertEqual(metadata['codes'][0], None)
+        self.assertEqual(metadata['codes'][1]['dtype'], 'uint8')
+
+        column = read_data_module(join(local_path, 'emperor-data',
+                                       'metadata-3.js'))
+        self.assertEqual([row[0] for row in decode_categorical_map(
+                          {'values': [column['values']],
+                           'codes': [column['codes']]})],
+                         [row[3] for row in self.expected_metadata])
+
+        coords = read_data_module(join(local_path, 'emperor-data',
+                                       'coordinates.js'))
+        self.assertEqual(coords['coordinates']['shape'], [9, 5])
+        self.assertIsNone(coords['ci'])
+        self.assertEqual(coords['edges'], [])
+
+        self.assertFalse(exists(join(local_path, 'emperor-data',
+                                     'biplot.js')))
+
+    def test_write_emperor_biplot(self):
+        local_path = './some-local-plot/'
+        self.files_to_remove.append(local_path)
+
+        emp = Emperor(self.biplot, self.mf, self.feature_mf, remote='.')
+        emp.write_emperor(local_path)
+
+        with open(join(local_path, 'index.html')) as f:
+            html = f.read()
+        self.assertTrue('"emperor-data/biplot.js"],' in html)
+
+        biplot = read_data_module(join(local_path, 'emperor-data',
+                                       'biplot.js'))
+        self.assertEqual(biplot['type'], 'arrow')
+        self.assertEqual(biplot['decomposition']['sample_ids'],
+                         ['f.PC.636', 'f.PC.635', 'f.PC.356', 'f.PC.481',
+                          'f.PC.354'])
+        self.assertEqual(decode_categorical_map(biplot['metadata']),
+                         emp._to_legacy_map(emp.feature_mf)[1])
+
+    def test_write_emperor_animations(self):
+        local_path = './some-local-plot/'
+        self.files_to_remove.append(local_path)
+
+        emp = Emperor(self.ord_res, self.mf, remote='.')
+        emp.animations_by('DOB', 'Treatment', {'Fast': 'red',
+                                               'Control': 'blue'})
+        emp.write_emperor(local_path)
+
+        self.assertFalse(exists(join(local_path, 'emperor-data',
+                                     'metadata-1.js')))
+        self.assertFalse(exists(join(local_path, 'emperor-data',
+                                     'metadata-2.js')))
+        self.assertTrue(exists(join(local_path, 'emperor-data',
+                                    'metadata-3.js')))
+
+    def test_get_data_reuses_processed_data(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+
+        with mock.patch.object(emp, '_process_data',
+                               wraps=emp._process_data) as process:
+            first = str(emp)
+            emp.color_by('Treatment')
+            emp.info = 'Some information'
+            second = emp.make_emperor(standalone=True)
+            emp.render_js('some-id')
+
+        self.assertEqual(process.call_count, 1)
+        self.assertTrue('"color": {"category": "Treatment"' not in first)
+        self.assertTrue('"color": {"category": "Treatment"' in second)
+        self.assertTrue('"info": "Some information"' in second)
+
+    def test_get_data_key_changes(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+
+        with mock.patch.object(emp, '_process_data',
+                               wraps=emp._process_data) as process:
+            emp._get_data()
+
+            emp.dimensions = 3
+            self.assertEqual(len(emp._get_data()['plot']['decomposition']
+                                 ['axes_names']), 3)
+
+            emp.custom_axes = ['DOB']
+            emp._get_data()
+
+            emp.data_encoding = 'binary'
+            emp._get_data()
+
+            emp.mf = emp.mf.copy()
+            emp._get_data()
+
+            # nothing changed
+            emp._get_data()
+
+        self.assertEqual(process.call_count, 5)
+
+    def test_get_data_precompute_trajectories(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        emp.animations_by('DOB', 'Treatment', {'Fast': 'red',
+                                               'Control': 'blue'})
+
+        # the trajectories are only included when requested
+        self.assertTrue('trajectories' not in
+                        emp._get_data()['plot']['decomposition'])
+
+        emp.precompute_trajectories = True
+        obs = emp._get_data()['plot']['decomposition']['trajectories']
+
+        exp = {'gradient': 'DOB', 'trajectory': 'Treatment',
+               'names': ['Fast', 'Control'], 'offsets': [0, 4, 9],
+               'indices': [7, 0, 1, 8, 2, 4, 6, 3, 5],
+               'values': [20071112.0, 20080116.0, 20080116.0, 20080116.0,
+                          20061126.0, 20061218.0, 20061218.0, 20070314.0,
+                          20071210.0],
+               'earliest': 20061126.0, 'minimum_delta': 92.0}
+        self.assertEqual(obs, exp)
+
+        # the cached data is not modified
+        self.assertTrue('trajectories' not in
+                        emp._data_cache[2]['plot']['decomposition'])
+
+        emp.data_encoding = 'binary'
+        obs = emp._get_data()['plot']['decomposition']['trajectories']
+        self.assertEqual(obs['indices'],
+                         encode_array(exp['indices'], 'int32'))
+
+    def test_get_data_precompute_trajectories_padding(self):
+        self.mf['DOB'] = [0, 0, 4, 5, 7, 1, 3, 4, 4]
+        self.mf['Subject'] = ['a', 'a', 'a', 'b', 'b', 'b', 'b', 'c', 'c']
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        emp.animations_by('DOB', 'Subject', None)
+        emp.precompute_trajectories = True
+
+        obs = emp._get_data()['plot']['decomposition']['trajectories']
+
+        # "c" has a single value in the gradient, and "b" is padded with the
+        # earliest value, so the minimum delta is 1 (from 0 to 1)
+        self.assertEqual(obs['names'], ['a', 'b'])
+        self.assertEqual(obs['offsets'], [0, 3, 7])
+        self.assertEqual(obs['indices'], [4, 6, 2, 7, 8, 3, 5])
+        self.assertEqual(obs['values'], [0, 0, 4, 1, 3, 5, 7])
+        self.assertEqual(obs['earliest'], 0)
+        self.assertEqual(obs['minimum_delta'], 1)
+
+    def test_get_data_precompute_trajectories_procrustes(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url,
+                      procrustes=deepcopy(self.jackknifed[1:2]))
+        emp.animations_by('DOB', 'Treatment', None)
+        emp.precompute_trajectories = True
+
+        obs = emp._get_data()['plot']['decomposition']['trajectories']
+
+        self.assertEqual(obs['offsets'], [0, 8, 18])
+        self.assertEqual(obs['indices'][:4], [7, 16, 0, 1])
+        self.assertEqual(obs['minimum_delta'], 92.0)
+
+    def test_get_data_precompute_trajectories_errors(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        emp.precompute_trajectories = True
+
+        emp.animations_by('Description', 'Treatment', None)
+        with self.assertRaisesRegex(ValueError, 'should only have numeric '
+                                    'values, found: Control_mouse'):
+            emp.make_emperor()
+
+        emp.animations_by('DOB', 'Description', None)
+        with self.assertRaisesRegex(ValueError, 'None of the trajectories in '
+                                    '"Description" has more than one value'):
+            emp.make_emperor()
+
+    def test_render_mode(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        self.assertEqual(emp.render_mode, 'auto')
+        self.assertEqual(emp._get_data()['render_mode'], 'auto')
+
+        emp = Emperor(self.ord_res, self.mf, remote=self.url,
+                      render_mode='instanced')
+        with mock.patch.object(emp, '_process_data',
+                               wraps=emp._process_data) as process:
+            self.assertEqual(emp._get_data()['render_mode'], 'instanced')
+            self.assertEqual(emp._to_dict(emp._process_data([], 'IQR'))
+                             ['render_mode'], 'instanced')
+
+            # the rendering mode doesn't affect the processed data
+            emp.render_mode = 'point-cloud'
+            html = emp.make_emperor(standalone=True)
+
+        self.assertEqual(process.call_count, 2)
+        self.assertTrue('"render_mode": "point-cloud"' in html)
+        self.assertTrue('data.info, data.render_mode,' in html)
+
+    def test_render_thresholds(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        self.assertEqual(emp.render_thresholds, {})
+        self.assertEqual(emp._get_data()['render_thresholds'], {})
+
+        emp = Emperor(self.ord_res, self.mf, remote=self.url,
+                      render_thresholds={'point_cloud': np.int64(5)})
+        with mock.patch.object(emp, '_process_data',
+                               wraps=emp._process_data) as process:
+            self.assertEqual(emp._get_data()['render_thresholds'],
+                             {'point_cloud': 5})
+
+            # the thresholds don't affect the processed data
+            emp.render_thresholds['instancing'] = 0
+            emp.render_thresholds['svg_warning'] = 100
+            html = emp.make_emperor(standalone=True)
+
+        self.assertEqual(process.call_count, 1)
+        self.assertTrue('"render_thresholds": {"instancing": 0, "point_cloud":'
+                        ' 5, "svg_warning": 100}' in html)
+        self.assertTrue('data.render_thresholds);' in html)
+
+    def test_render_thresholds_unrecognized(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url,
+                      render_thresholds={'points': 10})
+
+        with self.assertRaisesRegex(KeyError, 'Unrecognized rendering '
+                                    'threshold "points"'):
+            emp.make_emperor()
+
+    def test_render_thresholds_invalid(self):
+        for value in [-1, 1.5, '100', True, None]:
+            emp = Emperor(self.ord_res, self.mf, remote=self.url,
+                          render_thresholds={'instancing': value})
+
+            with self.assertRaisesRegex(ValueError, 'The "instancing" '
+                                        'threshold should be a non-negative '
+                                        'integer'):
+                emp.make_emperor()
+
+    def test_render_mode_unsupported(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url,
+                      render_mode='voxels')
+
+        with self.assertRaisesRegex(ValueError, 'Unsupported rendering mode '
+                                    '"voxels"'):
+            emp.make_emperor()
+
+    def test_invalidate_cache(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+
+        before = emp._get_data()
+        emp.mf['Treatment'] = 'Something else'
+        self.assertEqual(emp._get_data()['plot']['metadata'],
+                         before['plot']['metadata'])
+
+        emp.invalidate_cache()
+        after = emp._get_data()
+        self.assertEqual(after['plot']['metadata'][0][1], 'Something else')
+
+    def test_write_emperor_does_not_modify_cache(self):
+        local_path = './some-local-plot/'
+        self.files_to_remove.append(local_path)
+
+        emp = Emperor(self.ord_res, self.mf, remote='.')
+        emp.data_encoding = 'binary'
+
+        before = emp._get_data()
+        emp.write_emperor(local_path)
+        after = emp._get_data()
+
+        self.assertEqual(before, after)
+        self.assertTrue('coordinates' in after['plot']['decomposition'])
+        self.assertEqual(decode_categorical_map(after['plot']['metadata']),
+                         self.expected_metadata)
+
+    def test_stream_emperor(self):
+        emp = Emperor(self.ord_res, self.mf, remote='./some-local-path/')
+
+        # the values are escaped in the same way as the tojson filter
+        emp.info = "<b>Jack & Jill's</b>"
+        emp.color_by('Treatment')
+
+        for standalone in [True, False]:
+            np.random.seed(111)
+            exp = emp.make_emperor(standalone=standalone)
+
+            np.random.seed(111)
+            f = StringIO()
+            emp.stream_emperor(f, standalone=standalone)
+
+            self.assertEqual(f.getvalue(), exp)
+            self.assertFalse(f.closed)
+
+    def test_stream_emperor_not_cached(self):
+        def make(**kwargs):
+            emp = Emperor(self.ord_res, self.mf, remote='.', **kwargs)
+            emp.custom_axes = ['DOB']
+            return emp
+
+        variants = [{}, {'jackknifed': self.jackknifed},
+                    {'procrustes': self.jackknifed[1:]}]
+
+        for encoding in ['json', 'binary']:
+            for kwargs in variants:
+                emp, exp = make(**kwargs), make(**kwargs)
+                emp.data_encoding = exp.data_encoding = encoding
+
+                np.random.seed(111)
+                f = StringIO()
+                emp.stream_emperor(f, standalone=True)
+
+                # the lazily processed data is not cached
+                self.assertIsNone(emp._data_cache)
+
+                np.random.seed(111)
+                self.assertEqual(f.getvalue(),
+                                 exp.make_emperor(standalone=True))
+
+    def test_stream_emperor_biplot(self):
+        for encoding in ['json', 'binary']:
+            emp = Emperor(self.biplot, self.mf, self.feature_mf, remote='.')
+            emp.data_encoding = encoding
+
+            np.random.seed(111)
+            f = StringIO()
+            emp.stream_emperor(f)
+
+            np.random.seed(111)
+            self.assertEqual(f.getvalue(), emp.make_emperor())
+
+    def test_stream_emperor_many_columns(self):
+        # more metadata columns than elements in a batch of iterencode_json
+        mf = pd.DataFrame(np.random.RandomState(0).randint(0, 3, (9, 1200)),
+                          index=self.mf.index,
+                          columns=['c%d' % i for i in range(1200)])
+
+        for encoding in ['json', 'binary']:
+            emp = Emperor(self.ord_res, mf.astype(str), remote='.')
+            emp.data_encoding = encoding
+
+            np.random.seed(111)
+            f = StringIO()
+            emp.stream_emperor(f, standalone=True)
+
+            np.random.seed(111)
+            self.assertEqual(f.getvalue(), emp.make_emperor(standalone=True))
+
+    def test_get_data_lazy(self):
+        emp = Emperor(self.ord_res, self.mf, remote='.')
+        emp.data_encoding = 'binary'
+
+        data = emp._get_data(lazy=True)
+        coordinates = data['plot']['decomposition']['coordinates']
+        self.assertIsInstance(coordinates['data'], Base64Buffer)
+        self.assertIsNone(emp._data_cache)
+
+        # the cached data is used when it's up to date
+        exp = emp._get_data()
+        data = emp._get_data(lazy=True)
+        self.assertIs(data['plot']['decomposition'],
+                      exp['plot']['decomposition'])
+
+    def test_stream_emperor_path(self):
+        local_path = './some-local-plot/'
+        self.files_to_remove.append(local_path)
+        makedirs(local_path)
+        path = join(local_path, 'plot.html')
+
+        emp = Emperor(self.ord_res, self.mf, remote='./some-local-path/')
+        emp.data_encoding = 'binary'
+
+        np.random.seed(111)
+        exp = emp.make_emperor(standalone=True)
+
+        np.random.seed(111)
+        self.assertIsNone(emp.stream_emperor(path, standalone=True))
+
+        with open(path) as f:
+            self.assertEqual(f.read(), exp)
+
+    def test_stream_emperor_chunks(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        f = mock.Mock()
+
+        with mock.patch('emperor.core._STREAM_CHUNK_SIZE', 100):
+            np.random.seed(111)
+            emp.stream_emperor(f)
+
+        chunks = [call[0][0] for call in f.write.call_args_list]
+
+        np.random.seed(111)
+        self.assertEqual(''.join(chunks), emp.make_emperor())
+        self.assertTrue(len(chunks) > 1)
+
+        # only the last chunk can be smaller than the limit
+        self.assertTrue(all(len(chunk) >= 100 for chunk in chunks[:-1]))
+
     def test_process_data(self):
         emp = Emperor(self.ord_res, self.mf, remote=self.url)
 
@@ -639,6 +1155,27 @@ class TopLevelTests(TestCase):
         with self.assertRaises(KeyError):
             emp.make_emperor()
 
+    def test_custom_axes_missing_headers_message(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False)
+
+        emp.custom_axes = ['DOB', ':L']
+        with self.assertRaisesRegex(KeyError, 'not present in the sample '
+                                    'information: :L'):
+            emp.make_emperor()
+
+    def test_custom_axes_validated_once(self):
+        for encoding in ['json', 'binary']:
+            emp = Emperor(self.ord_res, self.mf, remote=False)
+            emp.data_encoding = encoding
+
+            with mock.patch('emperor.core.validate_and_process_custom_axes',
+                            wraps=validate_and_process_custom_axes) as v:
+                emp._process_data(['DOB'], 'IQR')
+
+            # only the custom axes are validated, not the whole metadata
+            self.assertEqual(v.call_count, 1)
+            self.assertEqual(v.call_args[0][0].columns.tolist(), ['DOB'])
+
     def test_custom_axes_no_errors(self):
         emp = Emperor(self.ord_res, self.mf, remote=False)
         emp.custom_axes.append('DOB')
@@ -756,6 +1293,134 @@ class TopLevelTests(TestCase):
             self.assertEqual(observed['plot'][key],
                              expected['plot'][key])
 
+    def test_process_jackknifed_generator(self):
+        for method in ['IQR', 'ideal_fourths', 'sdev']:
+            exp = Emperor(self.ord_res, self.mf, remote=False,
+                          jackknifed=list(self.jackknifed))
+            exp = exp._process_data([], method)
+
+            emp = Emperor(self.ord_res, self.mf, remote=False,
+                          jackknifed=(j for j in self.jackknifed))
+            self.assertEqual(len(emp.jackknifed), 3)
+
+            obs = emp._process_data([], method)
+
+            self.assertEqual(obs[0], exp[0])
+            np.testing.assert_array_almost_equal(obs[1], exp[1])
+            np.testing.assert_array_almost_equal(obs[2], exp[2])
+            np.testing.assert_array_almost_equal(obs[3], exp[3])
+
+            # the data can be processed more than once, and the quartiles
+            # are computed from the spooled replicates
+            with mock.patch('emperor.util.TemporaryFile') as spool:
+                np.testing.assert_array_almost_equal(
+                    emp._process_data([], method)[3], exp[3])
+            spool.assert_not_called()
+
+    def test_process_jackknifed_paths(self):
+        path = join(gettempdir(), 'emperor-jackknifed')
+        makedirs(path, exist_ok=True)
+        self.files_to_remove.append(path)
+
+        paths = []
+        for i, ordination in enumerate(self.jackknifed):
+            paths.append(join(path, 'replicate-%d.txt' % i))
+            ordination.write(paths[-1])
+
+        emp = Emperor(self.ord_res, self.mf, remote=False, jackknifed=paths)
+        exp = Emperor(self.ord_res, self.mf, remote=False,
+                      jackknifed=self.jackknifed)
+
+        aligned = emp.ordination.samples.index.tolist()
+        for ordination in emp.jackknifed:
+            self.assertEqual(ordination.samples.index.tolist(), aligned)
+
+        emp.custom_axes = ['DOB']
+        exp.custom_axes = ['DOB']
+        obs = emp._process_data(emp.custom_axes, 'IQR')
+        exp = exp._process_data(exp.custom_axes, 'IQR')
+
+        self.assertEqual(obs[0], exp[0])
+        np.testing.assert_array_almost_equal(obs[1], exp[1])
+        np.testing.assert_array_almost_equal(obs[3], exp[3])
+
+    def test_jackknifed_generator_released(self):
+        # the loaded ordinations are released once they are written, only
+        # the last couple of replicates can still be referenced by the
+        # iterators while spooling
+        references, alive = [], []
+
+        def replicates():
+            for original in self.jackknifed * 3:
+                ordination = deepcopy(original)
+                gc.collect()
+                alive.append(sum(ref() is not None for ref in references))
+
+                references.append(weakref.ref(ordination.samples))
+                yield ordination
+
+        emp = Emperor(self.ord_res, self.mf, remote=False,
+                      jackknifed=replicates())
+
+        self.assertEqual(len(emp.jackknifed), 9)
+        self.assertTrue(max(alive) <= 2, alive)
+
+        for obs, exp in zip(emp.jackknifed, self.jackknifed * 3):
+            pd.testing.assert_series_equal(obs.eigvals, exp.eigvals)
+            pd.testing.assert_series_equal(obs.proportion_explained,
+                                           exp.proportion_explained)
+            self.assertEqual(obs.short_method_name, exp.short_method_name)
+            self.assertEqual(obs.long_method_name, exp.long_method_name)
+
+    def test_jackknifed_generator_bad_data(self):
+        with self.assertRaises(TypeError):
+            Emperor(self.ord_res, self.mf,
+                    jackknifed=(j for j in self.jackknifed + [1]))
+
+        self.jackknifed[1].samples.index = pd.Series(list('abcdefghi'))
+        with self.assertRaises(ValueError):
+            Emperor(self.ord_res, self.mf,
+                    jackknifed=(j for j in self.jackknifed))
+
+    def test_n_jobs_jackknifed(self):
+        # in-memory and streamed replicates
+        for kind in [list, iter]:
+            for method in ['IQR', 'sdev']:
+                outputs = []
+                for n_jobs in [1, 4, -1]:
+                    emp = Emperor(self.ord_res, self.mf, remote=False,
+                                  jackknifed=kind(deepcopy(self.jackknifed)),
+                                  n_jobs=n_jobs)
+                    emp.jackknifing_method = method
+
+                    np.random.seed(111)
+                    outputs.append(emp.make_emperor(standalone=True))
+
+                self.assertEqual(outputs[0], outputs[1])
+                self.assertEqual(outputs[0], outputs[2])
+
+    def test_n_jobs_procrustes(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False,
+                      procrustes=deepcopy(self.jackknifed[1:]))
+        np.random.seed(111)
+        exp = emp.make_emperor(standalone=True)
+
+        emp = Emperor(self.ord_res, self.mf, remote=False,
+                      procrustes=deepcopy(self.jackknifed[1:]), n_jobs=3)
+        np.random.seed(111)
+        self.assertEqual(emp.make_emperor(standalone=True), exp)
+
+    def test_n_jobs_errors(self):
+        self.jackknifed[2].samples.index = pd.Series(list('abcdefghi'))
+
+        with self.assertRaisesRegex(ValueError, r'index \(2\)'):
+            Emperor(self.ord_res, self.mf, jackknifed=self.jackknifed,
+                    n_jobs=2)
+
+        with self.assertRaisesRegex(ValueError, r'index \(2\)'):
+            Emperor(self.ord_res, self.mf, n_jobs=2,
+                    jackknifed=(j for j in self.jackknifed))
+
     def test_process_procrustes_data(self):
         ordinations = self.jackknifed[1:]
         emp = Emperor(self.ord_res, self.mf, remote=False,
@@ -811,6 +1476,196 @@ class TopLevelTests(TestCase):
         self.assertTrue(bi_headers is None)
         self.assertTrue(bi_metadata is None)
 
+    def test_to_dict_binary_encoding(self):
+        emp = Emperor(self.biplot, self.mf, self.feature_mf, remote=self.url)
+        emp.data_encoding = 'binary'
+
+        obs = emp._to_dict(emp._process_data([], 'IQR'))
+
+        coords = obs['plot']['decomposition']['coordinates']
+        self.assertEqual(coords['dtype'], 'float32')
+        self.assertEqual(coords['shape'], [9, 5])
+        values = np.frombuffer(b64decode(coords['data']), dtype='<f4')
+        np.testing.assert_array_almost_equal(values.reshape(9, 5),
+                                             self.expected_coords)
+
+        self.assertIsNone(obs['plot']['decomposition']['ci'])
+        self.assertEqual(obs['plot']['decomposition']['edges'], [])
+
+        coords = obs['biplot']['decomposition']['coordinates']
+        self.assertEqual(coords['shape'], [5, 5])
+        values = np.frombuffer(b64decode(coords['data']), dtype='<f4')
+        np.testing.assert_array_almost_equal(values.reshape(5, 5),
+                                             self.expected_biplot_coords)
+
+        # metadata is dictionary-encoded
+        self.assertEqual(decode_categorical_map(obs['plot']['metadata']),
+                         self.expected_metadata)
+        self.assertEqual(decode_categorical_map(obs['biplot']['metadata']),
+                         emp._to_legacy_map(emp.feature_mf)[1])
+
+    def test_to_dict_binary_encoding_jackknifed(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False,
+                      jackknifed=self.jackknifed)
+        emp.data_encoding = 'binary'
+
+        obs = emp._to_dict(emp._process_data([], 'IQR'))
+        emp.data_encoding = 'json'
+        exp = emp._to_dict(emp._process_data([], 'IQR'))
+
+        for key in ['coordinates', 'ci']:
+            encoded = obs['plot']['decomposition'][key]
+            self.assertEqual(encoded['shape'], [9, 5])
+            values = np.frombuffer(b64decode(encoded['data']), dtype='<f4')
+            np.testing.assert_array_almost_equal(
+                values.reshape(9, 5), exp['plot']['decomposition'][key])
+
+    def test_to_dict_binary_encoding_procrustes(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False,
+                      procrustes=self.jackknifed[1:])
+        emp.data_encoding = 'binary'
+
+        obs = emp._to_dict(emp._process_data([], 'IQR'))
+
+        edges = obs['plot']['decomposition']['edges']
+        self.assertEqual(edges['dtype'], 'int32')
+        self.assertEqual(edges['shape'], [18, 2])
+
+        # edges are pairs of positions in the sample identifiers
+        ids = obs['plot']['decomposition']['sample_ids']
+        values = np.frombuffer(b64decode(edges['data']), dtype='<i4')
+        values = values.reshape(18, 2)
+        self.assertEqual([ids[u] for u in values[:, 0]],
+                         [i + '_0' for i in emp.mf.index] * 2)
+        self.assertEqual([ids[v] for v in values[:, 1]],
+                         [i + '_1' for i in emp.mf.index] +
+                         [i + '_2' for i in emp.mf.index])
+
+    def test_to_categorical_map(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False)
+
+        headers, obs = emp._to_categorical_map(emp.mf)
+
+        self.assertEqual(headers, ['SampleID', 'Treatment', 'DOB',
+                                   'Description'])
+        self.assertEqual(obs['values'][1], ['Fast', 'Control'])
+        self.assertEqual(obs['values'][2], ['20080116', '20061126',
+                                            '20070314', '20061218',
+                                            '20071210', '20071112'])
+
+        codes = obs['codes'][2]
+        self.assertEqual(codes['dtype'], 'uint8')
+        self.assertEqual(codes['shape'], [9])
+        np.testing.assert_array_equal(
+            np.frombuffer(b64decode(codes['data']), dtype='<u1'),
+            [0, 0, 1, 2, 3, 4, 3, 5, 0])
+
+        self.assertEqual(decode_categorical_map(obs), self.expected_metadata)
+
+    def test_to_categorical_map_missing_values(self):
+        self.mf['Numeric'] = [1, 2.5, np.nan, 1, 1, 2.5, np.nan, 3, 1]
+        emp = Emperor(self.ord_res, self.mf, remote=False)
+
+        headers, obs = emp._to_categorical_map(emp.mf)
+        self.assertEqual(obs['values'][4], ['1.0', '3.0', '2.5', 'nan'])
+        self.assertEqual(emp._to_legacy_map(emp.mf),
+                         (headers, decode_categorical_map(obs)))
+
+    def test_to_categorical_map_procrustes(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False,
+                      procrustes=self.jackknifed[1:])
+
+        obs = emp._to_categorical_map(emp.mf, repeats=2)
+        exp = emp._to_legacy_map(emp.mf, repeats=2)
+
+        self.assertEqual(obs[0], exp[0])
+        self.assertEqual(obs[0][-1], '__Procrustes_Names__')
+        self.assertEqual(obs[1]['values'][-1], ['Ordination 0',
+                                                'Ordination 1',
+                                                'Ordination 2'])
+        self.assertEqual(decode_categorical_map(obs[1]), exp[1])
+
+    def test_to_categorical_map_custom_axes(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False)
+
+        obs = emp._to_categorical_map(emp.mf, ['DOB'])
+        exp = emp._to_legacy_map(emp.mf, ['DOB'])
+
+        self.assertEqual(obs[0], exp[0])
+        self.assertEqual(decode_categorical_map(obs[1]), exp[1])
+
+    def test_process_data_binary_encoding_custom_axes(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False,
+                      procrustes=self.jackknifed[1:])
+        exp = emp._process_data(['DOB'], 'IQR')
+
+        emp.data_encoding = 'binary'
+        obs = emp._process_data(['DOB'], 'IQR')
+
+        self.assertEqual(obs[0], exp[0])
+        np.testing.assert_array_almost_equal(obs[1], exp[1])
+        self.assertEqual(obs[4], exp[4])
+        self.assertEqual(decode_categorical_map(obs[5]), exp[5])
+
+    def test_to_dict_biplot(self):
+        emp = Emperor(self.biplot, self.mf, self.feature_mf, remote=self.url)
+
+        obs = emp._to_dict(emp._process_data([], 'IQR'))
+        plot, biplot = obs['plot'], obs['biplot']
+
+        self.assertEqual(biplot['type'], 'arrow')
+        self.assertIsNone(biplot['settings'])
+        self.assertEqual(biplot['metadata_headers'],
+                         ['SampleID', 'Category', 'Second'])
+        self.assertEqual(biplot['decomposition']['sample_ids'],
+                         ['f.PC.636', 'f.PC.635', 'f.PC.356', 'f.PC.481',
+                          'f.PC.354'])
+        self.assertEqual(biplot['decomposition']['ci'], [])
+        self.assertEqual(biplot['decomposition']['edges'], [])
+        np.testing.assert_array_almost_equal(
+            biplot['decomposition']['coordinates'],
+            self.expected_biplot_coords)
+
+        # the axes are the same, but the lists are not shared
+        for key in ['axes_names', 'percents_explained']:
+            self.assertEqual(biplot['decomposition'][key],
+                             plot['decomposition'][key])
+            self.assertIsNot(biplot['decomposition'][key],
+                             plot['decomposition'][key])
+
+        # the scatter plot is not modified
+        self.assertEqual(plot['type'], 'scatter')
+        self.assertEqual(plot['metadata'], self.expected_metadata)
+
+    def test_to_legacy_map_strings(self):
+        self.mf['Numeric'] = [1, 2.5, np.nan, 1, 1, 2.5, np.nan, 3, 1]
+        emp = Emperor(self.ord_res, self.mf, remote=False)
+
+        headers, obs = emp._to_legacy_map(emp.mf)
+
+        self.assertEqual(headers, ['SampleID', 'Treatment', 'DOB',
+                                   'Description', 'Numeric'])
+        self.assertEqual(obs, emp.mf.reset_index().astype(str).values.tolist())
+
+        # repeated values share the same string
+        self.assertIs(obs[0][1], obs[1][1])
+        self.assertIs(obs[0][4], obs[3][4])
+
+    def test_to_dict_unsupported_encoding(self):
+        emp = Emperor(self.ord_res, self.mf, remote=False)
+        emp.data_encoding = 'yaml'
+
+        with self.assertRaises(ValueError):
+            emp.make_emperor()
+
+    def test_formatting_binary_encoding(self):
+        emp = Emperor(self.ord_res, self.mf, remote=self.url)
+        emp.data_encoding = 'binary'
+
+        obs = str(emp)
+        self.assertTrue('"dtype": "float32"' in obs)
+        self.assertTrue('-0.65199581' not in obs)
+
     def test_jackknifed_bad_data(self):
         with self.assertRaises(TypeError):
             Emperor(self.ord_res, self.mf, jackknifed=[1])
@@ -6,20 +6,34 @@
 # The full license is in the file LICENSE.md, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from unittest import TestCase, main
-from os.path import exists, join
+from unittest import TestCase, main, mock
+from os import listdir, remove
+from os.path import exists, islink, join, realpath, samefile
 from shutil import rmtree
-from tempfile import gettempdir
+from tempfile import gettempdir, mkdtemp
 
+import json
+import numpy as np
 import pandas as pd
 import warnings
-from numpy import array
-from numpy.testing import assert_almost_equal
-
+from base64 import b64decode
+from numpy import array, arange, frombuffer, nan, uint8, uint16
+from numpy.random import RandomState
+from numpy.testing import assert_almost_equal, assert_equal
+
+from emperor.qiime_backports.make_3d_plots import (get_custom_coords,
+                                                   remove_nans,
+                                                   scale_custom_coords)
+from emperor.qiime_backports.util import summarize_pcoas
+from emperor import __version__ as emperor_version
 from emperor.util import (
-                          preprocess_coords_file,
+                          preprocess_coords_file, embed_custom_axes,
+                          summarize_jackknifed, summarize_jackknifed_stream,
                           nbinstall, validate_and_process_custom_axes,
-                          resolve_stable_url, EmperorWarning)
+                          resolve_stable_url, encode_array,
+                          encode_categories, iterencode_json, parallel_map,
+                          deploy_support_files, get_emperor_support_files_dir,
+                          Base64Buffer, EmperorWarning)
 
 
 warnings.simplefilter('always', category=EmperorWarning)
@@ -275,6 +289,249 @@ class TopLevelTests(TestCase):
 
         self.assertTrue(exists(target_path))
 
+    def test_embed_custom_axes(self):
+        mapping = pd.DataFrame(data=MAPPING_FILE_DATA_GRADIENT,
+                               columns=self.mapping_file_headers_gradient)
+        mapping.set_index('SampleID', inplace=True)
+
+        obs_header, obs_coords = embed_custom_axes(
+            self.coords_header, self.coords_data, mapping, ['Time'])
+
+        self.assertEqual(obs_header, self.coords_header)
+        assert_almost_equal(obs_coords, array(
+            [[0.03333333, -0.2, -0.1, 0.06, -0.06],
+             [0.03333333, -0.3, 0.04, -0.1, 0.15],
+             [0.2, 0.1, -0.1, -0.2, 0.08],
+             [-0.3, 0.04, -0.01, 0.06, -0.34]]))
+
+    def test_embed_custom_axes_missing_values(self):
+        mapping = pd.DataFrame(index=['c', 'a', 'b', 'd', 'a'],
+                               data={'x': ['1', 'foo', '2', '3', '0'],
+                                     'y': [1.0, 2.0, 3.0, 4.0, 5.0]})
+        coords = array([[1.0, 2.0], [0.25, nan], [-1.0, 0.5], [0.5, 1.0],
+                        [3.0, 3.0]])
+
+        # "a" is not numeric, "b" has a missing coordinate and "e" is not in
+        # the mapping
+        obs_header, obs_coords = embed_custom_axes(['a', 'b', 'c', 'd', 'e'],
+                                                   coords, mapping,
+                                                   ['y', 'x'])
+
+        self.assertEqual(obs_header, ['c', 'd'])
+        assert_equal(obs_coords, array([[-1.0, -1.0, -1.0, 0.5],
+                                        [1.0, 1.0, 0.5, 1.0]]))
+
+        # duplicated identifiers use the first value
+        obs_header, obs_coords = embed_custom_axes(['c', 'a', 'd'],
+                                                   coords[[0, 2, 3]], mapping,
+                                                   ['y'])
+        self.assertEqual(obs_header, ['c', 'a', 'd'])
+        assert_equal(obs_coords, array([[-1.0, 1.0, 2.0],
+                                        [0.0, -1.0, 0.5],
+                                        [2.0, 0.5, 1.0]]))
+
+    def test_embed_custom_axes_missing_header(self):
+        mapping = pd.DataFrame(index=['a', 'b'], data={'x': [1, 2]})
+
+        with self.assertRaises(ValueError):
+            embed_custom_axes(['a', 'b'], array([[1.0, 2.0], [3.0, 4.0]]),
+                              mapping, ['x', 'z'])
+
+    def test_embed_custom_axes_matches_legacy(self):
+        state = RandomState(42)
+        ids = ['s%d' % i for i in range(200)]
+
+        coords = state.randn(200, 5)
+        coords[[3, 17], 2] = nan
+
+        y = state.randint(0, 10, 200).astype(object)
+        y[10] = 'not a number'
+        mapping = pd.DataFrame(index=ids[::-1],
+                               data={'x': state.randn(200), 'y': y,
+                                     'z': state.rand(200) * 1e6})
+
+        for axes in [['x'], ['z', 'y'], ['y', 'x', 'z']]:
+            # the legacy functions operate on the string representation
+            legacy_mapping = [['SampleID'] + mapping.columns.tolist()]
+            legacy_mapping += mapping.reset_index().astype(str).values.tolist()
+            exp = [ids, coords.copy()]
+            get_custom_coords(axes, legacy_mapping, exp)
+            remove_nans(exp)
+            scale_custom_coords(axes, exp)
+
+            obs = embed_custom_axes(ids, coords.copy(), mapping, axes)
+
+            self.assertEqual(obs[0], exp[0])
+            assert_equal(obs[1], exp[1])
+
+    def test_summarize_jackknifed_flips_axes(self):
+        master = array([[1.0, 2.0], [-1.0, 0.5], [0.5, -3.0]])
+        replicate = master * array([-1.0, 1.0])
+
+        obs = summarize_jackknifed([master, replicate], [[1, 0.5], [0.5, 0]],
+                                   method='sdev')
+
+        assert_almost_equal(obs[0], master)
+        assert_almost_equal(obs[1], -obs[2])
+        assert_almost_equal(obs[1], array([[0, 0], [0, 0], [0, 0]]))
+        assert_almost_equal(obs[3], array([0.75, 0.25]))
+
+    def test_summarize_jackknifed_matches_legacy(self):
+        state = RandomState(42)
+        master = state.randn(50, 4)
+
+        for n in [1, 2, 3, 4, 7, 10]:
+            # replicates are noisy versions of the master coordinates with
+            # random axes flipped
+            replicates = [master]
+            for _ in range(n - 1):
+                signs = state.choice([-1, 1], 4)
+                replicates.append((master + state.randn(50, 4) * 0.1) * signs)
+            eigvals = [state.rand(4) for _ in range(n)]
+
+            pcoas = [[['s%d' % i for i in range(50)], r, e, None]
+                     for r, e in zip(replicates, eigvals)]
+
+            methods = ['IQR', 'ideal_fourths']
+            if n > 1:
+                methods.append('sdev')
+
+            for method in methods:
+                with warnings.catch_warnings():
+                    # the IQR of one replicate has empty halves
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    exp = summarize_pcoas(pcoas[0], pcoas, method=method,
+                                          apply_procrustes=False)
+                    obs = summarize_jackknifed(replicates, eigvals,
+                                               method=method)
+
+                for o, e in zip(obs, exp[:4]):
+                    assert_almost_equal(o, e)
+
+    def test_summarize_jackknifed_stacked(self):
+        state = RandomState(0)
+        replicates = state.randn(5, 10, 3)
+        eigvals = state.rand(5, 3)
+
+        obs = summarize_jackknifed(replicates, eigvals)
+        exp = summarize_jackknifed(list(replicates), list(eigvals))
+
+        for o, e in zip(obs, exp):
+            assert_almost_equal(o, e)
+
+        # the input should not be modified
+        assert_equal(replicates, RandomState(0).randn(5, 10, 3))
+
+    def test_summarize_jackknifed_bad_method(self):
+        with self.assertRaisesRegex(ValueError, 'Unsupported jackknifing '
+                                    'method "foo"'):
+            summarize_jackknifed([array([[1.0]])], [array([1.0])], 'foo')
+
+    def test_summarize_jackknifed_stream(self):
+        state = RandomState(42)
+        master = state.randn(50, 4)
+
+        for n in [1, 2, 3, 4, 7, 10]:
+            replicates = [master]
+            for _ in range(n - 1):
+                signs = state.choice([-1, 1], 4)
+                replicates.append((master + state.randn(50, 4) * 0.1) * signs)
+            eigvals = [state.rand(4) for _ in range(n)]
+
+            for method in ['IQR', 'ideal_fourths', 'sdev']:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    exp = summarize_jackknifed(replicates, eigvals, method)
+
+                    # a small chunk size to process a few samples at a time
+                    obs = summarize_jackknifed_stream(iter(replicates),
+                                                      iter(eigvals), method,
+                                                      chunk_bytes=n * 64 * 3)
+
+                for o, e in zip(obs, exp):
+                    assert_almost_equal(o, e)
+
+    def test_summarize_jackknifed_stream_sequence(self):
+        state = RandomState(42)
+        master = state.randn(50, 4) * 3
+        replicates = [master]
+        for _ in range(4):
+            signs = state.choice([-1, 1], 4)
+            replicates.append((master + state.randn(50, 4)) * signs)
+        eigvals = [state.rand(4) for _ in range(5)]
+
+        scaled = [r / np.max(np.abs(r)) for r in replicates]
+
+        for method in ['IQR', 'ideal_fourths', 'sdev']:
+            exp = summarize_jackknifed(scaled, eigvals, method)
+
+            # sequences are read again instead of writing a temporary file
+            with mock.patch('emperor.util.TemporaryFile') as spool:
+                obs = summarize_jackknifed_stream(tuple(replicates),
+                                                  iter(eigvals), method,
+                                                  chunk_bytes=5 * 64 * 3,
+                                                  scale=True)
+            spool.assert_not_called()
+
+            for o, e in zip(obs, exp):
+                assert_almost_equal(o, e)
+
+            obs = summarize_jackknifed_stream(iter(replicates), iter(eigvals),
+                                              method, scale=True)
+            for o, e in zip(obs, exp):
+                assert_almost_equal(o, e)
+
+    def test_summarize_jackknifed_stream_errors(self):
+        with self.assertRaisesRegex(ValueError, 'At least one replicate'):
+            summarize_jackknifed_stream(iter([]), iter([]))
+
+        with self.assertRaisesRegex(ValueError, 'Unsupported jackknifing '
+                                    'method "foo"'):
+            summarize_jackknifed_stream([array([[1.0]])], [array([1.0])],
+                                        'foo')
+
+    def test_preprocess_coords_file_jackknifed_iterables(self):
+        exp = preprocess_coords_file(
+            self.jk_coords_header, self.jk_coords_data,
+            self.jk_coords_eigenvalues, self.jk_coords_pcts,
+            self.jk_mapping_file_headers, self.jk_mapping_file_data,
+            jackknifing_method='IQR', pct_variation_below_one=True)
+        obs = preprocess_coords_file(
+            self.jk_coords_header, iter(self.jk_coords_data),
+            iter(self.jk_coords_eigenvalues), self.jk_coords_pcts,
+            self.jk_mapping_file_headers, self.jk_mapping_file_data,
+            jackknifing_method='IQR', pct_variation_below_one=True)
+
+        self.assertEqual(obs[0], exp[0])
+        for o, e in zip(obs[1:6], exp[1:6]):
+            assert_almost_equal(o, e)
+        self.assertEqual(obs[6], exp[6])
+
+    def test_parallel_map(self):
+        def square(x):
+            return x ** 2
+
+        exp = [x ** 2 for x in range(100)]
+        for n_jobs in [None, 1, 2, 7, -1]:
+            obs = parallel_map(square, iter(range(100)), n_jobs)
+            self.assertEqual(list(obs), exp)
+
+    def test_parallel_map_errors(self):
+        def check(x):
+            if x >= 10:
+                raise ValueError('Element %d' % x)
+            return x
+
+        for n_jobs in [1, 4]:
+            obs = parallel_map(check, range(20), n_jobs)
+            with self.assertRaisesRegex(ValueError, 'Element 10'):
+                self.assertEqual([next(obs) for _ in range(10)],
+                                 list(range(10)))
+                next(obs)
+
+        with self.assertRaisesRegex(ValueError, 'n_jobs cannot be zero'):
+            parallel_map(check, range(20), 0)
+
     def test_custom_axes(self):
         columns = ['SampleID', 'BarcodeSequence', 'LinkerPrimerSequence',
                    'Treatment', 'DOB', 'Description']
@@ -343,6 +600,197 @@ class TopLevelTests(TestCase):
             self.assertTrue(issubclass(w[-1].category, EmperorWarning))
             self.assertEqual(obs, url % '1.0.0-beta.7')
 
+    def test_encode_array(self):
+        obs = encode_array(array([[1.5, -2.0], [3.25, 0.0], [1e-3, 4.0]]))
+
+        self.assertEqual(obs['dtype'], 'float32')
+        self.assertEqual(obs['shape'], [3, 2])
+
+        values = frombuffer(b64decode(obs['data']), dtype='<f4')
+        assert_almost_equal(values, [1.5, -2.0, 3.25, 0.0, 1e-3, 4.0])
+
+    def test_encode_array_int32(self):
+        obs = encode_array([[0, 9], [1, 10]], 'int32')
+
+        self.assertEqual(obs['dtype'], 'int32')
+        self.assertEqual(obs['shape'], [2, 2])
+        self.assertEqual(frombuffer(b64decode(obs['data']), dtype='<i4')
+                         .tolist(), [0, 9, 1, 10])
+
+    def test_encode_array_unsupported_dtype(self):
+        with self.assertRaises(ValueError):
+            encode_array([1, 2, 3], 'float64')
+
+    def test_encode_categories(self):
+        values, codes = encode_categories(pd.Series(['a', 'b', 'a', 'c']))
+        self.assertEqual(values, ['a', 'b', 'c'])
+        self.assertEqual(codes.dtype, uint8)
+        assert_equal(codes, [0, 1, 0, 2])
+
+    def test_encode_categories_merges_strings(self):
+        values, codes = encode_categories(pd.Series([1, '1', nan, 2.0,
+                                                     None]))
+        self.assertEqual(values, ['1', '2.0', 'nan'])
+        assert_equal(codes, [0, 0, 2, 1, 2])
+
+    def test_encode_categories_large(self):
+        values, codes = encode_categories(pd.Index(arange(300)))
+        self.assertEqual(values[:3], ['0', '1', '2'])
+        self.assertEqual(codes.dtype, uint16)
+        assert_equal(codes, arange(300))
+
+    def test_deploy_support_files(self):
+        target = mkdtemp()
+        self.files_to_delete.append(target)
+        source = get_emperor_support_files_dir()
+
+        written = deploy_support_files(target)
+        self.assertIn('js/controller.js', written)
+        self.assertIn('templates/logic-template.html', written)
+        with open(join(source, 'js', 'controller.js')) as f:
+            exp = f.read()
+        with open(join(target, 'js', 'controller.js')) as f:
+            self.assertEqual(f.read(), exp)
+        self.assertTrue(exists(join(target, '.emperor-manifest.json')))
+
+        # up to date files are not written again
+        self.assertEqual(deploy_support_files(target), [])
+
+        # modified or deleted files are written again
+        with open(join(target, 'js', 'controller.js'), 'a') as f:
+            f.write('// modified')
+        remove(join(target, 'css', 'emperor.css'))
+        self.assertEqual(deploy_support_files(target),
+                         ['css/emperor.css', 'js/controller.js'])
+        with open(join(target, 'js', 'controller.js')) as f:
+            self.assertEqual(f.read(), exp)
+
+        # without a manifest every file is written
+        remove(join(target, '.emperor-manifest.json'))
+        self.assertEqual(deploy_support_files(target), written)
+
+    def test_deploy_support_files_symlink(self):
+        target = mkdtemp()
+        self.files_to_delete.append(target)
+        source = get_emperor_support_files_dir()
+
+        written = deploy_support_files(target)
+        self.assertEqual(deploy_support_files(target, 'symlink'), written)
+
+        path = join(target, 'js', 'controller.js')
+        self.assertTrue(islink(path))
+        self.assertEqual(realpath(path),
+                         realpath(join(source, 'js', 'controller.js')))
+        self.assertEqual(deploy_support_files(target, 'symlink'), [])
+
+        # switching back to copies replaces the links
+        self.assertEqual(deploy_support_files(target), written)
+        self.assertFalse(islink(path))
+
+    def test_deploy_support_files_shared(self):
+        target, shared = mkdtemp(), mkdtemp()
+        self.files_to_delete.extend([target, shared])
+
+        written = deploy_support_files(target, 'hardlink', shared)
+
+        # the shared directory is named after the version
+        versions = listdir(shared)
+        self.assertEqual(len(versions), 1)
+        self.assertTrue(versions[0].startswith(emperor_version + '-'))
+
+        copy = join(shared, versions[0])
+        for name in ['js/controller.js', 'vendor/js/three.min.js']:
+            self.assertTrue(samefile(join(target, name), join(copy, name)))
+
+        # other plots reuse the shared files
+        other = mkdtemp()
+        self.files_to_delete.append(other)
+        self.assertEqual(deploy_support_files(other, 'symlink', shared),
+                         written)
+        self.assertEqual(realpath(join(other, 'js', 'controller.js')),
+                         realpath(join(copy, 'js', 'controller.js')))
+        self.assertEqual(listdir(shared), versions)
+
+    def test_deploy_support_files_invalid_link(self):
+        with self.assertRaisesRegex(ValueError, 'Unsupported link type '
+                                    '"copy"'):
+            deploy_support_files(gettempdir(), 'copy')
+
+    def test_iterencode_json(self):
+        obj = {'b': [[1, 2.5], [3, None]] * 3, 'a': {'z': 'x', 'y': []},
+               'c': [list(range(5)), 'abc'], 'd': (1, 2, 3), 'e': {},
+               'f': "<'&'>", 'g': {1: 'non-string key'}}
+
+        for batch_size in [1, 2, 4, 1000]:
+            for kwargs in [{}, {'sort_keys': True}]:
+                obs = list(iterencode_json(obj, batch_size, **kwargs))
+                self.assertEqual(''.join(obs), json.dumps(obj, **kwargs))
+
+    def test_iterencode_json_chunks(self):
+        obj = {'values': [list(range(10)), list(range(10, 20))],
+               'coordinates': [[0.5, 1.5]] * 10}
+
+        obs = list(iterencode_json(obj, 3, sort_keys=True))
+        self.assertEqual(''.join(obs), json.dumps(obj, sort_keys=True))
+
+        # no chunk has more than one batch of elements
+        self.assertIn('[0.5, 1.5], [0.5, 1.5], [0.5, 1.5]', obs)
+        self.assertIn('0, 1, 2', obs)
+        self.assertTrue(max(len(chunk) for chunk in obs) < 40)
+
+    def test_iterencode_json_arrays(self):
+        coords = arange(12, dtype=float).reshape(4, 3) / 7
+        rows = array([['a', 'x'], ['b', 'y'], ['c', 'x']], dtype=object)
+        obj = {'coords': coords, 'rows': rows, 'empty': arange(0),
+               'scalar': array(1.5)}
+
+        exp = json.dumps({'coords': coords.tolist(), 'rows': rows.tolist(),
+                          'empty': [], 'scalar': 1.5}, sort_keys=True)
+        for batch_size in [1, 3, 1000]:
+            obs = list(iterencode_json(obj, batch_size, sort_keys=True))
+            self.assertEqual(''.join(obs), exp)
+
+    def test_encode_array_lazy(self):
+        values = arange(100000) / 3
+
+        obs = encode_array(values, lazy=True)
+        self.assertIsInstance(obs['data'], Base64Buffer)
+        self.assertEqual(obs['shape'], [100000])
+
+        # the bytes are encoded in more than one chunk
+        chunks = list(obs['data'].iterencode())
+        self.assertTrue(len(chunks) > 3)
+        self.assertEqual(''.join(iterencode_json(obs, sort_keys=True)),
+                         json.dumps(encode_array(values), sort_keys=True))
+
+    def test_iterencode_json_long_list_lazy(self):
+        # lists longer than a batch with lazy buffers and arrays
+        values = arange(10) / 3
+        obj = [encode_array(values, lazy=True), arange(3) / 7, 'a', 1.5]
+        obj = obj * 250 + list(range(1000))
+
+        exp = [encode_array(values), (arange(3) / 7).tolist(), 'a', 1.5]
+        exp = exp * 250 + list(range(1000))
+        exp = json.dumps(exp, sort_keys=True)
+
+        for batch_size in [3, 1000]:
+            obs = list(iterencode_json(obj, batch_size, sort_keys=True))
+            self.assertEqual(''.join(obs), exp)
+
+        # the batches with only scalars are still serialized at once
+        self.assertIn(json.dumps(list(range(1000)))[1:-1], obs)
+
+    def test_iterencode_json_scalar(self):
+        self.assertEqual(list(iterencode_json('a')), ['"a"'])
+        self.assertEqual(list(iterencode_json(None)), ['null'])
+
+    def test_iterencode_json_errors(self):
+        with self.assertRaisesRegex(ValueError, 'not supported'):
+            list(iterencode_json([1], indent=2))
+
+        with self.assertRaisesRegex(ValueError, 'not supported'):
+            list(iterencode_json([1], separators=(',', ':')))
+
 
 MAPPING_FILE_DATA = [
     ['PC.354', 'AGCACGAGCCTA', 'YATGCTGCCTCCCGTAGGAGT', 'Control', '20061218',